@@ -1,10 +1,13 @@
 from fastapi import APIRouter
 
-from . import vacations, solve, analytics, config as config_routes
+from . import vacations, solve, swaps, analytics, scenarios, providers, config as config_routes
 
 router = APIRouter()
 
 router.include_router(vacations.router, prefix="/vacations", tags=["vacations"])
 router.include_router(config_routes.router, prefix="/config", tags=["config"])
 router.include_router(solve.router, prefix="/solve", tags=["solve"])
-router.include_router(analytics.router, prefix="/analytics", tags=["analytics"])
\ No newline at end of file
+router.include_router(swaps.router, prefix="/solve", tags=["swaps"])
+router.include_router(analytics.router, prefix="/analytics", tags=["analytics"])
+router.include_router(scenarios.router, prefix="/scenarios", tags=["scenarios"])
+router.include_router(providers.router, prefix="/providers", tags=["providers"])
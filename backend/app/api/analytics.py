@@ -1,57 +1,70 @@
 from __future__ import annotations
 
-from collections import Counter, defaultdict
-from datetime import date, timedelta
+from collections import defaultdict
+from datetime import date
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException
 
-from app.db.session import get_session
-from app.models import Assignment, Provider, ScheduleBlock
+from app.api.deps import Conditional, get_tenant, run_coalesced
 from app.schemas.common import CoverageSummary, FairnessSummary
-from app.services.seed import seed_all
+from app.services.coverage import coverage_gaps
+from app.services.fairness import FAIRNESS_METRICS, FairnessIndex
+from app.services.tenants import Tenant
 from app.solver.engine import solve_schedule
 
 router = APIRouter()
 
 
-def _get_session():
-    with get_session() as session:
-        yield session
-
-
 @router.get("/fairness", response_model=list[FairnessSummary])
-def fairness(session=Depends(_get_session)) -> list[FairnessSummary]:
-    seed_all(session)
-    start = date.fromisoformat("2026-01-05")
-    end = date.fromisoformat("2026-03-27")
-    schedule = solve_schedule(session, start, end)
+async def fairness(
+    start: date | None = None,
+    end: date | None = None,
+    metric: str | None = None,
+    solve_run_id: int | None = None,
+    tenant: Tenant = Depends(get_tenant),
+    conditional: Conditional = Depends(),
+) -> list[FairnessSummary]:
+    """Per-provider counts for ``start..end`` from a stored run (the latest by default).
 
-    weekend_counts = Counter()
-    for call in schedule.call_assignments:
-        if call.call_type == "weekend_noninv":
-            weekend_counts[call.providers[0].initials] += 1
+    Without any stored run the seed window is solved and indexed instead.
+    """
+    if metric is not None and metric not in FAIRNESS_METRICS:
+        raise HTTPException(status_code=422, detail=f"Unknown metric: {metric}")
+    if start and end and end < start:
+        raise HTTPException(status_code=422, detail="end must not be before start")
+    run_id = solve_run_id if solve_run_id is not None else tenant.latest_run_id()
+    if run_id is not None:
+        schedule = tenant.schedule_for(run_id)
+        if schedule is None:
+            raise HTTPException(status_code=404, detail="Solve run not found")
+        conditional.check(*conditional.data_version(), run_id, schedule.revision)
+        index = tenant.fairness_index(run_id)
+    else:
+        seed_window = (tenant.settings.seed_window_start, tenant.settings.seed_window_end)
+        conditional.check(*conditional.data_version(), *seed_window)
+        index = await run_coalesced("solve", (tenant.id, *conditional.data_version(), *seed_window), _seed_fairness, tenant)
+    metrics = (metric,) if metric else FAIRNESS_METRICS
+    return [FairnessSummary(metric=name, values=index.window(name, start, end), start=start, end=end) for name in metrics]
 
-    hospital_counts = Counter()
-    for assignment in schedule.assignments:
-        if assignment.site_type == "hospital":
-            for provider in assignment.providers:
-                hospital_counts[provider.initials] += 1
 
-    return [
-        FairnessSummary(metric="weekend_call", values=dict(weekend_counts)),
-        FairnessSummary(metric="hospital_days", values=dict(hospital_counts)),
-    ]
+def _seed_fairness(tenant: Tenant) -> FairnessIndex:
+    start = date.fromisoformat(tenant.settings.seed_window_start)
+    end = date.fromisoformat(tenant.settings.seed_window_end)
+    return FairnessIndex(solve_schedule(tenant.session, start, end, tenant.rules.active))
 
 
 @router.get("/coverage", response_model=list[CoverageSummary])
-def coverage(session=Depends(_get_session)) -> list[CoverageSummary]:
-    seed_all(session)
-    start = date.fromisoformat("2026-01-05")
-    end = date.fromisoformat("2026-03-27")
-    schedule = solve_schedule(session, start, end)
+async def coverage(tenant: Tenant = Depends(get_tenant), conditional: Conditional = Depends()) -> list[CoverageSummary]:
+    etag = conditional.check(*conditional.data_version(), tenant.settings.seed_window_start, tenant.settings.seed_window_end)
+    return await run_coalesced("solve", etag, _coverage, tenant)
+
+
+def _coverage(tenant: Tenant) -> list[CoverageSummary]:
+    start = date.fromisoformat(tenant.settings.seed_window_start)
+    end = date.fromisoformat(tenant.settings.seed_window_end)
+    schedule = solve_schedule(tenant.session, start, end, tenant.rules.active)
 
     gaps: dict[str, list[str]] = defaultdict(list)
-    for assignment in schedule.assignments:
-        if not assignment.providers:
-            gaps[assignment.site_code].append(f"{assignment.date} {assignment.block}")
-    return [CoverageSummary(site=site, coverage_gaps=blocks) for site, blocks in gaps.items()]
\ No newline at end of file
+    for gap in coverage_gaps(tenant.session, schedule, start, end):
+        gaps[gap.site_code].append(f"{gap.date} {gap.block}")
+    return [CoverageSummary(site=site, coverage_gaps=blocks) for site, blocks in gaps.items()]
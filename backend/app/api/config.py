@@ -1,25 +1,48 @@
 from __future__ import annotations
 
-from pathlib import Path
+from fastapi import APIRouter, Depends, HTTPException
 
-from fastapi import APIRouter, HTTPException
-
-from app.core.config import settings
+from app.api.deps import Conditional, get_tenant
+from app.config.registry import RulesValidationError
+from app.core.events import ChangeEvent
+from app.models import Provider
+from app.schemas.common import RulesVersionRead
+from app.services.tenants import Tenant
 
 router = APIRouter()
 
 
 @router.post("/rules")
-def upload_rules_config(content: dict) -> dict:
-    path = settings.rules_config_path
-    path.parent.mkdir(parents=True, exist_ok=True)
-    path.write_text("""# auto-uploaded\n""" + content.get("raw", ""))
-    return {"status": "ok", "path": str(path)}
-
-
-@router.get("/rules/history")
-def get_rules_history() -> dict:
-    path = settings.rules_config_path
-    if not path.exists():
-        raise HTTPException(status_code=404, detail="No history")
-    return {"path": str(path), "content": path.read_text()[:4096]}
\ No newline at end of file
+def upload_rules_config(content: dict, tenant: Tenant = Depends(get_tenant)) -> dict:
+    raw = content.get("raw")
+    if not raw:
+        raise HTTPException(status_code=422, detail="Missing 'raw' rules document")
+    known = {p.initials for p in tenant.session.all(Provider)}
+    try:
+        compiled = tenant.rules.publish(raw, source="upload", known_initials=known)
+    except RulesValidationError as exc:
+        raise HTTPException(status_code=422, detail=str(exc)) from exc
+    tenant.events.publish(ChangeEvent("rules", compiled.version, "published"))
+    return {"status": "ok", "version": compiled.version}
+
+
+@router.get("/rules/history", response_model=list[RulesVersionRead])
+def get_rules_history(tenant: Tenant = Depends(get_tenant), conditional: Conditional = Depends()) -> list[RulesVersionRead]:
+    registry = tenant.rules
+    active = registry.active.version
+    history = registry.history()
+    conditional.check(active, tuple(info.version for info in history))
+    return [
+        RulesVersionRead(version=info.version, created_at=info.created_at, source=info.source, active=info.version == active)
+        for info in history
+    ]
+
+
+@router.post("/rules/{version}/activate")
+def activate_rules_version(version: str, tenant: Tenant = Depends(get_tenant)) -> dict:
+    try:
+        compiled = tenant.rules.activate(version)
+    except KeyError as exc:
+        raise HTTPException(status_code=404, detail="Rules version not found") from exc
+    tenant.events.publish(ChangeEvent("rules", compiled.version, "activated"))
+    return {"status": "ok", "version": compiled.version}
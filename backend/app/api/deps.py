@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, Hashable, TypeVar
+
+from fastapi import Depends, Header, HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
+
+from app.core.admission import AdmissionGate, Saturated, SingleFlight
+from app.core.config import settings
+from app.models import SolveRun
+from app.services.history_import import IMPORTED_STATUS
+from app.services.tenants import DEFAULT_TENANT_ID, Tenant, get_tenants
+
+T = TypeVar("T")
+
+# Clients may keep responses but must revalidate; a matching ETag costs one hash and a 304.
+CACHE_CONTROL = "private, no-cache"
+# Revisions and data versions restart with the process; this keeps ETags from one boot invalid in the next.
+BOOT_ID = os.urandom(8).hex()
+
+
+def get_tenant(x_tenant_id: str = Header(default=DEFAULT_TENANT_ID)) -> Tenant:
+    tenant = get_tenants().get(x_tenant_id)
+    if tenant is None:
+        raise HTTPException(status_code=404, detail="Tenant not found")
+    return tenant
+
+
+def editable_run(tenant: Tenant, solve_run_id: int) -> SolveRun | None:
+    """The stored run for endpoints that re-solve or patch it.
+
+    Imported runs carry no rotation state to resume from, so any re-solve
+    would start over and replace the imported weeks; they are refused.
+    """
+    solve_run = tenant.session.get(SolveRun, solve_run_id)
+    if solve_run is not None and solve_run.status == IMPORTED_STATUS:
+        raise HTTPException(status_code=409, detail="Imported runs are read-only")
+    return solve_run
+
+
+class Conditional:
+    """Strong ETags for read endpoints.
+
+    ``check(*parts)`` hashes the request path and query with whatever the
+    response is derived from (run id and revision, rules version, data
+    version) and answers a matching ``If-None-Match`` with 304 before the
+    endpoint does any work. Those counters start over on restart, so the
+    process's ``BOOT_ID`` is hashed in too.
+    """
+
+    def __init__(
+        self,
+        request: Request,
+        response: Response,
+        tenant: Tenant = Depends(get_tenant),
+        if_none_match: str | None = Header(default=None),
+    ) -> None:
+        self.request = request
+        self.response = response
+        self.tenant = tenant
+        self._if_none_match = if_none_match
+        self._headers: dict[str, str] = {}
+
+    def etag(self, *parts: object) -> str:
+        query = sorted(self.request.query_params.multi_items())
+        payload = repr((BOOT_ID, self.tenant.id, self.request.url.path, query, parts)).encode("utf-8")
+        return f'"{hashlib.blake2b(payload, digest_size=16).hexdigest()}"'
+
+    def data_version(self) -> tuple[str, int]:
+        return self.tenant.rules.active.version, self.tenant.session.version
+
+    def check(self, *parts: object) -> str:
+        return self.check_etag(self.etag(*parts))
+
+    def check_etag(self, etag: str) -> str:
+        headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+        if self._if_none_match and (
+            self._if_none_match.strip() == "*" or etag in (tag.strip() for tag in self._if_none_match.split(","))
+        ):
+            raise HTTPException(status_code=304, headers=headers)
+        self._headers = headers
+        self.response.headers.update(headers)
+        return etag
+
+    def headers(self) -> dict[str, str]:
+        """Headers to copy onto a Response the endpoint builds itself."""
+        return dict(self._headers)
+
+
+# CPU-heavy endpoint classes get their own bounded queues, so a burst of solves
+# leaves threadpool workers free for /health and the CRUD routes.
+GATES = {
+    "solve": AdmissionGate(settings.solve_concurrency, settings.solve_queue),
+    "export": AdmissionGate(settings.export_concurrency, settings.export_queue),
+}
+_FLIGHTS = SingleFlight()
+
+
+@asynccontextmanager
+async def admitted(kind: str) -> AsyncIterator[None]:
+    gate = GATES[kind]
+    try:
+        await gate.acquire()
+    except Saturated as exc:
+        raise HTTPException(
+            status_code=429,
+            detail=f"Too many {kind} requests in progress",
+            headers={"Retry-After": str(exc.retry_after)},
+        ) from exc
+    started = time.monotonic()
+    try:
+        yield
+    finally:
+        gate.release(time.monotonic() - started)
+
+
+async def run_coalesced(kind: str, key: Hashable, fn: Callable[..., T], *args: object) -> T:
+    """Runs ``fn`` in the threadpool under the ``kind`` gate; identical concurrent requests share one run."""
+
+    async def call() -> T:
+        async with admitted(kind):
+            return await run_in_threadpool(fn, *args)
+
+    return await _FLIGHTS.run((kind, key), call)
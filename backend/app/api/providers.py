@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+
+from app.api.deps import Conditional, get_tenant
+from app.models import Provider
+from app.services.ical import provider_feed
+from app.services.tenants import Tenant
+
+ICS_MEDIA_TYPE = "text/calendar; charset=utf-8"
+
+router = APIRouter()
+
+
+@router.get("/{initials}/schedule.ics")
+def provider_schedule_feed(
+    initials: str,
+    solve_run_id: int | None = Query(default=None),
+    tenant: Tenant = Depends(get_tenant),
+    conditional: Conditional = Depends(),
+) -> Response:
+    matches = sum(p.initials == initials for p in tenant.session.all(Provider))
+    if not matches:
+        raise HTTPException(status_code=404, detail="Provider not found")
+    if matches > 1:
+        # Runs name providers by initials, so an MD and an APN sharing them cannot be told apart.
+        raise HTTPException(status_code=409, detail=f"{initials} names more than one provider")
+    run_id = solve_run_id if solve_run_id is not None else tenant.latest_run_id()
+    schedule = tenant.schedule_for(run_id) if run_id is not None else None
+    if schedule is None:
+        raise HTTPException(status_code=404, detail="Solve run not found")
+
+    # The feed's own fingerprint is the ETag, so it survives new runs that leave this provider alone.
+    feed = provider_feed(schedule, initials)
+    conditional.check_etag(feed.etag)
+    return Response(feed.body, media_type=ICS_MEDIA_TYPE, headers=conditional.headers())
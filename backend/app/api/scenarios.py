@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
+
+from app.api.deps import admitted, get_tenant
+from app.models import SolveRun
+from app.schemas.common import ScenarioRequest, ScenarioResultRead
+from app.services.scenarios import (
+    AmbiguousProviderError,
+    HolidayEdit,
+    RotationEdit,
+    Scenario,
+    ScenarioBase,
+    ScenarioResult,
+    VacationEdit,
+    evaluate_scenarios,
+)
+from app.services.tenants import Tenant
+
+router = APIRouter()
+
+_EDIT_TYPES = {"vacation": VacationEdit, "holiday": HolidayEdit, "rotation": RotationEdit}
+
+
+def _to_scenario(payload) -> Scenario:
+    edits = []
+    for edit in payload.edits:
+        fields = edit.model_dump(exclude={"kind"})
+        if edit.kind == "rotation":
+            fields["order"] = tuple(fields["order"])
+        edits.append(_EDIT_TYPES[edit.kind](**fields))
+    return Scenario(name=payload.name, edits=tuple(edits))
+
+
+@router.post("", response_model=list[ScenarioResultRead])
+async def run_scenarios(payload: ScenarioRequest, tenant: Tenant = Depends(get_tenant)) -> list[ScenarioResult]:
+    solve_run = tenant.session.get(SolveRun, payload.base_solve_run_id)
+    baseline = tenant.schedule_for(payload.base_solve_run_id)
+    if not solve_run or baseline is None:
+        raise HTTPException(status_code=404, detail="Solve run not found")
+    try:
+        rules = tenant.rules.get(solve_run.rules_version) if solve_run.rules_version else tenant.rules.active
+    except KeyError as exc:
+        raise HTTPException(status_code=409, detail="Rules version of the base run is no longer available") from exc
+
+    base = ScenarioBase(
+        session=tenant.session,
+        rules=rules,
+        baseline=baseline,
+        start_date=solve_run.start_date,
+        end_date=solve_run.end_date,
+    )
+    try:
+        async with admitted("solve"):
+            return await run_in_threadpool(
+                evaluate_scenarios, base, [_to_scenario(s) for s in payload.scenarios], payload.max_workers
+            )
+    except KeyError as exc:
+        raise HTTPException(status_code=422, detail=f"Unknown provider: {exc.args[0]}") from exc
+    except AmbiguousProviderError as exc:
+        raise HTTPException(status_code=422, detail=str(exc)) from exc
@@ -1,43 +1,421 @@
 from __future__ import annotations
 
-from datetime import date
+import os
+from collections import defaultdict
+from dataclasses import asdict
+from datetime import date, timedelta
+from pathlib import Path
+from typing import BinaryIO, Iterator
 
-from fastapi import APIRouter, Depends, HTTPException
+import orjson
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 
-from app.db.session import get_session
-from app.models import SolveRun
-from app.schemas.common import SolveRequest, SolveResponse, SolveStatusRead
-from app.services.seed import seed_all
-from app.solver.engine import solve_schedule
+from app.api.deps import Conditional, admitted, editable_run, get_tenant, run_coalesced
+from app.config.registry import CompiledRules
+from app.db.session import InMemorySession
+from app.models import Provider, ScheduleBlock, SolveRun
+from app.schemas.common import (
+    AssignmentPage,
+    BatchSolveRequest,
+    CallPage,
+    ExtendRead,
+    ExtendRequest,
+    HistoryImportRead,
+    PinIn,
+    PinRequest,
+    RepairRead,
+    ScheduleDiffRead,
+    SolveRequest,
+    SolveResponse,
+    SlotDecisionRead,
+    SolveStatusRead,
+    StaleWeekRead,
+)
+from app.services.batch import BatchJob, run_batch
+from app.services.history_import import HistoryImportError, WorkbookSource, import_history, workbooks_from_zip
+from app.services.schedule_query import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    Cursor,
+    ScheduleFilter,
+    page_assignments,
+    page_calls,
+    stream_assignments,
+    stream_calls,
+)
+from app.services.tenants import Tenant, get_tenants
+from app.solver.diff import SlotChange, changes_in_week, diff_schedules
+from app.solver.engine import ExtendError, ScheduleOutput, extend_schedule, solve_schedule
+from app.solver.export_cache import get_export_cache
+from app.solver.pins import load_pins, pin_problems, repair_schedule, save_pin
+from app.solver.trace import DecisionTrace
+
+XLSX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+EXPORT_CHUNK_SIZE = 64 * 1024
 
 router = APIRouter()
 
+def _get_session(tenant: Tenant = Depends(get_tenant)):
+    return tenant.session
+
 
-def _get_session():
-    with get_session() as session:
-        yield session
+def _stored_schedule(tenant: Tenant, solve_run_id: int) -> ScheduleOutput:
+    schedule = tenant.schedule_for(solve_run_id)
+    if schedule is None:
+        raise HTTPException(status_code=404, detail="Solve run not found")
+    return schedule
 
 
 @router.post("", response_model=SolveResponse)
-def solve(payload: SolveRequest, session=Depends(_get_session)) -> SolveResponse:
-    seed_all(session)
-    schedule = solve_schedule(session, payload.start_date, payload.end_date)
-    solve_run = SolveRun(
-        label=f"{payload.start_date}__{payload.end_date}",
-        start_date=payload.start_date,
-        end_date=payload.end_date,
-        status="SOLVED",
-        objective_breakdown_json={"assignments": len(schedule.assignments)},
+async def solve(payload: SolveRequest, tenant: Tenant = Depends(get_tenant)) -> SolveResponse:
+    # Identical windows requested while one is being solved, over the same data, get that run back.
+    key = (
+        tenant.id,
+        payload.start_date,
+        payload.end_date,
+        tuple(payload.lock_blocks or ()),
+        tenant.rules.active.version,
+        tenant.session.version,
+        payload.trace,
     )
-    session.add(solve_run)
+    return await run_coalesced("solve", key, _solve, payload, tenant)
+
+
+def _solve(payload: SolveRequest, tenant: Tenant) -> SolveResponse:
+    session = tenant.session
+    for block_id in payload.lock_blocks or []:
+        block = session.get(ScheduleBlock, block_id)
+        if block is None:
+            raise HTTPException(status_code=404, detail=f"Schedule block not found: {block_id}")
+        block.locked = True
+        session.add(block)
     session.commit()
-    session.refresh(solve_run)
+    pins = load_pins(session, payload.start_date, payload.end_date)
+    trace = DecisionTrace() if payload.trace else None
+    schedule = solve_schedule(session, payload.start_date, payload.end_date, tenant.rules.active, pins, trace=trace)
+    solve_run = tenant.record_run(payload.start_date, payload.end_date, schedule, trace)
     return SolveResponse(solve_run_id=solve_run.id, status=solve_run.status)
 
 
+@router.post("/batch", response_model=dict[str, list[SolveStatusRead]])
+async def solve_batch(payload: BatchSolveRequest) -> dict[str, list[SolveRun]]:
+    jobs = [BatchJob(job.tenant_id, job.start_date, job.end_date) for job in payload.jobs]
+    try:
+        async with admitted("solve"):
+            return await run_in_threadpool(run_batch, jobs, get_tenants(), payload.max_workers)
+    except KeyError as exc:
+        raise HTTPException(status_code=404, detail=f"Tenant not found: {exc.args[0]}") from exc
+
+
+def _import_history(tenant: Tenant, sources: list[WorkbookSource], max_workers: int | None) -> HistoryImportRead:
+    try:
+        result = import_history(tenant, sources, max_workers)
+    except HistoryImportError as exc:
+        raise HTTPException(status_code=422, detail=[asdict(issue) for issue in exc.issues]) from exc
+    return HistoryImportRead(
+        solve_run_id=result.solve_run.id,
+        start_date=result.solve_run.start_date,
+        end_date=result.solve_run.end_date,
+        weeks=[week.week_start for week in result.weeks],
+        issues=[asdict(issue) for issue in result.issues],
+    )
+
+
+@router.post("/history", response_model=HistoryImportRead)
+async def import_history_workbooks(
+    request: Request,
+    max_workers: int | None = Query(default=None, ge=1),
+    tenant: Tenant = Depends(get_tenant),
+) -> HistoryImportRead:
+    """Load a zip of past weekly workbooks as one stored run."""
+    try:
+        sources = workbooks_from_zip(await request.body())
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    async with admitted("solve"):
+        return await run_in_threadpool(_import_history, tenant, sources, max_workers)
+
+
 @router.get("/{solve_run_id}", response_model=SolveStatusRead)
-def get_status(solve_run_id: int, session=Depends(_get_session)) -> SolveRun:
+def get_status(solve_run_id: int, session=Depends(_get_session), conditional: Conditional = Depends()) -> SolveRun:
+    conditional.check(solve_run_id, session.version)
     solve_run = session.get(SolveRun, solve_run_id)
     if not solve_run:
         raise HTTPException(status_code=404, detail="Solve run not found")
-    return solve_run
\ No newline at end of file
+    return solve_run
+
+
+@router.post("/{solve_run_id}/pins", response_model=RepairRead)
+async def pin_assignments(solve_run_id: int, payload: PinRequest, tenant: Tenant = Depends(get_tenant)) -> RepairRead:
+    async with admitted("solve"):
+        return await run_in_threadpool(_pin_assignments, solve_run_id, payload, tenant)
+
+
+def _pin_providers(
+    session: InMemorySession, pin: PinIn, by_initials: dict[str, list[Provider]], rules: CompiledRules
+) -> list[Provider]:
+    # Initials shared by an MD and an APN mean whichever of the two may take the slot.
+    providers = []
+    for initials in pin.providers:
+        candidates = by_initials[initials]
+        fitting = (p for p in candidates if not pin_problems(session, pin.date, pin.slot, pin.block, [p], rules))
+        providers.append(next(fitting, candidates[0]))
+    return providers
+
+
+def _pin_assignments(solve_run_id: int, payload: PinRequest, tenant: Tenant) -> RepairRead:
+    session = tenant.session
+    schedule = _stored_schedule(tenant, solve_run_id)
+    solve_run = editable_run(tenant, solve_run_id)
+    try:
+        rules = tenant.rules.get(solve_run.rules_version) if solve_run.rules_version else tenant.rules.active
+    except KeyError as exc:
+        raise HTTPException(status_code=409, detail="Rules version of the base run is no longer available") from exc
+    if not payload.pins:
+        return RepairRead(solve_run_id=solve_run_id, revision=schedule.revision, changes=[])
+
+    by_initials: dict[str, list[Provider]] = defaultdict(list)
+    for provider in session.all(Provider):
+        by_initials[provider.initials].append(provider)
+    pinned: list[list[Provider]] = []
+    problems = []
+    for pin in payload.pins:
+        if not solve_run.start_date <= pin.date <= solve_run.end_date:
+            raise HTTPException(status_code=422, detail=f"Pin outside solve window: {pin.date}")
+        missing = [initials for initials in pin.providers if initials not in by_initials]
+        if missing:
+            raise HTTPException(status_code=422, detail=f"Unknown provider: {missing[0]}")
+        try:
+            providers = _pin_providers(session, pin, by_initials, rules)
+            problems += pin_problems(session, pin.date, pin.slot, pin.block, providers, rules)
+        except KeyError as exc:
+            raise HTTPException(status_code=422, detail=f"Unknown slot: {exc.args[0]}") from exc
+        pinned.append(providers)
+    # Nothing is saved unless every pin can be.
+    if problems:
+        raise HTTPException(status_code=422, detail=problems)
+    days = [pin.date for pin in payload.pins]
+    with tenant.run_lock(solve_run_id):
+        for pin, providers in zip(payload.pins, pinned):
+            save_pin(session, pin.date, pin.slot, pin.block, providers, rules)
+        result = repair_schedule(
+            session, schedule, solve_run.start_date, solve_run.end_date, rules, min(days), max(days)
+        )
+        tenant.run_changed(solve_run_id, min(days), max(days))
+    return RepairRead(solve_run_id=solve_run_id, revision=result.revision, changes=result.changes)
+
+
+@router.get("/{solve_run_id}/trace", response_model=list[SlotDecisionRead])
+def get_trace(
+    solve_run_id: int,
+    day: date | None = None,
+    slot: str | None = None,
+    tenant: Tenant = Depends(get_tenant),
+    conditional: Conditional = Depends(),
+) -> list[SlotDecisionRead]:
+    _stored_schedule(tenant, solve_run_id)
+    trace = tenant.trace_for(solve_run_id)
+    if trace is None:
+        raise HTTPException(status_code=404, detail="Solve run was not traced")
+    # A trace is written once, by the solve that stored the run.
+    conditional.check(solve_run_id)
+    return [SlotDecisionRead(**decision.as_dict()) for decision in trace.select(day, slot)]
+
+
+@router.get("/{solve_run_id}/stale", response_model=list[StaleWeekRead])
+def get_stale_weeks(
+    solve_run_id: int, tenant: Tenant = Depends(get_tenant), conditional: Conditional = Depends()
+) -> list[StaleWeekRead]:
+    schedule = _stored_schedule(tenant, solve_run_id)
+    # Weeks go stale on data changes and are cleared by re-solves, which bump these two.
+    conditional.check(solve_run_id, schedule.revision, tenant.session.version)
+    by_id = {p.id: p.initials for p in tenant.session.all(Provider)}
+    return [
+        StaleWeekRead(week_start=monday, providers=sorted(by_id[i] for i in providers or () if i in by_id))
+        for monday, providers in tenant.stale_weeks.weeks(solve_run_id).items()
+    ]
+
+
+@router.post("/{solve_run_id}/extend", response_model=ExtendRead)
+async def extend_run(solve_run_id: int, payload: ExtendRequest, tenant: Tenant = Depends(get_tenant)) -> ExtendRead:
+    key = (tenant.id, solve_run_id, payload.end_date, tenant.session.version)
+    return await run_coalesced("solve", key, _extend_run, solve_run_id, payload, tenant)
+
+
+def _extend_run(solve_run_id: int, payload: ExtendRequest, tenant: Tenant) -> ExtendRead:
+    session = tenant.session
+    schedule = _stored_schedule(tenant, solve_run_id)
+    solve_run = editable_run(tenant, solve_run_id)
+    try:
+        rules = tenant.rules.get(solve_run.rules_version) if solve_run.rules_version else tenant.rules.active
+    except KeyError as exc:
+        raise HTTPException(status_code=409, detail="Rules version of the base run is no longer available") from exc
+    with tenant.run_lock(solve_run_id):
+        if payload.end_date <= solve_run.end_date:
+            raise HTTPException(status_code=422, detail=f"Run already ends on {solve_run.end_date}")
+        previous_end = solve_run.end_date
+        pins = load_pins(session, solve_run.start_date, payload.end_date)
+        try:
+            added = extend_schedule(
+                session, schedule, solve_run.start_date, solve_run.end_date, payload.end_date, rules, pins
+            )
+        except ExtendError as exc:
+            raise HTTPException(status_code=409, detail=str(exc)) from exc
+        solve_run.end_date = payload.end_date
+        solve_run.label = f"{solve_run.start_date}__{solve_run.end_date}"
+        solve_run.objective_breakdown_json = {"assignments": len(schedule.assignments)}
+        session.add(solve_run)
+        session.commit()
+        tenant.run_changed(solve_run_id, previous_end + timedelta(days=1), payload.end_date)
+    return ExtendRead(
+        solve_run_id=solve_run_id,
+        revision=schedule.revision,
+        start_date=solve_run.start_date,
+        end_date=solve_run.end_date,
+        added_assignments=len(added.assignments),
+        added_calls=len(added.call_assignments),
+    )
+
+
+def _decode_cursor(cursor: str | None) -> Cursor | None:
+    if cursor is None:
+        return None
+    try:
+        return Cursor.decode(cursor)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+
+
+def _wants_ndjson(format: str | None, accept: str | None) -> bool:
+    if format is not None:
+        return format == "ndjson"
+    return bool(accept) and NDJSON_MEDIA_TYPE in accept
+
+
+@router.get("/{solve_run_id}/assignments", response_model=AssignmentPage)
+def list_assignments(
+    solve_run_id: int,
+    start: date | None = None,
+    end: date | None = None,
+    site: str | None = None,
+    provider: str | None = None,
+    cursor: str | None = None,
+    limit: int | None = Query(default=None, ge=1, le=MAX_PAGE_SIZE),
+    format: str | None = Query(default=None, pattern="^(json|ndjson)$"),
+    accept: str | None = Header(default=None),
+    tenant: Tenant = Depends(get_tenant),
+    conditional: Conditional = Depends(),
+) -> Response:
+    schedule = _stored_schedule(tenant, solve_run_id)
+    conditional.check(solve_run_id, schedule.revision, accept)
+    filters = ScheduleFilter(start=start, end=end, site=site, provider=provider)
+    position = _decode_cursor(cursor)
+    if _wants_ndjson(format, accept):
+        return StreamingResponse(
+            stream_assignments(schedule, filters, position, limit), media_type=NDJSON_MEDIA_TYPE, headers=conditional.headers()
+        )
+    page = page_assignments(schedule, filters, position, limit or DEFAULT_PAGE_SIZE)
+    return Response(
+        orjson.dumps({"items": page.items, "next_cursor": page.next_cursor}),
+        media_type="application/json",
+        headers=conditional.headers(),
+    )
+
+
+@router.get("/{solve_run_id}/calls", response_model=CallPage)
+def list_calls(
+    solve_run_id: int,
+    start: date | None = None,
+    end: date | None = None,
+    call_type: str | None = None,
+    provider: str | None = None,
+    cursor: str | None = None,
+    limit: int | None = Query(default=None, ge=1, le=MAX_PAGE_SIZE),
+    format: str | None = Query(default=None, pattern="^(json|ndjson)$"),
+    accept: str | None = Header(default=None),
+    tenant: Tenant = Depends(get_tenant),
+    conditional: Conditional = Depends(),
+) -> Response:
+    schedule = _stored_schedule(tenant, solve_run_id)
+    conditional.check(solve_run_id, schedule.revision, accept)
+    filters = ScheduleFilter(start=start, end=end, provider=provider, call_type=call_type)
+    position = _decode_cursor(cursor)
+    if _wants_ndjson(format, accept):
+        return StreamingResponse(
+            stream_calls(schedule, filters, position, limit), media_type=NDJSON_MEDIA_TYPE, headers=conditional.headers()
+        )
+    page = page_calls(schedule, filters, position, limit or DEFAULT_PAGE_SIZE)
+    return Response(
+        orjson.dumps({"items": page.items, "next_cursor": page.next_cursor}),
+        media_type="application/json",
+        headers=conditional.headers(),
+    )
+
+
+@router.get("/{base_id}/diff/{other_id}", response_model=ScheduleDiffRead)
+def diff_runs(
+    base_id: int, other_id: int, tenant: Tenant = Depends(get_tenant), conditional: Conditional = Depends()
+) -> ScheduleDiffRead:
+    base, other = _stored_schedule(tenant, base_id), _stored_schedule(tenant, other_id)
+    conditional.check(base_id, base.revision, other_id, other.revision)
+    result = diff_schedules(base, other)
+    return ScheduleDiffRead(
+        base_solve_run_id=base_id,
+        other_solve_run_id=other_id,
+        weeks_compared=result.weeks_compared,
+        changed_weeks=result.changed_weeks,
+        changes=result.changes,
+    )
+
+
+@router.get("/{solve_run_id}/export/{week_start}")
+async def export_run_week(
+    solve_run_id: int,
+    week_start: date,
+    compare_to: int | None = None,
+    tenant: Tenant = Depends(get_tenant),
+    conditional: Conditional = Depends(),
+) -> Response:
+    schedule = _stored_schedule(tenant, solve_run_id)
+    base = _stored_schedule(tenant, compare_to) if compare_to is not None else None
+    template = tenant.settings.template_path
+    etag = conditional.check(
+        solve_run_id, schedule.revision, base.revision if base else None, str(template), template.stat().st_mtime_ns
+    )
+
+    key = await run_coalesced("export", etag, _export_key, schedule, base, week_start, template)
+    handle = await run_in_threadpool(_open_export, key, schedule, base, week_start, template)
+    size = handle.seek(0, os.SEEK_END)
+    handle.seek(0)
+    headers = {
+        "Content-Disposition": f'attachment; filename="SCHEDULE_{week_start}.xlsx"',
+        "Content-Length": str(size),
+        **conditional.headers(),
+    }
+    return StreamingResponse(_chunks(handle), media_type=XLSX_MEDIA_TYPE, headers=headers)
+
+
+def _highlight(schedule: ScheduleOutput, base: ScheduleOutput | None, week_start: date) -> list[SlotChange] | None:
+    return changes_in_week(diff_schedules(base, schedule).changes, week_start) if base else None
+
+
+def _export_key(schedule: ScheduleOutput, base: ScheduleOutput | None, week_start: date, template: Path) -> str:
+    # Unchanged weeks of a new run hash to the same file, so they are sent from disk as well.
+    return get_export_cache().export(schedule, week_start, template, _highlight(schedule, base, week_start)).stem
+
+
+def _open_export(
+    key: str, schedule: ScheduleOutput, base: ScheduleOutput | None, week_start: date, template: Path
+) -> BinaryIO:
+    cache = get_export_cache()
+    # A put since the render may have evicted the file; it is rendered again rather than failing the download.
+    return cache.open(key) or cache.open_week(schedule, week_start, template, _highlight(schedule, base, week_start))
+
+
+def _chunks(handle: BinaryIO) -> Iterator[bytes]:
+    with handle:
+        while chunk := handle.read(EXPORT_CHUNK_SIZE):
+            yield chunk
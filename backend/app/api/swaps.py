@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+from dataclasses import asdict
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.encoders import jsonable_encoder
+
+from app.api.deps import Conditional, editable_run, get_tenant
+from app.schemas.common import SwapCreate, SwapRead
+from app.services.swaps import OPEN, CallSwap, SwapBoard, SwapError
+from app.services.tenants import Tenant
+from app.solver.engine import CALL_POOLS
+
+router = APIRouter()
+
+
+def _board(tenant: Tenant, solve_run_id: int) -> SwapBoard:
+    editable_run(tenant, solve_run_id)
+    board = tenant.swap_board(solve_run_id)
+    if board is None:
+        raise HTTPException(status_code=404, detail="Solve run not found")
+    return board
+
+
+def _open_swap(board: SwapBoard, swap_id: int) -> CallSwap:
+    swap = board.get(swap_id)
+    if swap is None:
+        raise HTTPException(status_code=404, detail="Swap not found")
+    if swap.status != OPEN:
+        raise HTTPException(status_code=409, detail=f"Swap is already {swap.status.lower()}")
+    return swap
+
+
+def _swap_read(swap: CallSwap) -> SwapRead:
+    return SwapRead(
+        id=swap.id,
+        giver=swap.giver.initials,
+        taker=swap.taker.initials,
+        date=swap.date,
+        call_type=swap.call_type,
+        return_date=swap.return_date,
+        return_call_type=swap.return_call_type,
+        status=swap.status,
+        created_at=swap.created_at,
+    )
+
+
+def _conflict(exc: SwapError) -> HTTPException:
+    return HTTPException(status_code=409, detail=jsonable_encoder([asdict(problem) for problem in exc.problems]))
+
+
+@router.get("/{solve_run_id}/swaps", response_model=list[SwapRead])
+def list_swaps(
+    solve_run_id: int,
+    status: str | None = None,
+    tenant: Tenant = Depends(get_tenant),
+    conditional: Conditional = Depends(),
+) -> list[SwapRead]:
+    board = _board(tenant, solve_run_id)
+    conditional.check(solve_run_id, board.version)
+    return [_swap_read(swap) for swap in board.swaps(status.upper() if status else None)]
+
+
+@router.post("/{solve_run_id}/swaps", response_model=SwapRead)
+def propose_swap(solve_run_id: int, payload: SwapCreate, tenant: Tenant = Depends(get_tenant)) -> SwapRead:
+    board = _board(tenant, solve_run_id)
+    for call_type in (payload.call_type, payload.return_call_type):
+        if call_type is not None and call_type not in CALL_POOLS:
+            raise HTTPException(status_code=422, detail=f"Unknown call type: {call_type}")
+    if (payload.return_date is None) != (payload.return_call_type is None):
+        raise HTTPException(status_code=422, detail="A trade needs both return_date and return_call_type")
+    missing = [initials for initials in (payload.giver, payload.taker) if initials not in board.providers]
+    if missing:
+        raise HTTPException(status_code=422, detail=f"Unknown provider: {missing[0]}")
+    if payload.giver == payload.taker:
+        raise HTTPException(status_code=422, detail="A provider cannot swap with themselves")
+    try:
+        swap = board.propose(
+            board.providers[payload.giver],
+            board.providers[payload.taker],
+            payload.date,
+            payload.call_type,
+            payload.return_date,
+            payload.return_call_type,
+        )
+    except SwapError as exc:
+        raise _conflict(exc) from exc
+    return _swap_read(swap)
+
+
+@router.post("/{solve_run_id}/swaps/{swap_id}/accept", response_model=SwapRead)
+def accept_swap(solve_run_id: int, swap_id: int, tenant: Tenant = Depends(get_tenant)) -> SwapRead:
+    swap = _open_swap(_board(tenant, solve_run_id), swap_id)
+    try:
+        tenant.accept_swap(solve_run_id, swap)
+    except SwapError as exc:
+        raise _conflict(exc) from exc
+    return _swap_read(swap)
+
+
+@router.post("/{solve_run_id}/swaps/{swap_id}/decline", response_model=SwapRead)
+def decline_swap(solve_run_id: int, swap_id: int, tenant: Tenant = Depends(get_tenant)) -> SwapRead:
+    board = _board(tenant, solve_run_id)
+    return _swap_read(board.decline(_open_swap(board, swap_id)))
@@ -1,17 +1,34 @@
 from __future__ import annotations
 
-from fastapi import APIRouter, Depends, HTTPException
+from dataclasses import asdict
+from datetime import timedelta
 
-from app.db.session import get_session
-from app.models import Provider, VacationAllowance, VacationRequest
-from app.schemas.common import VacationAllowanceRead, VacationRequestCreate, VacationRequestRead, VacationRequestUpdate
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+
+from app.api.deps import Conditional, admitted, editable_run, get_tenant
+from app.core.calendar import calendar_for
+from app.models import Holiday, Provider, VacationAllowance, VacationRequest
+from app.schemas.common import (
+    FeasibilityCheck,
+    FeasibilityRead,
+    VacationAllowanceRead,
+    VacationImportRead,
+    VacationRequestCreate,
+    VacationRequestRead,
+    VacationRequestUpdate,
+)
+from app.services.feasibility import Absence, FeasibilityResult
+from app.services.tenants import Tenant
+from app.services.vacation_import import IMPORT_FORMATS, VacationImportError, import_vacations, parse_rows
+from app.solver.engine import solve_schedule
+from app.solver.pins import load_pins, repair_schedule
 
 router = APIRouter()
 
 
-def _get_session():
-    with get_session() as session:
-        yield session
+def _get_session(tenant: Tenant = Depends(get_tenant)):
+    return tenant.session
 
 
 @router.post("/requests", response_model=VacationRequestRead)
@@ -27,6 +44,113 @@ def create_vacation_request(payload: VacationRequestCreate, session=Depends(_get
     return vacation
 
 
+_IMPORT_MEDIA_TYPES = {
+    "text/csv": "csv",
+    "application/json": "json",
+    "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet": "xlsx",
+}
+
+
+def _apply_import(
+    tenant: Tenant, rows: list[dict], solve_run_id: int | None, resolve: bool
+) -> VacationImportRead:
+    session = tenant.session
+    solve_run = schedule = rules = None
+    if solve_run_id is not None:
+        solve_run = editable_run(tenant, solve_run_id)
+        schedule = tenant.schedule_for(solve_run_id)
+        if solve_run is None or schedule is None:
+            raise HTTPException(status_code=404, detail="Solve run not found")
+        try:
+            rules = tenant.rules.get(solve_run.rules_version) if solve_run.rules_version else tenant.rules.active
+        except KeyError as exc:
+            raise HTTPException(status_code=409, detail="Rules version of the base run is no longer available") from exc
+
+    try:
+        result = import_vacations(session, rows)
+    except VacationImportError as exc:
+        raise HTTPException(status_code=422, detail=[asdict(issue) for issue in exc.issues]) from exc
+
+    response = VacationImportRead(created=result.created)
+    if result.window is None or not resolve:
+        return response
+    since, until = result.window
+    response.window_start, response.window_end = since, until
+    # One re-solve for the whole batch: repair the given run, or solve the affected weeks afresh.
+    if solve_run is not None:
+        if since <= solve_run.end_date and until >= solve_run.start_date:
+            since, until = max(since, solve_run.start_date), min(until, solve_run.end_date)
+            with tenant.run_lock(solve_run.id):
+                repaired = repair_schedule(
+                    session, schedule, solve_run.start_date, solve_run.end_date, rules, since, until
+                )
+                tenant.run_changed(solve_run.id, since, until)
+            response.solve_run_id, response.revision = solve_run.id, repaired.revision
+        return response
+    table = calendar_for(since, until, session.all(Holiday))
+    start, end = table.week_start(since), table.week_start(until) + timedelta(days=4)
+    schedule = solve_schedule(session, start, end, tenant.rules.active, load_pins(session, start, end))
+    solve_run = tenant.record_run(start, end, schedule)
+    response.solve_run_id, response.revision = solve_run.id, schedule.revision
+    return response
+
+
+@router.post("/import", response_model=VacationImportRead)
+async def import_vacation_requests(
+    request: Request,
+    format: str | None = Query(default=None),
+    solve_run_id: int | None = Query(default=None),
+    resolve: bool = Query(default=True),
+    tenant: Tenant = Depends(get_tenant),
+) -> VacationImportRead:
+    fmt = format or _IMPORT_MEDIA_TYPES.get(request.headers.get("content-type", "").split(";")[0].strip())
+    if fmt not in IMPORT_FORMATS:
+        raise HTTPException(status_code=415, detail=f"Import format must be one of: {', '.join(IMPORT_FORMATS)}")
+    try:
+        rows = parse_rows(await request.body(), fmt)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    async with admitted("solve"):
+        return await run_in_threadpool(_apply_import, tenant, rows, solve_run_id, resolve)
+
+
+def _feasibility_read(result: FeasibilityResult) -> FeasibilityRead:
+    return FeasibilityRead(
+        feasible=result.feasible,
+        checked_blocks=result.checked,
+        min_slack=result.min_slack,
+        gaps=result.gaps,
+    )
+
+
+@router.post("/feasibility", response_model=FeasibilityRead)
+def check_feasibility(payload: FeasibilityCheck, tenant: Tenant = Depends(get_tenant)) -> FeasibilityRead:
+    session = tenant.session
+    absences = []
+    for request_id in payload.request_ids:
+        vacation = session.get(VacationRequest, request_id)
+        if not vacation:
+            raise HTTPException(status_code=404, detail=f"Vacation request not found: {request_id}")
+        absences.append(Absence(vacation.provider_id, vacation.start_date, vacation.end_date))
+    for vacation in payload.vacations:
+        if not session.get(Provider, vacation.provider_id):
+            raise HTTPException(status_code=404, detail="Provider not found")
+        absences.append(Absence(vacation.provider_id, vacation.start_date, vacation.end_date))
+    return _feasibility_read(tenant.feasibility_index(tenant.rules.active).check(absences))
+
+
+@router.get("/requests/{request_id}/feasibility", response_model=FeasibilityRead)
+def check_request_feasibility(
+    request_id: int, tenant: Tenant = Depends(get_tenant), conditional: Conditional = Depends()
+) -> FeasibilityRead:
+    conditional.check(*conditional.data_version())
+    vacation = tenant.session.get(VacationRequest, request_id)
+    if not vacation:
+        raise HTTPException(status_code=404, detail="Vacation request not found")
+    absence = Absence(vacation.provider_id, vacation.start_date, vacation.end_date)
+    return _feasibility_read(tenant.feasibility_index(tenant.rules.active).check([absence]))
+
+
 @router.patch("/requests/{request_id}", response_model=VacationRequestRead)
 def update_vacation_request(request_id: int, payload: VacationRequestUpdate, session=Depends(_get_session)) -> VacationRequest:
     vacation = session.get(VacationRequest, request_id)
@@ -43,7 +167,12 @@ def update_vacation_request(request_id: int, payload: VacationRequestUpdate, ses
 
 
 @router.get("/allowances/{provider_id}/{year}", response_model=VacationAllowanceRead)
-def get_allowance(provider_id: int, year: int, session=Depends(_get_session)) -> VacationAllowance:
+def get_allowance(
+    provider_id: int, year: int, tenant: Tenant = Depends(get_tenant), conditional: Conditional = Depends()
+) -> VacationAllowance:
+    session = tenant.session
+    # Only changes that concern this provider invalidate it.
+    conditional.check(tenant.provider_versions.version(provider_id))
     allowance = next(
         (
             allowance
@@ -1,16 +1,16 @@
 from __future__ import annotations
 
-import json
-from functools import lru_cache
 from pathlib import Path
 
-from app.core.config import settings
+from app.config.registry import CompiledRules, RulesRegistry, RulesValidationError, get_rules_registry, parse_rules
 
 
-@lru_cache
 def load(path: Path | None = None) -> dict:
-    target = path or settings.rules_config_path
-    if not target.exists():
+    if path is None:
+        return dict(get_rules_registry().active.raw)
+    if not path.exists():
         return {}
-    with target.open("r", encoding="utf-8") as fh:
-        return json.load(fh)
\ No newline at end of file
+    return parse_rules(path.read_text(encoding="utf-8"))
+
+
+__all__ = ["CompiledRules", "RulesRegistry", "RulesValidationError", "get_rules_registry", "load"]
@@ -0,0 +1,383 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Collection, Iterable, Mapping
+
+import yaml
+
+from app.core.config import settings
+from app.models import Provider
+
+
+class RulesValidationError(ValueError):
+    pass
+
+
+WEEKEND_CALL_MODES = ("rotation", "flow")
+ROTATION_MODES = ("cycle", "load")
+DAILY_MODES = ("greedy", "matching")
+
+
+@dataclass(frozen=True)
+class IcdClinicRules:
+    enabled: bool = False
+    ep_mds: tuple[str, ...] = ()
+    ep_apns: tuple[str, ...] = ()
+    nmc_days: frozenset[int] = frozenset()
+
+
+@dataclass(frozen=True)
+class OblRules:
+    enabled: bool = False
+    physicians: tuple[str, ...] = ()
+
+
+@dataclass(frozen=True)
+class AllocationRules:
+    weekend_call: str = "rotation"
+    rotation: str = "cycle"
+    daily: str = "greedy"
+    daily_workers: int = 1
+
+
+@dataclass(frozen=True)
+class WeekendTargets:
+    defaults: dict[str, int] = field(default_factory=dict)
+    overrides: dict[str, dict[str, int]] = field(default_factory=dict)
+
+    def target_for(self, provider: Provider) -> int:
+        by_type = self.overrides.get(provider.type, {})
+        if provider.initials in by_type:
+            return by_type[provider.initials]
+        return self.defaults.get(provider.type, 0)
+
+
+@dataclass(frozen=True)
+class BoundRules:
+    rules: CompiledRules
+    rotations: dict[str, tuple[Provider, ...]]
+    icd_ep_mds: tuple[Provider, ...]
+    icd_ep_apns: tuple[Provider, ...]
+    obl_physicians: tuple[Provider, ...]
+
+    def rotation(self, name: str) -> tuple[Provider, ...]:
+        return self.rotations.get(name, ())
+
+
+@dataclass(frozen=True)
+class CompiledRules:
+    version: str
+    weights: dict[str, float]
+    weekend_targets: WeekendTargets
+    rotations: dict[str, tuple[str, ...]]
+    icd_clinic: IcdClinicRules
+    obl: OblRules
+    raw: dict[str, Any]
+    allocation: AllocationRules = AllocationRules()
+
+    def bind(self, providers_by_initials: Mapping[str, Provider]) -> BoundRules:
+        def resolve(initials: Iterable[str]) -> tuple[Provider, ...]:
+            return tuple(providers_by_initials[i] for i in initials if i in providers_by_initials)
+
+        return BoundRules(
+            rules=self,
+            rotations={name: resolve(members) for name, members in self.rotations.items()},
+            icd_ep_mds=resolve(self.icd_clinic.ep_mds),
+            icd_ep_apns=resolve(self.icd_clinic.ep_apns),
+            obl_physicians=resolve(self.obl.physicians) if self.obl.enabled else (),
+        )
+
+
+@dataclass(frozen=True)
+class RulesVersionInfo:
+    version: str
+    created_at: str
+    source: str
+
+
+# parsing & compilation ---------------------------------------------------
+
+
+def parse_rules(raw: str | Mapping[str, Any]) -> dict[str, Any]:
+    if isinstance(raw, Mapping):
+        data = dict(raw)
+    else:
+        try:
+            # JSON is a subset of YAML, so this accepts both on-disk formats.
+            data = yaml.safe_load(raw) if raw.strip() else {}
+        except yaml.YAMLError as exc:
+            raise RulesValidationError(f"Unparseable rules document: {exc}") from exc
+    if data is None:
+        data = {}
+    if not isinstance(data, dict):
+        raise RulesValidationError("Rules document must be a mapping")
+    return data
+
+
+def content_hash(data: Mapping[str, Any]) -> str:
+    canonical = json.dumps(data, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:16]
+
+
+def _section(data: Mapping[str, Any], key: str) -> Mapping[str, Any]:
+    value = data.get(key, {})
+    if value is None:
+        return {}
+    if not isinstance(value, Mapping):
+        raise RulesValidationError(f"'{key}' must be a mapping")
+    return value
+
+
+def _initials(value: Any, where: str) -> tuple[str, ...]:
+    if value is None:
+        return ()
+    if not isinstance(value, list) or not all(isinstance(item, str) for item in value):
+        raise RulesValidationError(f"'{where}' must be a list of provider initials")
+    return tuple(value)
+
+
+def _int(value: Any, where: str) -> int:
+    if isinstance(value, bool) or not isinstance(value, int):
+        raise RulesValidationError(f"'{where}' must be an integer")
+    return value
+
+
+def compile_rules(data: Mapping[str, Any], version: str | None = None) -> CompiledRules:
+    weights: dict[str, float] = {}
+    for key, value in _section(data, "weights").items():
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise RulesValidationError(f"'weights.{key}' must be numeric")
+        weights[key] = float(value)
+
+    defaults: dict[str, int] = {}
+    overrides: dict[str, dict[str, int]] = {}
+    for provider_type, spec in _section(data, "weekend_targets").items():
+        if not isinstance(spec, Mapping):
+            raise RulesValidationError(f"'weekend_targets.{provider_type}' must be a mapping")
+        defaults[provider_type] = _int(spec.get("default", 0), f"weekend_targets.{provider_type}.default")
+        overrides[provider_type] = {
+            initials: _int(target, f"weekend_targets.{provider_type}.overrides.{initials}")
+            for initials, target in _section(spec, "overrides").items()
+        }
+
+    rotations = {
+        name: _initials(members, f"rotations.{name}") for name, members in _section(data, "rotations").items()
+    }
+
+    icd = _section(data, "icd_clinic")
+    nmc_days = frozenset(_int(day, "icd_clinic.nmc_days") for day in icd.get("nmc_days", []) or [])
+    if any(day < 0 or day > 6 for day in nmc_days):
+        raise RulesValidationError("'icd_clinic.nmc_days' must be weekday numbers 0-6")
+    icd_rules = IcdClinicRules(
+        enabled=bool(icd.get("enabled", False)),
+        ep_mds=_initials(icd.get("ep_mds"), "icd_clinic.ep_mds"),
+        ep_apns=_initials(icd.get("ep_apns"), "icd_clinic.ep_apns"),
+        nmc_days=nmc_days,
+    )
+
+    obl = _section(data, "obl")
+    obl_rules = OblRules(
+        enabled=bool(obl.get("enabled", True)),
+        physicians=_initials(obl.get("physicians"), "obl.physicians"),
+    )
+
+    allocation = _section(data, "allocation")
+    weekend_call = allocation.get("weekend_call", "rotation")
+    if weekend_call not in WEEKEND_CALL_MODES:
+        raise RulesValidationError(f"'allocation.weekend_call' must be one of {', '.join(WEEKEND_CALL_MODES)}")
+    rotation_mode = allocation.get("rotation", "cycle")
+    if rotation_mode not in ROTATION_MODES:
+        raise RulesValidationError(f"'allocation.rotation' must be one of {', '.join(ROTATION_MODES)}")
+    daily = allocation.get("daily", "greedy")
+    if daily not in DAILY_MODES:
+        raise RulesValidationError(f"'allocation.daily' must be one of {', '.join(DAILY_MODES)}")
+    daily_workers = _int(allocation.get("daily_workers", 1), "allocation.daily_workers")
+    if daily_workers < 1:
+        raise RulesValidationError("'allocation.daily_workers' must be at least 1")
+
+    return CompiledRules(
+        version=version or content_hash(data),
+        weights=weights,
+        weekend_targets=WeekendTargets(defaults=defaults, overrides=overrides),
+        rotations=rotations,
+        icd_clinic=icd_rules,
+        obl=obl_rules,
+        raw=dict(data),
+        allocation=AllocationRules(
+            weekend_call=weekend_call, rotation=rotation_mode, daily=daily, daily_workers=daily_workers
+        ),
+    )
+
+
+def check_rules(compiled: CompiledRules, known_initials: Collection[str] | None = None) -> None:
+    """Refuse rules a solve cannot run on: no rotations, or initials ``bind`` would drop."""
+    if not any(compiled.rotations.values()):
+        raise RulesValidationError("Rules define no rotations")
+    if known_initials is None:
+        return
+    named = [(f"rotations.{name}", members) for name, members in compiled.rotations.items()]
+    named += [
+        ("icd_clinic.ep_mds", compiled.icd_clinic.ep_mds),
+        ("icd_clinic.ep_apns", compiled.icd_clinic.ep_apns),
+        ("obl.physicians", compiled.obl.physicians),
+    ]
+    for where, members in named:
+        unknown = [initials for initials in members if initials not in known_initials]
+        if unknown:
+            raise RulesValidationError(f"'{where}' names unknown providers: {', '.join(unknown)}")
+
+
+# registry ----------------------------------------------------------------
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _atomic_write(path: Path, text: str) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp.write_text(text, encoding="utf-8")
+    os.replace(tmp, path)
+
+
+class RulesRegistry:
+    INDEX_NAME = "index.json"
+
+    def __init__(self, seed_path: Path, store_path: Path | None = None) -> None:
+        self.seed_path = seed_path
+        self.store_path = store_path
+        self._lock = threading.Lock()
+        self._compiled: dict[str, CompiledRules] = {}
+        self._history: list[RulesVersionInfo] = []
+        self._active: CompiledRules | None = None
+        # Content hash of the seed file the stored history last took in.
+        self._seed_version: str | None = None
+
+    @property
+    def active(self) -> CompiledRules:
+        active = self._active
+        if active is None:
+            active = self._ensure_loaded()
+        return active
+
+    def _ensure_loaded(self) -> CompiledRules:
+        with self._lock:
+            if self._active is None:
+                self._bootstrap()
+            return self._active
+
+    def get(self, version: str) -> CompiledRules:
+        self._ensure_loaded()
+        compiled = self._compiled.get(version)
+        if compiled is None:
+            compiled = self._load_stored(version)
+            if compiled is None:
+                raise KeyError(version)
+            self._compiled[version] = compiled
+        return compiled
+
+    def history(self) -> list[RulesVersionInfo]:
+        self._ensure_loaded()
+        return list(self._history)
+
+    def publish(
+        self,
+        raw: str | Mapping[str, Any],
+        source: str = "upload",
+        activate: bool = True,
+        known_initials: Collection[str] | None = None,
+    ) -> CompiledRules:
+        data = parse_rules(raw)
+        version = content_hash(data)
+        self._ensure_loaded()
+        with self._lock:
+            # Validation happens here, before anything is persisted or swapped.
+            compiled = self._compiled.get(version) or compile_rules(data, version)
+            check_rules(compiled, known_initials)
+            self._compiled[version] = compiled
+            if all(info.version != version for info in self._history):
+                self._history.append(
+                    RulesVersionInfo(version=version, created_at=_now(), source=source)
+                )
+            if activate:
+                self._active = compiled
+            self._write_index()
+        return compiled
+
+    def activate(self, version: str) -> CompiledRules:
+        compiled = self.get(version)
+        with self._lock:
+            self._active = compiled
+            self._write_index()
+        return compiled
+
+    # persistence ---------------------------------------------------------
+    def _bootstrap(self) -> None:
+        index = self._read_index() or {}
+        self._history = [RulesVersionInfo(**entry) for entry in index.get("versions", [])]
+        data = parse_rules(self.seed_path.read_text(encoding="utf-8")) if self.seed_path.exists() else {}
+        seed_version = content_hash(data)
+        # Indexes written before the seed hash was recorded only know the seed from its history entry.
+        known = any(info.version == seed_version for info in self._history)
+        recorded = index.get("seed", seed_version if known else None)
+        active_version = index.get("active")
+        if active_version and recorded == seed_version:
+            compiled = self._load_stored(active_version)
+            if compiled is not None:
+                self._compiled[active_version] = compiled
+                self._active = compiled
+                self._seed_version = seed_version
+                return
+
+        # First start, or the seed file was edited since: it becomes the active version.
+        compiled = compile_rules(data, seed_version)
+        self._compiled[compiled.version] = compiled
+        if all(info.version != compiled.version for info in self._history):
+            self._history.append(RulesVersionInfo(version=compiled.version, created_at=_now(), source="seed"))
+        self._active = compiled
+        self._seed_version = seed_version
+        if index:
+            self._write_index()
+
+    def _load_stored(self, version: str) -> CompiledRules | None:
+        if self.store_path is None:
+            return None
+        path = self.store_path / f"{version}.json"
+        if not path.exists():
+            return None
+        return compile_rules(json.loads(path.read_text(encoding="utf-8")), version)
+
+    def _read_index(self) -> dict | None:
+        if self.store_path is None:
+            return None
+        path = self.store_path / self.INDEX_NAME
+        if not path.exists():
+            return None
+        return json.loads(path.read_text(encoding="utf-8"))
+
+    def _write_index(self) -> None:
+        if self.store_path is None:
+            return
+        for info in self._history:
+            path = self.store_path / f"{info.version}.json"
+            if not path.exists() and info.version in self._compiled:
+                _atomic_write(path, json.dumps(self._compiled[info.version].raw, sort_keys=True, indent=2))
+        payload = {
+            "active": self._active.version if self._active else None,
+            "seed": self._seed_version,
+            "versions": [asdict(info) for info in self._history],
+        }
+        _atomic_write(self.store_path / self.INDEX_NAME, json.dumps(payload, indent=2))
+
+
+@lru_cache
+def get_rules_registry() -> RulesRegistry:
+    return RulesRegistry(settings.rules_config_path, settings.rules_store_path)
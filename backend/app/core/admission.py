@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import asyncio
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Callable, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+class Saturated(Exception):
+    def __init__(self, retry_after: int) -> None:
+        super().__init__(f"Admission queue is full; retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class AdmissionGate:
+    """At most ``concurrency`` holders and ``queue`` waiters; anyone beyond that is turned away.
+
+    Lives on the event loop, so waiting for a slot does not hold a worker thread.
+    """
+
+    def __init__(self, concurrency: int, queue: int, service_time: float = 1.0) -> None:
+        self.concurrency = concurrency
+        self.queue = queue
+        self.active = 0
+        self._waiters: deque[asyncio.Future[None]] = deque()
+        # Moving average of how long a slot is held, for Retry-After.
+        self._service_time = service_time
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    def retry_after(self) -> int:
+        backlog = self.active + len(self._waiters)
+        return max(1, math.ceil(self._service_time * backlog / max(self.concurrency, 1)))
+
+    async def acquire(self) -> None:
+        if self.active < self.concurrency and not self._waiters:
+            self.active += 1
+            return
+        if len(self._waiters) >= self.queue:
+            raise Saturated(self.retry_after())
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+            elif not waiter.cancelled():
+                # The slot was handed over just as the caller gave up; pass it on.
+                self.release()
+            raise
+
+    def release(self, held: float | None = None) -> None:
+        if held is not None:
+            self._service_time += 0.2 * (held - self._service_time)
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                # Hand the slot straight to the next waiter; ``active`` stays the same.
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        await self.acquire()
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.release(time.monotonic() - started)
+
+
+class SingleFlight:
+    """Concurrent calls with the same key share one execution and its outcome."""
+
+    def __init__(self) -> None:
+        self._calls: dict[Hashable, asyncio.Future] = {}
+
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+    async def run(self, key: Hashable, call: Callable[[], Awaitable[T]]) -> T:
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(call())
+            self._calls[key] = task
+            task.add_done_callback(lambda _: self._calls.pop(key, None))
+        # A caller that goes away must not cancel the work the others are waiting on.
+        return await asyncio.shield(task)
@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+from datetime import date, timedelta
+from functools import lru_cache
+from typing import Iterable, Sequence
+
+
+@dataclass(frozen=True)
+class HolidayRule:
+    name: str
+    month: int
+    day: int | None = None
+    weekday: int | None = None
+    nth: int | None = None
+    observed: bool = True
+
+    def actual(self, year: int) -> date:
+        if self.day is not None:
+            return date(year, self.month, self.day)
+        if self.nth is not None and self.nth < 0:
+            last = date(year + (self.month == 12), self.month % 12 + 1, 1) - timedelta(days=1)
+            return last - timedelta(days=(last.weekday() - self.weekday) % 7 + 7 * (-self.nth - 1))
+        first = date(year, self.month, 1)
+        return first + timedelta(days=(self.weekday - first.weekday()) % 7 + 7 * (self.nth - 1))
+
+    def observed_on(self, year: int) -> tuple[date, str]:
+        actual = self.actual(year)
+        if not self.observed or actual.weekday() < 5:
+            return actual, self.name
+        # Saturday holidays are observed the Friday before, Sunday holidays the Monday after.
+        shift = -1 if actual.weekday() == 5 else 1
+        return actual + timedelta(days=shift), f"{self.name} Observed"
+
+
+FEDERAL_HOLIDAY_RULES: tuple[HolidayRule, ...] = (
+    HolidayRule("New Year's Day", 1, day=1),
+    HolidayRule("MLK Day", 1, weekday=0, nth=3),
+    HolidayRule("Presidents Day", 2, weekday=0, nth=3),
+    HolidayRule("Memorial Day", 5, weekday=0, nth=-1),
+    HolidayRule("Independence Day", 7, day=4),
+    HolidayRule("Labor Day", 9, weekday=0, nth=1),
+    HolidayRule("Thanksgiving", 11, weekday=3, nth=4),
+    HolidayRule("Christmas", 12, day=25),
+)
+
+
+def holidays_between(
+    start: date, end: date, rules: Iterable[HolidayRule] = FEDERAL_HOLIDAY_RULES
+) -> list[tuple[date, str]]:
+    rules = tuple(rules)
+    found = []
+    # Observed shifts can cross a year boundary (New Year's on a Saturday), so look one year either side.
+    for year in range(start.year - 1, end.year + 2):
+        for rule in rules:
+            day, name = rule.observed_on(year)
+            if start <= day <= end:
+                found.append((day, name))
+    return sorted(found)
+
+
+def federal_holidays(year: int) -> list[tuple[date, str]]:
+    return holidays_between(date(year, 1, 1), date(year, 12, 31))
+
+
+HolidayFlags = tuple[tuple[date, bool, bool], ...]
+
+
+class CalendarTable:
+    """Per-day columns for whole years, built once and sliced with bisect."""
+
+    def __init__(self, first_year: int, last_year: int, holidays: HolidayFlags = ()) -> None:
+        start = date(first_year, 1, 1)
+        end = date(last_year, 12, 31)
+        # Pad to whole weeks, plus one more, so a window's last call weekend is always covered.
+        start -= timedelta(days=start.weekday())
+        end += timedelta(days=13 - end.weekday())
+        self.first_ordinal = start.toordinal()
+        self.dates: tuple[date, ...] = tuple(start + timedelta(days=i) for i in range((end - start).days + 1))
+        self.ordinals: tuple[int, ...] = tuple(range(self.first_ordinal, end.toordinal() + 1))
+        self.weekdays: tuple[int, ...] = tuple(i % 7 for i in range(len(self.dates)))
+        self.iso_weeks: tuple[int, ...] = tuple(d.isocalendar()[1] for d in self.dates)
+        closed = {day: extend for day, is_closed, extend in holidays if is_closed}
+        self.holiday: tuple[bool, ...] = tuple(d in closed for d in self.dates)
+        self.extend_weekend: tuple[bool, ...] = tuple(closed.get(d, False) for d in self.dates)
+        self.workday: tuple[bool, ...] = tuple(w < 5 and not h for w, h in zip(self.weekdays, self.holiday))
+        self.weekday_dates: tuple[date, ...] = tuple(d for d, w in zip(self.dates, self.weekdays) if w < 5)
+        self.week_starts: tuple[date, ...] = self.dates[::7]
+
+    @property
+    def start(self) -> date:
+        return self.dates[0]
+
+    @property
+    def end(self) -> date:
+        return self.dates[-1]
+
+    def index(self, day: date) -> int:
+        return day.toordinal() - self.first_ordinal
+
+    def between(self, start: date, end: date) -> Sequence[date]:
+        return self.dates[max(self.index(start), 0) : max(self.index(end) + 1, 0)]
+
+    def weekdays_between(self, start: date, end: date) -> Sequence[date]:
+        days = self.weekday_dates
+        return days[bisect_left(days, start) : bisect_right(days, end)]
+
+    def mondays_between(self, start: date, end: date) -> Sequence[date]:
+        weeks = self.week_starts
+        return weeks[bisect_left(weeks, start) : bisect_right(weeks, end)]
+
+    def week_start(self, day: date) -> date:
+        return self.week_starts[self.index(day) // 7]
+
+    def first_monday(self, day: date) -> date:
+        index = self.index(day)
+        return self.week_starts[-(-index // 7)]
+
+    def week(self, monday: date) -> Sequence[date]:
+        index = self.index(monday)
+        return self.dates[index : index + 7]
+
+
+@lru_cache(maxsize=32)
+def _table(first_year: int, last_year: int, holidays: HolidayFlags) -> CalendarTable:
+    return CalendarTable(first_year, last_year, holidays)
+
+
+def calendar_for(start: date, end: date, holidays: Iterable[object] = ()) -> CalendarTable:
+    """Cached table covering the years of ``start``..``end``; ``holidays`` are Holiday rows."""
+    flags = tuple(
+        sorted((h.date, h.is_office_closed, h.extend_weekend) for h in holidays if start.year <= h.date.year <= end.year)
+    )
+    # Keyed on whole years so windows inside the same years share one table.
+    return _table(start.year, end.year, flags)
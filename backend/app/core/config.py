@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import os
 from dataclasses import dataclass
 from functools import lru_cache
 from pathlib import Path
@@ -9,6 +10,16 @@ from typing import Any
 BASE_DIR = Path(__file__).resolve().parent.parent
 
 
+def _user_dir(variable: str, default: str) -> Path:
+    base = os.environ.get(variable)
+    return (Path(base) if base else Path.home() / default) / "cardio-scheduler"
+
+
+# Files the app writes at runtime live outside the source tree.
+STATE_DIR = _user_dir("XDG_STATE_HOME", ".local/state")
+CACHE_DIR = _user_dir("XDG_CACHE_HOME", ".cache")
+
+
 @dataclass
 class Settings:
     app_name: str = "Cardio Scheduler"
@@ -16,7 +27,19 @@ class Settings:
     sync_database_url: str = "memory://"
     template_path: Path = BASE_DIR / "templates/2026_WORKBOOK_TEMPLATE.xlsx"
     rules_config_path: Path = BASE_DIR / "config/rules_config.yaml"
+    rules_store_path: Path = STATE_DIR / "rules_versions"
     mapping_config_path: Path = BASE_DIR / "config/mapping.yaml"
+    tenants_config_path: Path = BASE_DIR / "config/tenants.yaml"
+    export_cache_path: Path = CACHE_DIR / "exports"
+    export_cache_max_bytes: int = 256 * 1024 * 1024
+    # Directory for per-tenant run archives; solved runs are only kept in memory when unset.
+    archive_path: Path | None = None
+    # Accepted swaps a run collects before it is re-archived; Tenant.flush_archive writes the rest.
+    archive_swap_batch: int = 16
+    solve_concurrency: int = 2
+    solve_queue: int = 8
+    export_concurrency: int = 4
+    export_queue: int = 32
     seed_window_start: str = "2026-01-05"
     seed_window_end: str = "2026-03-27"
 
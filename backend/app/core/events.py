@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Callable, Iterable
+
+
+@dataclass(frozen=True)
+class ChangeEvent:
+    """Something a cache or index may have been built from has changed.
+
+    ``start``/``end`` bound the dates whose schedule the change can affect and
+    ``provider_ids`` the providers it concerns; an event without dates (a new
+    coverage rule, a rules upload) can affect any date, one without providers
+    any provider.
+    """
+
+    entity: str
+    entity_id: int | str | None
+    action: str
+    start: date | None = None
+    end: date | None = None
+    provider_ids: frozenset[int] = frozenset()
+
+    @property
+    def dated(self) -> bool:
+        return self.start is not None and self.end is not None
+
+    def overlaps(self, start: date, end: date) -> bool:
+        return not self.dated or (self.start <= end and self.end >= start)
+
+    def weeks(self, start: date | None = None, end: date | None = None) -> list[date]:
+        """Mondays of the affected weeks, clipped to ``start..end`` when given."""
+        first = max(d for d in (self.start, start) if d is not None)
+        last = min(d for d in (self.end, end) if d is not None)
+        monday = first - timedelta(days=first.weekday())
+        weeks = []
+        while monday <= last:
+            weeks.append(monday)
+            monday += timedelta(days=7)
+        return weeks
+
+
+Handler = Callable[[ChangeEvent], None]
+
+
+class EventBus:
+    """Synchronous in-process fan-out; handlers run on the publishing thread in subscription order.
+
+    Every handler sees every event it subscribed to; if one raises, the rest
+    still run and the first error is re-raised afterwards.
+    """
+
+    def __init__(self) -> None:
+        self._handlers: list[tuple[frozenset[str] | None, Handler]] = []
+        self._lock = threading.Lock()
+
+    def subscribe(self, handler: Handler, entities: Iterable[str] | None = None) -> Callable[[], None]:
+        entry = (frozenset(entities) if entities is not None else None, handler)
+        with self._lock:
+            self._handlers.append(entry)
+
+        def unsubscribe() -> None:
+            with self._lock:
+                if entry in self._handlers:
+                    self._handlers.remove(entry)
+
+        return unsubscribe
+
+    def publish(self, event: ChangeEvent) -> None:
+        self.publish_all((event,))
+
+    def publish_all(self, events: Iterable[ChangeEvent]) -> None:
+        with self._lock:
+            handlers = list(self._handlers)
+        error: Exception | None = None
+        for event in events:
+            for entities, handler in handlers:
+                if entities is not None and event.entity not in entities:
+                    continue
+                try:
+                    handler(event)
+                except Exception as exc:
+                    error = error or exc
+        if error is not None:
+            raise error
@@ -1,9 +1,12 @@
 from __future__ import annotations
 
+import threading
 from collections import defaultdict
 from contextlib import contextmanager
-from typing import Any, Dict, Iterable, List, Optional, Type, TypeVar
+from datetime import date
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple, Type, TypeVar
 
+from app.core.events import ChangeEvent, EventBus
 from app.models import (
     Assignment,
     CallRule,
@@ -21,25 +24,120 @@ from app.models import (
 
 T = TypeVar("T")
 
+# (first date, last date, provider ids) an instance bears on; dates are None when it bears on any date.
+Scope = Tuple[Optional[date], Optional[date], frozenset]
+
 
 class InMemorySession:
     def __init__(self) -> None:
         self._store: Dict[Type[Any], List[Any]] = defaultdict(list)
         self._id_counters: Dict[Type[Any], int] = defaultdict(int)
+        self._index: Dict[Type[Any], Dict[int, Any]] = defaultdict(dict)
         self._pending: List[Any] = []
+        self._lock = threading.RLock()
+        # Models whose list/index are still shared with a fork; copied on first write.
+        self._shared: Set[Type[Any]] = set()
+        # Bumped on every add/delete/commit; part of the ETag of anything derived from this data.
+        self.version = 0
+        # Changes since the last commit, published to ``events`` when it happens.
+        self.events = EventBus()
+        self._changes: List[ChangeEvent] = []
+        self._scopes: Dict[Tuple[Type[Any], int], Scope] = {}
+
+    def __getstate__(self) -> Dict[str, Any]:
+        state = self.__dict__.copy()
+        del state["_lock"]
+        del state["events"]
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.RLock()
+        self.events = EventBus()
+
+    def fork(self) -> "InMemorySession":
+        with self._lock:
+            child = InMemorySession()
+            child._store = defaultdict(list, self._store)
+            child._index = defaultdict(dict, self._index)
+            child._id_counters = defaultdict(int, self._id_counters)
+            child.version = self.version
+            child._scopes = dict(self._scopes)
+            shared = set(self._store) | set(self._index)
+            child._shared = set(shared)
+            self._shared |= shared
+        return child
+
+    def _own(self, model: Type[Any]) -> None:
+        if model in self._shared:
+            self._store[model] = list(self._store[model])
+            self._index[model] = dict(self._index[model])
+            self._shared.discard(model)
 
     def add(self, instance: Any) -> None:
-        if getattr(instance, "id", 0) in (0, None):
-            self._id_counters[type(instance)] += 1
-            instance.id = self._id_counters[type(instance)]
-        self._store[type(instance)].append(instance)
+        model = type(instance)
+        with self._lock:
+            self.version += 1
+            self._own(model)
+            if getattr(instance, "id", 0) in (0, None):
+                self._id_counters[model] += 1
+                instance.id = self._id_counters[model]
+            else:
+                self._id_counters[model] = max(self._id_counters[model], instance.id)
+            index = self._index[model]
+            scope = self._scope(instance)
+            previous = self._scopes.get((model, instance.id))
+            self._scopes[(model, instance.id)] = scope
+            if index.get(instance.id) is instance:
+                # Re-adding a tracked instance after mutating it only records the change.
+                self._record(instance, "updated", _union(previous, scope) if previous else scope)
+                return
+            index[instance.id] = instance
+            self._store[model].append(instance)
+            self._record(instance, "added", scope)
+
+    def delete(self, instance: Any) -> None:
+        model = type(instance)
+        with self._lock:
+            if self._index.get(model, {}).get(getattr(instance, "id", None)) is not instance:
+                return
+            self.version += 1
+            self._own(model)
+            del self._index[model][instance.id]
+            self._store[model] = [obj for obj in self._store[model] if obj is not instance]
+            scope = self._scopes.pop((model, instance.id), None) or self._scope(instance)
+            self._record(instance, "deleted", scope)
 
     def add_all(self, instances: Iterable[Any]) -> None:
         for instance in instances:
             self.add(instance)
 
     def commit(self) -> None:
-        return None
+        # Instances may have been mutated in place without a re-add.
+        with self._lock:
+            self.version += 1
+            changes, self._changes = self._changes, []
+        if changes:
+            self.events.publish_all(changes)
+
+    def _record(self, instance: Any, action: str, scope: Scope) -> None:
+        start, end, providers = scope
+        self._changes.append(ChangeEvent(type(instance).__name__, instance.id, action, start, end, providers))
+
+    def _scope(self, instance: Any) -> Scope:
+        if isinstance(instance, Provider):
+            return None, None, frozenset((instance.id,))
+        providers = frozenset((instance.provider_id,)) if getattr(instance, "provider_id", None) else frozenset()
+        if isinstance(instance, Assignment):
+            block = self.get(ScheduleBlock, instance.schedule_block_id)
+            return (block.date, block.date, providers) if block else (None, None, providers)
+        if isinstance(instance, VacationAllowance):
+            return date(instance.year, 1, 1), date(instance.year, 12, 31), providers
+        if hasattr(instance, "start_date") and hasattr(instance, "end_date"):
+            return instance.start_date, instance.end_date, providers
+        if isinstance(getattr(instance, "date", None), date):
+            return instance.date, instance.date, providers
+        return None, None, providers
 
     def rollback(self) -> None:
         return None
@@ -54,10 +152,7 @@ class InMemorySession:
         return None
 
     def get(self, model: Type[T], instance_id: int) -> Optional[T]:
-        for obj in self._store.get(model, []):
-            if getattr(obj, "id", None) == instance_id:
-                return obj
-        return None
+        return self._index.get(model, {}).get(instance_id)
 
     def all(self, model: Type[T]) -> List[T]:
         return list(self._store.get(model, []))
@@ -66,6 +161,13 @@ class InMemorySession:
         return [obj for obj in self._store.get(model, []) if predicate(obj)]
 
 
+def _union(a: Scope, b: Scope) -> Scope:
+    providers = a[2] | b[2]
+    if a[0] is None or b[0] is None:
+        return None, None, providers
+    return min(a[0], b[0]), max(a[1], b[1]), providers
+
+
 @contextmanager
 def get_session() -> Iterable[InMemorySession]:
     session = InMemorySession()
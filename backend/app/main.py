@@ -1,3 +1,5 @@
+import asyncio
+from contextlib import asynccontextmanager
 from datetime import date
 import os
 from tempfile import NamedTemporaryFile
@@ -7,9 +9,27 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import FileResponse
 from pydantic import BaseModel
 from typing import Optional, Dict
-from openpyxl import load_workbook
 
-app = FastAPI(title="CVA Scheduler API", docs_url="/docs", redoc_url="/redoc", openapi_url="/openapi.json")
+from app.api import router as api_router
+from app.services.tenants import get_tenants
+from app.services.warmup import warm_up
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Seeding, rules and template parsing run off the event loop so the server
+    # accepts connections at once; the first requests simply find them done.
+    app.state.warmup = asyncio.create_task(asyncio.to_thread(warm_up))
+    yield
+    app.state.warmup.cancel()
+    for tenant in get_tenants():
+        await asyncio.to_thread(tenant.flush_archive)
+
+
+app = FastAPI(
+    title="CVA Scheduler API", docs_url="/docs", redoc_url="/redoc", openapi_url="/openapi.json", lifespan=lifespan
+)
+app.include_router(api_router)
 
 app.add_middleware(
     CORSMiddleware,
@@ -18,7 +38,16 @@ app.add_middleware(
 
 @app.get("/health")
 def health():
-    return {"ok": True}
+    warmup = getattr(app.state, "warmup", None)
+    warm = warmup is not None and warmup.done() and not warmup.cancelled() and warmup.exception() is None
+    return {"ok": True, "warm": warm}
+
+
+def load_workbook(path: str):
+    # openpyxl is only needed by the grid-check exports below; importing it lazily keeps it off cold start.
+    from openpyxl import load_workbook as _load_workbook
+
+    return _load_workbook(path)
 
 @app.get("/")
 def home():
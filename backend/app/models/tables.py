@@ -127,6 +127,7 @@ class SolveRun:
     start_date: date = date.today()
     end_date: date = date.today()
     status: str = "PENDING"
+    rules_version: Optional[str] = None
     config_json: Dict[str, Any] = field(default_factory=dict)
     objective_breakdown_json: Optional[Dict[str, Any]] = None
     diagnostic_log: Optional[str] = None
@@ -1,9 +1,9 @@
 from __future__ import annotations
 
 from datetime import date, datetime
-from typing import Any
+from typing import Annotated, Any, Literal, Union
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 class AuditModel(BaseModel):
@@ -46,11 +46,37 @@ class VacationAllowanceRead(BaseModel):
         from_attributes = True
 
 
+class VacationImportRead(BaseModel):
+    created: list[VacationRequestRead]
+    window_start: date | None = None
+    window_end: date | None = None
+    solve_run_id: int | None = None
+    revision: int | None = None
+
+
+class FeasibilityCheck(BaseModel):
+    request_ids: list[int] = Field(default_factory=list)
+    vacations: list[VacationRequestCreate] = Field(default_factory=list)
+
+
 class SolveRequest(BaseModel):
     start_date: date
     end_date: date
     weights_override: dict[str, float] | None = None
     lock_blocks: list[int] | None = None
+    # Record every slot's candidates and rejection reasons; see /solve/{id}/trace.
+    trace: bool = False
+
+
+class BatchSolveJob(BaseModel):
+    tenant_id: str
+    start_date: date
+    end_date: date
+
+
+class BatchSolveRequest(BaseModel):
+    jobs: list[BatchSolveJob]
+    max_workers: int | None = None
 
 
 class SolveResponse(BaseModel):
@@ -58,12 +84,27 @@ class SolveResponse(BaseModel):
     status: str
 
 
+class SlotDecisionRead(BaseModel):
+    date: date
+    block: str | None
+    slot: str
+    winners: list[str]
+    rejected: list[tuple[str, str]]
+    pinned: bool
+
+
+class StaleWeekRead(BaseModel):
+    week_start: date
+    providers: list[str]  # empty when the change was not provider-specific
+
+
 class SolveStatusRead(BaseModel):
     id: int
     status: str
     label: str
     start_date: date
     end_date: date
+    rules_version: str | None = None
     objective_breakdown_json: dict[str, Any] | None = None
     diagnostic_log: str | None = None
 
@@ -74,8 +115,193 @@ class SolveStatusRead(BaseModel):
 class FairnessSummary(BaseModel):
     metric: str
     values: dict[str, Any]
+    start: date | None = None
+    end: date | None = None
 
 
 class CoverageSummary(BaseModel):
     site: str
-    coverage_gaps: list[str]
\ No newline at end of file
+    coverage_gaps: list[str]
+
+
+class RulesVersionRead(BaseModel):
+    version: str
+    created_at: str
+    source: str
+    active: bool = False
+
+
+class VacationEditIn(BaseModel):
+    kind: Literal["vacation"] = "vacation"
+    provider_initials: str
+    start_date: date
+    end_date: date
+    block: str = "FULLDAY"
+    provider_type: Literal["MD", "APN"] | None = None
+
+
+class HolidayEditIn(BaseModel):
+    kind: Literal["holiday"] = "holiday"
+    date: date
+    name: str = ""
+    is_office_closed: bool = True
+    extend_weekend: bool = True
+    remove: bool = False
+
+
+class RotationEditIn(BaseModel):
+    kind: Literal["rotation"] = "rotation"
+    rotation: str
+    order: list[str]
+
+
+ScenarioEditIn = Annotated[Union[VacationEditIn, HolidayEditIn, RotationEditIn], Field(discriminator="kind")]
+
+
+class ScenarioIn(BaseModel):
+    name: str
+    edits: list[ScenarioEditIn] = []
+
+
+class ScenarioRequest(BaseModel):
+    base_solve_run_id: int
+    scenarios: list[ScenarioIn]
+    max_workers: int | None = None
+
+
+class CoverageGapRead(BaseModel):
+    date: date
+    site_code: str
+    block: str
+    missing_md: int
+    missing_apn: int
+
+    class Config:
+        from_attributes = True
+
+
+class FeasibilityRead(BaseModel):
+    feasible: bool
+    checked_blocks: int
+    min_slack: int | None = None
+    gaps: list[CoverageGapRead]
+
+
+class SlotChangeRead(BaseModel):
+    date: date
+    slot: str
+    block: str | None = None
+    before: list[str]
+    after: list[str]
+
+    class Config:
+        from_attributes = True
+
+
+class ScenarioResultRead(BaseModel):
+    name: str
+    rules_version: str
+    coverage_gaps: list[CoverageGapRead]
+    fairness_deltas: dict[str, dict[str, int]]
+    changes: list[SlotChangeRead]
+
+    class Config:
+        from_attributes = True
+
+
+class ScheduleDiffRead(BaseModel):
+    base_solve_run_id: int
+    other_solve_run_id: int
+    weeks_compared: int
+    changed_weeks: list[date]
+    changes: list[SlotChangeRead]
+
+
+class PinIn(BaseModel):
+    date: date
+    slot: str
+    block: str | None = None
+    providers: list[str]
+
+
+class PinRequest(BaseModel):
+    pins: list[PinIn]
+
+
+class RepairRead(BaseModel):
+    solve_run_id: int
+    revision: int
+    changes: list[SlotChangeRead]
+
+
+class ExtendRequest(BaseModel):
+    end_date: date
+
+
+class ExtendRead(BaseModel):
+    solve_run_id: int
+    revision: int
+    start_date: date
+    end_date: date
+    added_assignments: int
+    added_calls: int
+
+
+class AssignmentRead(BaseModel):
+    date: date
+    block: str
+    site_code: str
+    site_type: str
+    providers: list[str]
+
+
+class CallRead(BaseModel):
+    date: date
+    call_type: str
+    label: str
+    providers: list[str]
+
+
+class AssignmentPage(BaseModel):
+    items: list[AssignmentRead]
+    next_cursor: str | None = None
+
+
+class CallPage(BaseModel):
+    items: list[CallRead]
+    next_cursor: str | None = None
+
+
+class SwapCreate(BaseModel):
+    giver: str
+    taker: str
+    date: date
+    call_type: str
+    return_date: date | None = None
+    return_call_type: str | None = None
+
+
+class SwapRead(BaseModel):
+    id: int
+    giver: str
+    taker: str
+    date: date
+    call_type: str
+    return_date: date | None = None
+    return_call_type: str | None = None
+    status: str
+    created_at: datetime
+
+
+class WorkbookIssueRead(BaseModel):
+    source: str
+    cell: str | None = None
+    message: str
+
+
+class HistoryImportRead(BaseModel):
+    solve_run_id: int
+    start_date: date
+    end_date: date
+    weeks: list[date]
+    issues: list[WorkbookIssueRead]
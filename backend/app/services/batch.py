@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import os
+from collections import OrderedDict, defaultdict, deque
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from dataclasses import dataclass
+from datetime import date
+from typing import Iterable, Iterator
+
+from app.config.registry import CompiledRules
+from app.db.session import InMemorySession
+from app.models import SolveRun
+from app.services.tenants import TenantRegistry
+from app.solver.engine import ScheduleOutput, solve_schedule
+
+
+@dataclass(frozen=True)
+class BatchJob:
+    tenant_id: str
+    start_date: date
+    end_date: date
+
+
+@dataclass(frozen=True)
+class TenantSnapshot:
+    session: InMemorySession
+    rules: CompiledRules
+
+
+# Reference data installed once per worker process by the pool initializer;
+# jobs only carry (tenant, window) so nothing large is pickled per job.
+_WORKER_SNAPSHOTS: dict[str, TenantSnapshot] = {}
+
+
+def _init_worker(snapshots: dict[str, TenantSnapshot]) -> None:
+    global _WORKER_SNAPSHOTS
+    _WORKER_SNAPSHOTS = snapshots
+
+
+def _solve_job(index: int, job: BatchJob) -> tuple[int, ScheduleOutput]:
+    snapshot = _WORKER_SNAPSHOTS[job.tenant_id]
+    return index, solve_schedule(snapshot.session, job.start_date, job.end_date, snapshot.rules)
+
+
+def fair_order(jobs: Iterable[BatchJob]) -> Iterator[tuple[int, BatchJob]]:
+    queues: OrderedDict[str, deque[tuple[int, BatchJob]]] = OrderedDict()
+    for index, job in enumerate(jobs):
+        queues.setdefault(job.tenant_id, deque()).append((index, job))
+    while queues:
+        for tenant_id in list(queues):
+            queue = queues[tenant_id]
+            yield queue.popleft()
+            if not queue:
+                del queues[tenant_id]
+
+
+def run_batch(
+    jobs: Iterable[BatchJob],
+    tenants: TenantRegistry,
+    max_workers: int | None = None,
+) -> dict[str, list[SolveRun]]:
+    jobs = list(jobs)
+    for job in jobs:
+        if tenants.get(job.tenant_id) is None:
+            raise KeyError(job.tenant_id)
+
+    snapshots: dict[str, TenantSnapshot] = {}
+    for tenant_id in dict.fromkeys(job.tenant_id for job in jobs):
+        tenant = tenants.get(tenant_id)
+        snapshots[tenant_id] = TenantSnapshot(session=tenant.session, rules=tenant.rules.active)
+    workers = min(max_workers or os.cpu_count() or 1, len(jobs))
+
+    schedules: dict[int, ScheduleOutput] = {}
+    if workers <= 1:
+        for index, job in fair_order(jobs):
+            snapshot = snapshots[job.tenant_id]
+            schedules[index] = solve_schedule(snapshot.session, job.start_date, job.end_date, snapshot.rules)
+    else:
+        pending = deque(fair_order(jobs))
+        in_flight: set[Future] = set()
+        # A bounded window keeps the round-robin order meaningful: a tenant
+        # with many windows cannot flood the pool ahead of the others.
+        window = workers * 2
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(snapshots,)) as pool:
+            while pending or in_flight:
+                while pending and len(in_flight) < window:
+                    index, job = pending.popleft()
+                    in_flight.add(pool.submit(_solve_job, index, job))
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    index, schedule = future.result()
+                    schedules[index] = schedule
+
+    runs: dict[str, list[SolveRun]] = defaultdict(list)
+    for index, job in enumerate(jobs):
+        tenant = tenants.get(job.tenant_id)
+        runs[job.tenant_id].append(tenant.record_run(job.start_date, job.end_date, schedules[index]))
+    return dict(runs)
@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import date
+
+from app.core.calendar import calendar_for
+from app.db.session import InMemorySession
+from app.models import CoverageRequirement, Holiday, SiteHospital, SiteOffice
+from app.solver.engine import ScheduleOutput
+
+
+@dataclass(frozen=True)
+class CoverageGap:
+    date: date
+    site_code: str
+    block: str
+    missing_md: int
+    missing_apn: int
+
+
+def requirement_site_codes(requirement: CoverageRequirement, site_code: str) -> tuple[str, ...]:
+    # The solver splits some requirements over derived output codes (WTH APNs, OBL at COO).
+    if requirement.roles_json.get("obl"):
+        return (f"{site_code}_OBL",)
+    return (site_code, f"{site_code}_APN")
+
+
+def coverage_gaps(session: InMemorySession, schedule: ScheduleOutput, start: date, end: date) -> list[CoverageGap]:
+    site_codes = {("office", o.id): o.code for o in session.all(SiteOffice)}
+    site_codes.update({("hospital", h.id): h.code for h in session.all(SiteHospital)})
+
+    by_weekday: dict[int, list[CoverageRequirement]] = defaultdict(list)
+    for requirement in session.all(CoverageRequirement):
+        by_weekday[requirement.day_of_week].append(requirement)
+
+    staffed: dict[tuple[date, str, str], list[str]] = defaultdict(list)
+    for assignment in schedule.assignments:
+        if start <= assignment.date <= end:
+            staffed[(assignment.date, assignment.site_code, assignment.block)].extend(p.type for p in assignment.providers)
+
+    gaps: list[CoverageGap] = []
+    table = calendar_for(start, end, session.all(Holiday))
+    for current in table.between(start, end):
+        index = table.index(current)
+        if table.extend_weekend[index]:
+            continue
+        for requirement in by_weekday.get(table.weekdays[index], []):
+            site_code = site_codes.get((requirement.site_type, requirement.site_id))
+            if site_code is None:
+                continue
+            types = [
+                t
+                for code in requirement_site_codes(requirement, site_code)
+                for t in staffed.get((current, code, requirement.block), [])
+            ]
+            missing_md = max(requirement.min_md - types.count("MD"), 0)
+            missing_apn = max(requirement.min_apn - types.count("APN"), 0)
+            if missing_md or missing_apn:
+                gaps.append(CoverageGap(current, site_code, requirement.block, missing_md, missing_apn))
+    return gaps
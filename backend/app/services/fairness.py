@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+from array import array
+from collections import Counter, defaultdict
+from datetime import date
+from typing import Iterator
+
+from app.solver.engine import ScheduleOutput
+
+FAIRNESS_METRICS = ("weekend_noninv", "weekday_noninv", "interventional", "hospital_sessions", "office_sessions")
+CALL_METRICS = {
+    "weekend_noninv": "weekend_noninv",
+    "noninvasive_weekday": "weekday_noninv",
+    "interventional_weekday": "interventional",
+    "interventional_weekend": "interventional",
+}
+# Pending swap moves per metric before they are folded into the prefixes in one pass.
+FOLD_MOVES_AFTER = 256
+
+
+def fairness_counts(schedule: ScheduleOutput) -> dict[str, Counter]:
+    weekend_counts: Counter = Counter()
+    for call in schedule.call_assignments:
+        if call.call_type == "weekend_noninv":
+            weekend_counts[call.providers[0].initials] += 1
+
+    hospital_counts: Counter = Counter()
+    for assignment in schedule.assignments:
+        if assignment.site_type == "hospital":
+            for provider in assignment.providers:
+                hospital_counts[provider.initials] += 1
+
+    return {"weekend_call": weekend_counts, "hospital_days": hospital_counts}
+
+
+def fairness_deltas(base: ScheduleOutput, other: ScheduleOutput) -> dict[str, dict[str, int]]:
+    before = fairness_counts(base)
+    after = fairness_counts(other)
+    deltas: dict[str, dict[str, int]] = {}
+    for metric, counts in after.items():
+        previous = before.get(metric, Counter())
+        changed = {
+            initials: counts[initials] - previous[initials]
+            for initials in sorted(set(counts) | set(previous))
+            if counts[initials] != previous[initials]
+        }
+        deltas[metric] = changed
+    return deltas
+
+
+def _metric_hits(schedule: ScheduleOutput, since: date | None = None) -> Iterator[tuple[str, date, str]]:
+    for call in schedule.call_assignments:
+        metric = CALL_METRICS.get(call.call_type)
+        if metric is not None and (since is None or call.date >= since):
+            for provider in call.providers:
+                yield metric, call.date, provider.initials
+    for assignment in schedule.assignments:
+        if since is None or assignment.date >= since:
+            metric = f"{assignment.site_type}_sessions"
+            for provider in assignment.providers:
+                yield metric, assignment.date, provider.initials
+
+
+class FairnessIndex:
+    """Running per-provider totals by day for one schedule.
+
+    ``_prefix[metric][initials][i]`` is the count before day ``origin + i``, so
+    any window costs two lookups per provider. ``update`` rewrites only the
+    days from ``since`` on, which is all an extend or a repair touches. Swaps
+    are kept as point moves on top of the prefixes until an ``update`` recounts their days.
+    """
+
+    def __init__(self, schedule: ScheduleOutput) -> None:
+        self.origin = 0
+        self.days = 0
+        self.revision = -1
+        self._prefix: dict[str, dict[str, array]] = {metric: {} for metric in FAIRNESS_METRICS}
+        # metric -> (day offset, initials, +1/-1) handed over by ``move``.
+        self._moves: dict[str, list[tuple[int, str, int]]] = {metric: [] for metric in FAIRNESS_METRICS}
+        self.update(schedule)
+
+    def update(self, schedule: ScheduleOutput, since: date | None = None) -> None:
+        if since is None or self.revision < 0 or since.toordinal() <= self.origin:
+            since = None
+            for prefixes in self._prefix.values():
+                prefixes.clear()
+            for moves in self._moves.values():
+                moves.clear()
+        daily: dict[str, dict[str, Counter]] = {metric: defaultdict(Counter) for metric in FAIRNESS_METRICS}
+        last = 0
+        first = None
+        for metric, day, initials in _metric_hits(schedule, since):
+            ordinal = day.toordinal()
+            daily[metric][initials][ordinal] += 1
+            last = max(last, ordinal)
+            first = ordinal if first is None else min(first, ordinal)
+        if since is None:
+            self.origin = first or 0
+            keep = 0
+            self.days = last - self.origin + 1 if first is not None else 0
+        else:
+            keep = since.toordinal() - self.origin
+            self.days = max(min(self.days, keep), last - self.origin + 1)
+            # Days from ``since`` on are recounted from the schedule, which already shows those swaps.
+            for moves in self._moves.values():
+                moves[:] = [move for move in moves if move[0] < keep]
+        for metric, prefixes in self._prefix.items():
+            for initials in daily[metric].keys() - prefixes.keys():
+                prefixes[initials] = array("i", [0])
+            for initials, prefix in prefixes.items():
+                counts = daily[metric].get(initials, {})
+                if len(prefix) <= keep:
+                    prefix.extend([prefix[-1]] * (keep + 1 - len(prefix)))
+                del prefix[keep + 1 :]
+                total = prefix[-1]
+                for ordinal in range(self.origin + keep, self.origin + self.days):
+                    total += counts.get(ordinal, 0)
+                    prefix.append(total)
+        self.revision = schedule.revision
+
+    def move(self, metric: str, day: date, giver: str, taker: str) -> None:
+        """Hand one ``metric`` hit on ``day`` from ``giver`` to ``taker``, as a call swap does, without a rescan."""
+        offset = day.toordinal() - self.origin
+        if not 0 <= offset < self.days:
+            raise ValueError(f"{day} is outside the indexed days")
+        for initials in (giver, taker):
+            self._prefix[metric].setdefault(initials, array("i", bytes(4 * (self.days + 1))))
+        moves = self._moves[metric]
+        moves.extend(((offset, giver, -1), (offset, taker, 1)))
+        if len(moves) >= FOLD_MOVES_AFTER:
+            self._fold(metric)
+
+    def _fold(self, metric: str) -> None:
+        steps: dict[str, list[int]] = {}
+        for offset, initials, delta in self._moves[metric]:
+            steps.setdefault(initials, [0] * (self.days + 1))[offset + 1] += delta
+        for initials, step in steps.items():
+            prefix = self._prefix[metric][initials]
+            shift = 0
+            for i in range(1, self.days + 1):
+                shift += step[i]
+                prefix[i] += shift
+        self._moves[metric].clear()
+
+    def window(self, metric: str, start: date | None = None, end: date | None = None) -> dict[str, int]:
+        """Counts per provider for ``start..end`` inclusive; the index's own span when omitted."""
+        lo = 0 if start is None else min(max(start.toordinal() - self.origin, 0), self.days)
+        hi = self.days if end is None else min(max(end.toordinal() - self.origin + 1, 0), self.days)
+        if hi <= lo:
+            return {initials: 0 for initials in self._prefix[metric]}
+        counts = {initials: prefix[hi] - prefix[lo] for initials, prefix in self._prefix[metric].items()}
+        for offset, initials, delta in self._moves[metric]:
+            if lo <= offset < hi:
+                counts[initials] += delta
+        return counts
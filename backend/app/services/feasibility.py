@@ -0,0 +1,221 @@
+from __future__ import annotations
+
+import threading
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Iterable
+
+from app.config.registry import CompiledRules
+from app.core.calendar import CalendarTable, calendar_for
+from app.core.events import ChangeEvent
+from app.db.session import InMemorySession
+from app.models import Holiday, VacationRequest
+from app.services.coverage import CoverageGap
+from app.solver.engine import ScheduleSolver
+from app.solver.matching import hopcroft_karp
+
+Seat = tuple[str, str, int]  # (site code, "MD" | "APN", seat number)
+DayBlock = tuple[date, str]
+
+# Entities whose changes ``FeasibilityIndex.observe`` follows.
+FEASIBILITY_INPUTS = ("VacationRequest", "CoverageRequirement", "Holiday", "Provider", "SiteOffice", "SiteHospital")
+
+
+@dataclass(frozen=True)
+class Absence:
+    provider_id: int
+    start_date: date
+    end_date: date
+
+
+@dataclass(frozen=True)
+class RequirementSlack:
+    site_code: str
+    md: int
+    apn: int
+
+
+@dataclass
+class FeasibilityResult:
+    gaps: list[CoverageGap]
+    checked: int
+    min_slack: int | None
+
+    @property
+    def feasible(self) -> bool:
+        return not self.gaps
+
+
+@dataclass(frozen=True)
+class _Requirement:
+    site_code: str
+    min_md: int
+    min_apn: int
+    md_pool: frozenset[int]
+    apn_pool: frozenset[int]
+
+
+class FeasibilityIndex:
+    """Per-day, per-block staffing slack, for checking absences without a solve.
+
+    Each workday block is a bipartite graph of coverage seats against the
+    providers the solver could place there. Approving an absence only matters
+    where the absent provider holds a seat in the current maximum matching,
+    so only those blocks are re-matched. Slack and matchings are kept per week
+    once computed; ``observe`` drops the weeks a data change touches.
+    """
+
+    def __init__(
+        self, session: InMemorySession, rules: CompiledRules | None = None, start: date | None = None, end: date | None = None
+    ) -> None:
+        self._session = session
+        self._lock = threading.RLock()
+        self._build(ScheduleSolver(session, rules))
+        if start is not None and end is not None:
+            with self._lock:
+                self._prepare(start, end)
+
+    def _build(self, solver: ScheduleSolver) -> None:
+        self.rules = solver.rules
+        self._holidays = list(solver.holidays.values())
+        self._vacations = solver.vacations
+        self._requirements = self._compile(solver)
+        self.slack: dict[DayBlock, list[RequirementSlack]] = {}
+        self._matchings: dict[DayBlock, dict[Seat, int]] = {}
+        # Mondays of the weeks whose slack is in ``slack``.
+        self._weeks: set[date] = set()
+
+    def _prepare(self, start: date, end: date) -> CalendarTable:
+        first = start - timedelta(days=start.weekday())
+        last = end + timedelta(days=6 - end.weekday())
+        table = calendar_for(first, last, self._holidays)
+        for day in table.weekdays_between(first, last):
+            if day - timedelta(days=day.weekday()) in self._weeks or table.extend_weekend[table.index(day)]:
+                continue
+            away = self._away(day)
+            for block, requirements in self._requirements.get(day.weekday(), {}).items():
+                self.slack[(day, block)] = [
+                    RequirementSlack(r.site_code, len(r.md_pool - away) - r.min_md, len(r.apn_pool - away) - r.min_apn)
+                    for r in requirements
+                ]
+        self._weeks.update(table.mondays_between(first, last))
+        return table
+
+    def observe(self, event: ChangeEvent) -> None:
+        with self._lock:
+            if not event.dated:
+                # Coverage rules, providers and sites bear on every week and on the seat pools themselves.
+                self._build(ScheduleSolver(self._session, self.rules))
+                return
+            if event.entity == "VacationRequest":
+                self._refresh_vacations(event.provider_ids)
+            elif event.entity == "Holiday":
+                self._holidays = self._session.all(Holiday)
+            dropped = set(event.weeks())
+            self._weeks -= dropped
+            for cache in (self.slack, self._matchings):
+                for key in [key for key in cache if key[0] - timedelta(days=key[0].weekday()) in dropped]:
+                    del cache[key]
+
+    def _refresh_vacations(self, provider_ids: frozenset[int]) -> None:
+        for provider_id in provider_ids:
+            self._vacations.pop(provider_id, None)
+        for vacation in self._session.all(VacationRequest):
+            if vacation.status != "APPROVED" or vacation.provider_id not in provider_ids:
+                continue
+            days = self._vacations.setdefault(vacation.provider_id, set())
+            current = vacation.start_date
+            while current <= vacation.end_date:
+                days.add(current)
+                current += timedelta(days=1)
+
+    @staticmethod
+    def _compile(solver: ScheduleSolver) -> dict[int, dict[str, list[_Requirement]]]:
+        compiled: dict[int, dict[str, list[_Requirement]]] = defaultdict(lambda: defaultdict(list))
+        for weekday, groups in solver.seat_groups.items():
+            for group in groups:
+                compiled[weekday][group.block].append(
+                    _Requirement(
+                        group.site_code,
+                        group.min_md,
+                        group.min_apn,
+                        frozenset(p.id for p in group.md_pool),
+                        frozenset(p.id for p in group.apn_pool),
+                    )
+                )
+        return compiled
+
+    def _away(self, day: date) -> frozenset[int]:
+        return frozenset(pid for pid, days in self._vacations.items() if day in days)
+
+    def _graph(self, day: date, block: str, absent: frozenset[int]) -> dict[Seat, list[int]]:
+        graph: dict[Seat, list[int]] = {}
+        for requirement in self._requirements[day.weekday()][block]:
+            for role, count, members in (
+                ("MD", requirement.min_md, requirement.md_pool),
+                ("APN", requirement.min_apn, requirement.apn_pool),
+            ):
+                candidates = sorted(members - absent)
+                for seat in range(count):
+                    graph[(requirement.site_code, role, seat)] = candidates
+        return graph
+
+    def matching(self, day: date, block: str) -> dict[Seat, int]:
+        key = (day, block)
+        if key not in self._matchings:
+            self._matchings[key] = hopcroft_karp(self._graph(day, block, self._away(day)))
+        return self._matchings[key]
+
+    def check(self, absences: Iterable[Absence]) -> FeasibilityResult:
+        """Coverage that approving ``absences`` together would newly leave unfillable."""
+        absences = list(absences)
+        if not absences:
+            return FeasibilityResult(gaps=[], checked=0, min_slack=None)
+        with self._lock:
+            return self._check(absences)
+
+    def _check(self, absences: list[Absence]) -> FeasibilityResult:
+        table = self._prepare(min(a.start_date for a in absences), max(a.end_date for a in absences))
+        removed: dict[DayBlock, set[int]] = defaultdict(set)
+        for absence in absences:
+            for day in table.weekdays_between(absence.start_date, absence.end_date):
+                for block in self._requirements.get(day.weekday(), {}):
+                    if (day, block) in self.slack:
+                        removed[(day, block)].add(absence.provider_id)
+
+        gaps: list[CoverageGap] = []
+        min_slack: int | None = None
+        for (day, block), provider_ids in sorted(removed.items()):
+            provider_ids -= self._away(day)
+            for requirement, slack in zip(self._requirements[day.weekday()][block], self.slack[(day, block)]):
+                md = slack.md - len(provider_ids & requirement.md_pool)
+                apn = slack.apn - len(provider_ids & requirement.apn_pool)
+                if requirement.min_md:
+                    min_slack = md if min_slack is None else min(min_slack, md)
+                if requirement.min_apn:
+                    min_slack = apn if min_slack is None else min(min_slack, apn)
+
+            baseline = self.matching(day, block)
+            if not provider_ids.intersection(baseline.values()):
+                # Nobody absent holds a seat, so the maximum matching is unchanged.
+                continue
+            seed = {seat: pid for seat, pid in baseline.items() if pid not in provider_ids}
+            graph = self._graph(day, block, self._away(day) | provider_ids)
+            after = hopcroft_karp(graph, seed)
+            if len(after) >= len(baseline):
+                continue
+            missing: dict[str, list[int]] = defaultdict(lambda: [0, 0])
+            for seat in baseline:
+                if seat not in after:
+                    missing[seat[0]][seat[1] == "APN"] += 1
+            for site_code, (missing_md, missing_apn) in missing.items():
+                gaps.append(CoverageGap(day, site_code, block, missing_md, missing_apn))
+        return FeasibilityResult(gaps=gaps, checked=len(removed), min_slack=min_slack)
+
+
+def check_absences(
+    session: InMemorySession, rules: CompiledRules | None, absences: Iterable[Absence]
+) -> FeasibilityResult:
+    """One-off check; long-lived callers keep a ``FeasibilityIndex`` subscribed to the session's events."""
+    return FeasibilityIndex(session, rules).check(absences)
@@ -0,0 +1,354 @@
+from __future__ import annotations
+
+import io
+import os
+import re
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Iterable, Union
+from xml.etree import ElementTree
+
+from app.models import Provider, SolveRun
+from app.solver.engine import CallAssignment, DayAssignment, ScheduleOutput
+from app.solver.exporter import MAIN_NS, ROW_OFFSETS, VACATION_ABBREV, WEEKEND_CALL_KEYS, load_mapping
+
+SHEET = "xl/worksheets/sheet1.xml"
+SHARED_STRINGS = "xl/sharedStrings.xml"
+IMPORTED_STATUS = "IMPORTED"
+
+_CELL = f"{{{MAIN_NS}}}c"
+_ROW = f"{{{MAIN_NS}}}row"
+_VALUE = f"{{{MAIN_NS}}}v"
+_TEXT = f"{{{MAIN_NS}}}t"
+_SI = f"{{{MAIN_NS}}}si"
+_REF = re.compile(r"([A-Z]+)(\d+)")
+_ISO_DATE = re.compile(r"(\d{4})-(\d{2})-(\d{2})")
+_NONINV_LABEL = re.compile(r"HH:\s*([A-Za-z]+)\s+CH:\s*([A-Za-z]+)")
+_WEEKDAYS = {abbrev: weekday for weekday, abbrev in VACATION_ABBREV.items()}
+_EXCEL_EPOCH = date(1899, 12, 30)
+WEEK_CELL = "B1"
+
+# A workbook given by path or by its bytes, with the name its week start can be read from.
+WorkbookSource = tuple[str, Union[str, Path, bytes]]
+# (kind, site or call code, weekday, block) a mapped cell holds
+CellSlot = tuple[str, str, int, Union[str, None]]
+
+
+@dataclass(frozen=True)
+class WorkbookIssue:
+    source: str
+    cell: str | None
+    message: str
+
+
+@dataclass(frozen=True)
+class WorkbookWeek:
+    source: str
+    week_start: date
+    assignments: tuple[tuple[date, str, str, str, tuple[int, ...]], ...]
+    calls: tuple[tuple[date, str, str, tuple[int, ...]], ...]
+    vacations: tuple[tuple[str, date, date], ...]
+
+
+@dataclass
+class HistoryImport:
+    solve_run: SolveRun | None = None
+    weeks: list[WorkbookWeek] = field(default_factory=list)
+    issues: list[WorkbookIssue] = field(default_factory=list)
+
+
+class HistoryImportError(ValueError):
+    def __init__(self, issues: list[WorkbookIssue]) -> None:
+        super().__init__("No workbook could be imported")
+        self.issues = issues
+
+
+class ProviderIndex:
+    """Provider ids by initials and type; the same initials can belong to an MD and an APN."""
+
+    def __init__(self, providers: Iterable[Provider]) -> None:
+        self._ids: dict[str, dict[str, int]] = {}
+        for provider in providers:
+            self._ids.setdefault(provider.initials.upper(), {})[provider.type] = provider.id
+
+    def find(self, initials: str, provider_type: str | None = None) -> int | None:
+        by_type = self._ids.get(initials.upper())
+        if not by_type:
+            return None
+        return by_type.get(provider_type) or next(iter(by_type.values()))
+
+    def has(self, initials: str, provider_type: str) -> bool:
+        return provider_type in self._ids.get(initials.upper(), {})
+
+
+def sheet_layout(mapping: dict | None = None) -> dict[str, CellSlot]:
+    """Cell reference -> the slot the exporter writes there, i.e. ``mapping.yaml`` read backwards.
+
+    Where several slots share a cell the exporter's last write wins, so the
+    cell is credited to that slot.
+    """
+    mapping = mapping if mapping is not None else load_mapping()
+    cells = mapping["cells"]
+    layout: dict[str, CellSlot] = {}
+    for code, cell_map in cells.get("offices", {}).items():
+        for weekday, rows in ROW_OFFSETS.items():
+            for block, row in rows.items():
+                if cell_map.get(block):
+                    layout[_column(cell_map[block]) + str(row)] = ("office", code, weekday, block)
+    for code in ("WTH", "RMC", "COO_OBL"):
+        cell_map = cells.get("hospitals", {}).get(code, {})
+        for weekday, rows in ROW_OFFSETS.items():
+            if code == "COO_OBL" and weekday != 2:
+                continue
+            for block, row in rows.items():
+                if cell_map.get(block):
+                    layout[_column(cell_map[block]) + str(row)] = ("hospital", code, weekday, block)
+    weekend_days = {key: weekday for weekday, key in WEEKEND_CALL_KEYS.items()}
+    for call_type, refs in mapping.get("call_cells", {}).items():
+        for key, ref in refs.items():
+            if call_type == "weekend_interv":
+                layout[ref] = ("call", "interventional_weekend", 4, None)
+            elif call_type == "weekend_noninv":
+                layout[ref] = ("call", call_type, weekend_days[key], None)
+            else:
+                layout[ref] = ("call", call_type, int(key), None)
+    for column in mapping.get("vacation_headers", {}).get("order", []):
+        for row in range(1, 8):
+            layout[f"{column}{row}"] = ("vacation", "", 0, None)
+    return layout
+
+
+def _column(ref: str) -> str:
+    return _REF.match(ref).group(1)
+
+
+# reading one workbook ---------------------------------------------------------
+
+
+def _sheet_cells(archive: zipfile.ZipFile, wanted: set[str]) -> dict[str, str]:
+    """Text of the ``wanted`` cells, streaming the sheet and stopping after the last row that holds one."""
+    last_row = max(int(_REF.match(ref).group(2)) for ref in wanted)
+    raw: dict[str, tuple[str, str]] = {}
+    with archive.open(SHEET) as sheet:
+        for _, element in ElementTree.iterparse(sheet):
+            if element.tag == _CELL:
+                ref = element.get("r", "")
+                if ref in wanted:
+                    kind = element.get("t", "n")
+                    if kind == "inlineStr":
+                        raw[ref] = ("str", "".join(t.text or "" for t in element.iter(_TEXT)))
+                    else:
+                        value = element.find(_VALUE)
+                        raw[ref] = (kind, value.text if value is not None and value.text else "")
+            elif element.tag == _ROW:
+                row = int(element.get("r", "0"))
+                element.clear()
+                if row >= last_row:
+                    break
+    shared = {int(value) for kind, value in raw.values() if kind == "s" and value.isdigit()}
+    strings = _shared_strings(archive, shared) if shared else {}
+    return {ref: strings.get(int(value), "") if kind == "s" else value for ref, (kind, value) in raw.items()}
+
+
+def _shared_strings(archive: zipfile.ZipFile, indexes: set[int]) -> dict[int, str]:
+    strings: dict[int, str] = {}
+    last = max(indexes)
+    position = 0
+    with archive.open(SHARED_STRINGS) as stream:
+        for _, element in ElementTree.iterparse(stream):
+            if element.tag != _SI:
+                continue
+            if position in indexes:
+                strings[position] = "".join(t.text or "" for t in element.iter(_TEXT))
+            element.clear()
+            if position >= last:
+                break
+            position += 1
+    return strings
+
+
+def _week_start(name: str, value: str) -> date | None:
+    found = _ISO_DATE.search(value) or _ISO_DATE.search(name)
+    try:
+        if found:
+            day = date(*(int(part) for part in found.groups()))
+        elif re.fullmatch(r"\d+(\.0+)?", value.strip()):
+            day = _EXCEL_EPOCH + timedelta(days=int(float(value)))
+        else:
+            return None
+    except ValueError:
+        return None
+    return day - timedelta(days=day.weekday())
+
+
+def _names(text: str, separator: str = "/") -> list[str]:
+    return [part.strip().rstrip(".") for part in text.split(separator) if part.strip().rstrip(".")]
+
+
+def read_workbook(
+    source: WorkbookSource, index: ProviderIndex, layout: dict[str, CellSlot] | None = None
+) -> tuple[WorkbookWeek | None, list[WorkbookIssue]]:
+    name, content = source
+    layout = layout if layout is not None else sheet_layout()
+    issues: list[WorkbookIssue] = []
+    try:
+        with zipfile.ZipFile(io.BytesIO(content) if isinstance(content, bytes) else content) as archive:
+            values = _sheet_cells(archive, set(layout) | {WEEK_CELL})
+    except (zipfile.BadZipFile, KeyError, ElementTree.ParseError) as exc:
+        return None, [WorkbookIssue(name, None, f"Not a schedule workbook: {exc}")]
+    week_start = _week_start(name, values.get(WEEK_CELL, ""))
+    if week_start is None:
+        return None, [WorkbookIssue(name, WEEK_CELL, "Week start is neither in the file name nor in the sheet")]
+
+    def ids(ref: str, initials: Iterable[str], provider_type: str | None = "MD") -> tuple[int, ...]:
+        found = []
+        for item in initials:
+            provider_id = index.find(item, provider_type)
+            if provider_id is None:
+                issues.append(WorkbookIssue(name, ref, f"Unknown provider: {item}"))
+            else:
+                found.append(provider_id)
+        return tuple(found)
+
+    assignments = []
+    calls = []
+    vacations = []
+    for ref, text in values.items():
+        text = text.strip()
+        slot = layout.get(ref)
+        if not text or slot is None:
+            continue
+        kind, code, weekday, block = slot
+        day = week_start + timedelta(days=weekday)
+        if kind == "office" or code == "COO_OBL":
+            assignments.append((day, block, code, kind, ids(ref, _names(text))))
+        elif code == "WTH":
+            names = _names(text)
+            # The MD leads the cell; without one it only lists APNs.
+            md = names[:1] if names and index.has(names[0], "MD") else []
+            assignments.append((day, block, "WTH", kind, ids(ref, md)))
+            assignments.append((day, block, "WTH_APN", kind, ids(ref, names[len(md) :], "APN")))
+        elif code == "RMC":
+            names = _names(text)
+            pair = ids(ref, names[:1]) + ids(ref, names[1:2], "APN")
+            assignments.append((day, block, "RMC", kind, pair))
+        elif kind == "call":
+            if code == "noninvasive_weekday":
+                found = _NONINV_LABEL.search(text)
+                providers = ids(ref, found.groups()) if found else ()
+            elif code == "interventional_weekday":
+                providers = ids(ref, _names(text, " "))
+            elif _NONINV_LABEL.search(text):
+                # Friday's weekend cell repeats the weekday call; the weekend owner is not on the sheet.
+                continue
+            else:
+                providers = ids(ref, _names(text))
+            calls.append((day, code, text, providers))
+        elif kind == "vacation":
+            initials, _, span = text.partition("—")
+            first, _, last = span.strip().partition("–")
+            if index.find(initials.strip()) is None or first not in _WEEKDAYS:
+                issues.append(WorkbookIssue(name, ref, f"Unreadable vacation entry: {text}"))
+                continue
+            start = week_start + timedelta(days=_WEEKDAYS[first])
+            end = week_start + timedelta(days=_WEEKDAYS.get(last, _WEEKDAYS[first]))
+            vacations.append((initials.strip(), start, end))
+    week = WorkbookWeek(
+        source=name,
+        week_start=week_start,
+        assignments=tuple(a for a in sorted(assignments, key=lambda a: (a[0], a[1], a[2])) if a[4]),
+        calls=tuple(c for c in sorted(calls, key=lambda c: (c[0], c[1])) if c[3]),
+        vacations=tuple(vacations),
+    )
+    return week, issues
+
+
+# many workbooks ---------------------------------------------------------------
+
+_WORKER_STATE: tuple[ProviderIndex, dict[str, CellSlot]] | None = None
+
+
+def _init_worker(index: ProviderIndex, layout: dict[str, CellSlot]) -> None:
+    global _WORKER_STATE
+    _WORKER_STATE = (index, layout)
+
+
+def _read_in_worker(source: WorkbookSource) -> tuple[WorkbookWeek | None, list[WorkbookIssue]]:
+    index, layout = _WORKER_STATE
+    return read_workbook(source, index, layout)
+
+
+def read_workbooks(
+    sources: Iterable[WorkbookSource], index: ProviderIndex, max_workers: int | None = None
+) -> tuple[list[WorkbookWeek], list[WorkbookIssue]]:
+    sources = list(sources)
+    layout = sheet_layout()
+    workers = min(max_workers or os.cpu_count() or 1, len(sources))
+    if workers <= 1:
+        results = [read_workbook(source, index, layout) for source in sources]
+    else:
+        # The index and layout go to each worker once; workbooks are handed out a few at a time.
+        chunksize = max(1, len(sources) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(index, layout)) as pool:
+            results = list(pool.map(_read_in_worker, sources, chunksize=chunksize))
+    weeks: dict[date, WorkbookWeek] = {}
+    issues: list[WorkbookIssue] = []
+    for week, week_issues in results:
+        issues.extend(week_issues)
+        if week is None:
+            continue
+        if week.week_start in weeks:
+            issues.append(WorkbookIssue(week.source, None, f"Week {week.week_start} already read from {weeks[week.week_start].source}"))
+            continue
+        weeks[week.week_start] = week
+    return [weeks[start] for start in sorted(weeks)], issues
+
+
+def build_schedule(weeks: Iterable[WorkbookWeek], providers: Iterable[Provider]) -> ScheduleOutput:
+    by_id = {p.id: p for p in providers}
+    schedule = ScheduleOutput()
+    for week in weeks:
+        for day, block, site_code, site_type, ids in week.assignments:
+            schedule.add_assignment(DayAssignment(day, block, site_code, site_type, [by_id[i] for i in ids]))
+        for day, call_type, label, ids in week.calls:
+            schedule.add_call(CallAssignment(day, call_type, label, [by_id[i] for i in ids]))
+        for initials, start, end in week.vacations:
+            ranges = schedule.vacations[initials.upper()]
+            # Leave that runs over a weekend is split across two sheets; join it back up.
+            if ranges and ranges[-1][1] + timedelta(days=1) >= start:
+                ranges[-1] = (ranges[-1][0], max(end, ranges[-1][1]), "FULL")
+            else:
+                ranges.append((start, end, "FULL"))
+    return schedule
+
+
+def workbooks_from_zip(data: bytes) -> list[WorkbookSource]:
+    """The ``.xlsx`` members of an uploaded zip, named after their file names."""
+    try:
+        with zipfile.ZipFile(io.BytesIO(data)) as archive:
+            sources = [
+                (Path(info.filename).name, archive.read(info))
+                for info in archive.infolist()
+                if info.filename.lower().endswith(".xlsx") and not info.is_dir()
+            ]
+    except zipfile.BadZipFile as exc:
+        raise ValueError("Upload must be a zip of .xlsx workbooks") from exc
+    if not sources:
+        raise ValueError("The zip holds no .xlsx workbooks")
+    return sources
+
+
+def import_history(tenant, sources: Iterable[WorkbookSource], max_workers: int | None = None) -> HistoryImport:
+    """Read past weekly workbooks into one stored run, archived and fairness-indexed like a solved one."""
+    providers = tenant.session.all(Provider)
+    weeks, issues = read_workbooks(sources, ProviderIndex(providers), max_workers)
+    if not weeks:
+        raise HistoryImportError(issues)
+    schedule = build_schedule(weeks, providers)
+    start, end = weeks[0].week_start, weeks[-1].week_start + timedelta(days=6)
+    solve_run = tenant.record_run(start, end, schedule, status=IMPORTED_STATUS)
+    tenant.fairness_index(solve_run.id)
+    return HistoryImport(solve_run=solve_run, weeks=weeks, issues=issues)
@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+import hashlib
+import threading
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from weakref import WeakKeyDictionary
+
+from app.solver.engine import ScheduleOutput
+
+BLOCK_HOURS = {"AM": ("080000", "120000"), "PM": ("130000", "170000"), "DAY": ("080000", "170000")}
+FEED_CACHE_SIZE = 1024
+
+# (kind, first day, last day, summary, block or None); block events are timed, the rest all-day.
+Event = tuple[str, date, date, str, str | None]
+
+
+@dataclass
+class ProviderView:
+    revision: int
+    events: dict[str, tuple[Event, ...]]
+    fingerprints: dict[str, str]
+
+
+@dataclass(frozen=True)
+class Feed:
+    etag: str
+    body: bytes
+
+
+_VIEWS: WeakKeyDictionary[ScheduleOutput, ProviderView] = WeakKeyDictionary()
+# Rendered feeds keyed by the fingerprint of their events, so a provider whose
+# slots are unchanged in a new run is served the feed already rendered.
+_FEEDS: OrderedDict[str, Feed] = OrderedDict()
+_FEEDS_LOCK = threading.Lock()
+
+
+def _fingerprint(initials: str, events: tuple[Event, ...]) -> str:
+    payload = repr((initials, events)).encode("utf-8")
+    return hashlib.blake2b(payload, digest_size=16).hexdigest()
+
+
+def provider_view(schedule: ScheduleOutput) -> ProviderView:
+    cached = _VIEWS.get(schedule)
+    if cached is not None and cached.revision == schedule.revision:
+        return cached
+
+    events: dict[str, list[Event]] = defaultdict(list)
+    blocks: dict[tuple[str, date, str], set[str]] = defaultdict(set)
+    for assignment in schedule.assignments:
+        for provider in assignment.providers:
+            blocks[(provider.initials, assignment.date, assignment.site_code)].add(assignment.block)
+    for (initials, day, site_code), worked in blocks.items():
+        # A full day at one site reads better as one event than as two halves.
+        for block in ("DAY",) if worked >= {"AM", "PM"} else sorted(worked):
+            events[initials].append(("site", day, day, site_code, block))
+    for call in schedule.call_assignments:
+        for provider in call.providers:
+            events[provider.initials].append(("call", call.date, call.date, f"Call: {call.label}", None))
+    for initials, spans in schedule.vacations.items():
+        for start, end, _ in spans:
+            events[initials].append(("vacation", start, end, "Vacation", None))
+
+    frozen = {
+        initials: tuple(sorted(items, key=lambda event: (*event[:4], event[4] or "")))
+        for initials, items in events.items()
+    }
+    view = ProviderView(
+        revision=schedule.revision,
+        events=frozen,
+        fingerprints={initials: _fingerprint(initials, items) for initials, items in frozen.items()},
+    )
+    _VIEWS[schedule] = view
+    return view
+
+
+def _escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,").replace("\n", "\\n")
+
+
+def _fold(line: str) -> str:
+    # RFC 5545 limits content lines to 75 octets; continuation lines start with a space.
+    raw = line.encode("utf-8")
+    if len(raw) <= 75:
+        return line
+    parts, start = [], 0
+    while start < len(raw):
+        size = 75 if not parts else 74
+        end = min(start + size, len(raw))
+        while end < len(raw) and (raw[end] & 0xC0) == 0x80:
+            end -= 1
+        parts.append(raw[start:end].decode("utf-8"))
+        start = end
+    return "\r\n ".join(parts)
+
+
+def render_feed(initials: str, events: tuple[Event, ...]) -> bytes:
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    lines = [
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        "PRODID:-//Cardio Scheduler//Provider Schedule//EN",
+        "CALSCALE:GREGORIAN",
+        f"X-WR-CALNAME:{_escape(initials)} schedule",
+    ]
+    for kind, first, last, summary, block in events:
+        uid = f"{kind}-{first:%Y%m%d}-{summary}-{block or ''}-{initials}".replace(" ", "_")
+        lines += ["BEGIN:VEVENT", f"UID:{_escape(uid)}@cardio-scheduler", f"DTSTAMP:{stamp}"]
+        if block is not None:
+            start_time, end_time = BLOCK_HOURS.get(block, BLOCK_HOURS["DAY"])
+            lines += [f"DTSTART:{first:%Y%m%d}T{start_time}", f"DTEND:{first:%Y%m%d}T{end_time}"]
+        else:
+            lines += [f"DTSTART;VALUE=DATE:{first:%Y%m%d}", f"DTEND;VALUE=DATE:{last + timedelta(days=1):%Y%m%d}"]
+        lines += [f"SUMMARY:{_escape(summary)}", f"CATEGORIES:{kind.upper()}", "END:VEVENT"]
+    lines.append("END:VCALENDAR")
+    return ("\r\n".join(_fold(line) for line in lines) + "\r\n").encode("utf-8")
+
+
+def provider_feed(schedule: ScheduleOutput, initials: str) -> Feed:
+    view = provider_view(schedule)
+    events = view.events.get(initials, ())
+    fingerprint = view.fingerprints.get(initials) or _fingerprint(initials, events)
+    with _FEEDS_LOCK:
+        feed = _FEEDS.get(fingerprint)
+        if feed is not None:
+            _FEEDS.move_to_end(fingerprint)
+            return feed
+    feed = Feed(etag=f'"{fingerprint}"', body=render_feed(initials, events))
+    with _FEEDS_LOCK:
+        _FEEDS[fingerprint] = feed
+        while len(_FEEDS) > FEED_CACHE_SIZE:
+            _FEEDS.popitem(last=False)
+    return feed
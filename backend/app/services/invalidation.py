@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import date, timedelta
+from typing import Callable, Iterator
+
+from app.core.events import ChangeEvent
+
+# Entities a solved schedule is computed from; a change to any of them can make stored runs stale.
+SCHEDULE_INPUTS = (
+    "VacationRequest",
+    "Holiday",
+    "ScheduleBlock",
+    "Assignment",
+    "Provider",
+    "CoverageRequirement",
+    "SiteOffice",
+    "SiteHospital",
+    "CallRule",
+    "rules",
+)
+
+
+class ProviderVersions:
+    """A change counter per provider, for ETags of data that belongs to one provider."""
+
+    def __init__(self) -> None:
+        self._versions: dict[int, int] = defaultdict(int)
+
+    def observe(self, event: ChangeEvent) -> None:
+        for provider_id in event.provider_ids:
+            self._versions[provider_id] += 1
+
+    def version(self, provider_id: int) -> int:
+        return self._versions[provider_id]
+
+
+class StaleWeeks:
+    """Weeks of stored runs whose inputs changed after they were solved.
+
+    Each stale week maps to the providers the changes concerned; an empty set
+    means the change was not provider-specific. A repair or extend covering the
+    week clears it.
+    """
+
+    def __init__(self, run_windows: Callable[[], dict[int, tuple[date, date]]]) -> None:
+        self._run_windows = run_windows
+        self._stale: dict[int, dict[date, set[int] | None]] = defaultdict(dict)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @contextmanager
+    def applied(self, run_id: int) -> Iterator[None]:
+        """Changes committed on this thread inside the block are already reflected in ``run_id``."""
+        self._local.run_id = run_id
+        try:
+            yield
+        finally:
+            self._local.run_id = None
+
+    def observe(self, event: ChangeEvent) -> None:
+        applied = getattr(self._local, "run_id", None)
+        with self._lock:
+            for run_id, (start, end) in self._run_windows().items():
+                if run_id == applied or not event.overlaps(start, end):
+                    continue
+                weeks = self._stale[run_id]
+                for monday in event.weeks(start, end):
+                    if not event.provider_ids:
+                        weeks[monday] = None
+                    elif weeks.get(monday, set()) is not None:
+                        weeks.setdefault(monday, set()).update(event.provider_ids)
+
+    def weeks(self, run_id: int) -> dict[date, frozenset[int] | None]:
+        with self._lock:
+            return {
+                monday: None if providers is None else frozenset(providers)
+                for monday, providers in sorted(self._stale.get(run_id, {}).items())
+            }
+
+    def clear(self, run_id: int, start: date, end: date) -> None:
+        with self._lock:
+            weeks = self._stale.get(run_id, {})
+            for monday in [m for m in weeks if m <= end and m + timedelta(days=6) >= start]:
+                del weeks[monday]
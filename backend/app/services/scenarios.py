@@ -0,0 +1,173 @@
+from __future__ import annotations
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field, replace
+from datetime import date
+from typing import Iterable, Union
+
+from app.config.registry import CompiledRules, content_hash
+from app.db.session import InMemorySession
+from app.models import Holiday, Provider, VacationRequest
+from app.services.coverage import CoverageGap, coverage_gaps
+from app.services.fairness import fairness_deltas
+from app.solver.diff import SlotChange, diff_schedules
+from app.solver.engine import ScheduleOutput, solve_schedule
+from app.solver.pins import load_pins
+
+
+@dataclass(frozen=True)
+class VacationEdit:
+    provider_initials: str
+    start_date: date
+    end_date: date
+    block: str = "FULLDAY"
+    # Needed when an MD and an APN share the initials.
+    provider_type: str | None = None
+
+
+class AmbiguousProviderError(ValueError):
+    def __init__(self, initials: str) -> None:
+        super().__init__(f"{initials} names more than one provider; give provider_type")
+        self.initials = initials
+
+
+@dataclass(frozen=True)
+class HolidayEdit:
+    date: date
+    name: str = ""
+    is_office_closed: bool = True
+    extend_weekend: bool = True
+    remove: bool = False
+
+
+@dataclass(frozen=True)
+class RotationEdit:
+    rotation: str
+    order: tuple[str, ...]
+
+
+ScenarioEdit = Union[VacationEdit, HolidayEdit, RotationEdit]
+
+
+@dataclass(frozen=True)
+class Scenario:
+    name: str
+    edits: tuple[ScenarioEdit, ...] = ()
+
+
+@dataclass
+class ScenarioResult:
+    name: str
+    rules_version: str
+    coverage_gaps: list[CoverageGap] = field(default_factory=list)
+    fairness_deltas: dict[str, dict[str, int]] = field(default_factory=dict)
+    changes: list[SlotChange] = field(default_factory=list)
+
+
+@dataclass(frozen=True)
+class ScenarioBase:
+    session: InMemorySession
+    rules: CompiledRules
+    baseline: ScheduleOutput
+    start_date: date
+    end_date: date
+
+
+def fork_rules(rules: CompiledRules, edits: Iterable[ScenarioEdit]) -> CompiledRules:
+    overrides = {edit.rotation: tuple(edit.order) for edit in edits if isinstance(edit, RotationEdit)}
+    if not overrides:
+        return rules
+    rotations = {**rules.rotations, **overrides}
+    raw = {**rules.raw, "rotations": {**rules.raw.get("rotations", {}), **{k: list(v) for k, v in overrides.items()}}}
+    # Everything except the rotation table is shared with the base version.
+    return replace(rules, version=content_hash(raw), rotations=rotations, raw=raw)
+
+
+def edit_provider(providers: Iterable[Provider], edit: VacationEdit) -> Provider:
+    """The provider a vacation edit names; raises ``KeyError`` or ``AmbiguousProviderError``."""
+    matches = [
+        p for p in providers if p.initials == edit.provider_initials and edit.provider_type in (None, p.type)
+    ]
+    if not matches:
+        raise KeyError(edit.provider_initials)
+    if len(matches) > 1:
+        raise AmbiguousProviderError(edit.provider_initials)
+    return matches[0]
+
+
+def fork_session(session: InMemorySession, edits: Iterable[ScenarioEdit]) -> InMemorySession:
+    fork = session.fork()
+    providers = fork.all(Provider)
+    holidays = {h.date: h for h in fork.all(Holiday)}
+    for edit in edits:
+        if isinstance(edit, VacationEdit):
+            provider = edit_provider(providers, edit)
+            fork.add(
+                VacationRequest(
+                    provider_id=provider.id,
+                    start_date=edit.start_date,
+                    end_date=edit.end_date,
+                    block=edit.block,
+                    status="APPROVED",
+                )
+            )
+        elif isinstance(edit, HolidayEdit):
+            existing = holidays.pop(edit.date, None)
+            if existing is not None:
+                # Never mutate shared instances; replace them in the fork only.
+                fork.delete(existing)
+            if not edit.remove:
+                holiday = Holiday(
+                    date=edit.date,
+                    name=edit.name or (existing.name if existing else ""),
+                    is_office_closed=edit.is_office_closed,
+                    extend_weekend=edit.extend_weekend,
+                )
+                fork.add(holiday)
+                holidays[edit.date] = holiday
+    return fork
+
+
+def evaluate_scenario(base: ScenarioBase, scenario: Scenario) -> ScenarioResult:
+    session = fork_session(base.session, scenario.edits)
+    rules = fork_rules(base.rules, scenario.edits)
+    # The baseline carries the base run's pins and accepted swaps; without them every one would show as a change.
+    pins = load_pins(session, base.start_date, base.end_date)
+    schedule = solve_schedule(session, base.start_date, base.end_date, rules, pins)
+    return ScenarioResult(
+        name=scenario.name,
+        rules_version=rules.version,
+        coverage_gaps=coverage_gaps(session, schedule, base.start_date, base.end_date),
+        fairness_deltas=fairness_deltas(base.baseline, schedule),
+        changes=diff_schedules(base.baseline, schedule).changes,
+    )
+
+
+_WORKER_BASE: ScenarioBase | None = None
+
+
+def _init_worker(base: ScenarioBase) -> None:
+    global _WORKER_BASE
+    _WORKER_BASE = base
+
+
+def _evaluate_in_worker(scenario: Scenario) -> ScenarioResult:
+    return evaluate_scenario(_WORKER_BASE, scenario)
+
+
+def evaluate_scenarios(
+    base: ScenarioBase, scenarios: Iterable[Scenario], max_workers: int | None = None
+) -> list[ScenarioResult]:
+    scenarios = list(scenarios)
+    providers = base.session.all(Provider)
+    for scenario in scenarios:
+        for edit in scenario.edits:
+            if isinstance(edit, VacationEdit):
+                edit_provider(providers, edit)
+    workers = min(max_workers or os.cpu_count() or 1, len(scenarios))
+    if workers <= 1:
+        return [evaluate_scenario(base, scenario) for scenario in scenarios]
+    # The base session, rules and baseline go to each worker once; scenarios only carry their edits.
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(base,)) as pool:
+        return list(pool.map(_evaluate_in_worker, scenarios))
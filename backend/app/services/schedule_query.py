@@ -0,0 +1,218 @@
+from __future__ import annotations
+
+import base64
+import binascii
+from bisect import bisect_left
+from dataclasses import dataclass
+from datetime import date
+from typing import Any, Callable, Iterator, Sequence
+from weakref import WeakKeyDictionary
+
+import orjson
+
+from app.solver.engine import CallAssignment, DayAssignment, ScheduleOutput
+
+DEFAULT_PAGE_SIZE = 500
+MAX_PAGE_SIZE = 5000
+
+
+@dataclass(frozen=True)
+class ScheduleFilter:
+    start: date | None = None
+    end: date | None = None
+    site: str | None = None
+    provider: str | None = None
+    call_type: str | None = None
+
+
+@dataclass(frozen=True)
+class Cursor:
+    date: date
+    offset: int
+
+    def encode(self) -> str:
+        return base64.urlsafe_b64encode(f"{self.date.isoformat()}:{self.offset}".encode()).decode().rstrip("=")
+
+    @classmethod
+    def decode(cls, token: str) -> "Cursor":
+        try:
+            raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)).decode()
+            day, offset = raw.split(":")
+            cursor = cls(date.fromisoformat(day), int(offset))
+        except (binascii.Error, UnicodeDecodeError, ValueError) as exc:
+            raise ValueError(f"Invalid cursor: {token}") from exc
+        if cursor.offset < 0:
+            raise ValueError(f"Invalid cursor: {token}")
+        return cursor
+
+
+@dataclass
+class ScheduleIndex:
+    revision: int
+    assignment_days: list[date]
+    assignments: list[DayAssignment]
+    call_days: list[date]
+    calls: list[CallAssignment]
+
+
+@dataclass
+class Page:
+    items: list[dict[str, Any]]
+    next_cursor: str | None
+
+
+_INDEXES: WeakKeyDictionary[ScheduleOutput, ScheduleIndex] = WeakKeyDictionary()
+
+
+def schedule_index(schedule: ScheduleOutput) -> ScheduleIndex:
+    cached = _INDEXES.get(schedule)
+    if cached is not None and cached.revision == schedule.revision:
+        return cached
+    # Weekend calls are emitted after the week's weekday calls, so sort (stable) rather than trust emit order.
+    assignments = sorted(schedule.assignments, key=lambda a: a.date)
+    calls = sorted(schedule.call_assignments, key=lambda c: c.date)
+    index = ScheduleIndex(
+        revision=schedule.revision,
+        assignment_days=[a.date for a in assignments],
+        assignments=assignments,
+        call_days=[c.date for c in calls],
+        calls=calls,
+    )
+    _INDEXES[schedule] = index
+    return index
+
+
+def site_matches(site_code: str, site: str) -> bool:
+    return site_code == site or site_code in (f"{site}_APN", f"{site}_OBL", f"ICD_{site}")
+
+
+def assignment_row(assignment: DayAssignment) -> dict[str, Any]:
+    return {
+        "date": assignment.date,
+        "block": assignment.block,
+        "site_code": assignment.site_code,
+        "site_type": assignment.site_type,
+        "providers": [p.initials for p in assignment.providers],
+    }
+
+
+def call_row(call: CallAssignment) -> dict[str, Any]:
+    return {
+        "date": call.date,
+        "call_type": call.call_type,
+        "label": call.label,
+        "providers": [p.initials for p in call.providers],
+    }
+
+
+def _assignment_matches(filters: ScheduleFilter) -> Callable[[DayAssignment], bool]:
+    def matches(assignment: DayAssignment) -> bool:
+        if filters.site and not site_matches(assignment.site_code, filters.site):
+            return False
+        if filters.provider and all(p.initials != filters.provider for p in assignment.providers):
+            return False
+        return True
+
+    return matches
+
+
+def _call_matches(filters: ScheduleFilter) -> Callable[[CallAssignment], bool]:
+    def matches(call: CallAssignment) -> bool:
+        if filters.call_type and call.call_type != filters.call_type:
+            return False
+        if filters.provider and all(p.initials != filters.provider for p in call.providers):
+            return False
+        return True
+
+    return matches
+
+
+def _scan(
+    days: Sequence[date],
+    items: Sequence[Any],
+    filters: ScheduleFilter,
+    matches: Callable[[Any], bool],
+    cursor: Cursor | None,
+) -> Iterator[tuple[date, int, Any]]:
+    """Yield (day, ordinal among matches on that day, item) from the cursor position onwards."""
+    low = filters.start
+    if cursor is not None and (low is None or cursor.date >= low):
+        low = cursor.date
+    position = bisect_left(days, low) if low else 0
+    current: date | None = None
+    ordinal = 0
+    for i in range(position, len(items)):
+        day = days[i]
+        if filters.end and day > filters.end:
+            break
+        item = items[i]
+        if not matches(item):
+            continue
+        if day != current:
+            current, ordinal = day, 0
+        else:
+            ordinal += 1
+        if cursor is not None and day == cursor.date and ordinal < cursor.offset:
+            continue
+        yield day, ordinal, item
+
+
+def _page(rows: Iterator[tuple[date, int, Any]], to_row: Callable[[Any], dict[str, Any]], limit: int) -> Page:
+    items: list[dict[str, Any]] = []
+    last: tuple[date, int] | None = None
+    for day, ordinal, item in rows:
+        if len(items) == limit:
+            return Page(items, Cursor(last[0], last[1] + 1).encode())
+        items.append(to_row(item))
+        last = (day, ordinal)
+    return Page(items, None)
+
+
+def _ndjson(rows: Iterator[tuple[date, int, Any]], to_row: Callable[[Any], dict[str, Any]], limit: int | None) -> Iterator[bytes]:
+    # One chunk per day: rows are serialized as they are read, never as one document.
+    chunk: list[bytes] = []
+    current: date | None = None
+    for count, (day, _, item) in enumerate(rows):
+        if limit is not None and count == limit:
+            break
+        if day != current and chunk:
+            yield b"".join(chunk)
+            chunk = []
+        current = day
+        chunk.append(orjson.dumps(to_row(item)) + b"\n")
+    if chunk:
+        yield b"".join(chunk)
+
+
+def _assignment_rows(schedule: ScheduleOutput, filters: ScheduleFilter, cursor: Cursor | None):
+    index = schedule_index(schedule)
+    return _scan(index.assignment_days, index.assignments, filters, _assignment_matches(filters), cursor)
+
+
+def _call_rows(schedule: ScheduleOutput, filters: ScheduleFilter, cursor: Cursor | None):
+    index = schedule_index(schedule)
+    return _scan(index.call_days, index.calls, filters, _call_matches(filters), cursor)
+
+
+def page_assignments(
+    schedule: ScheduleOutput, filters: ScheduleFilter, cursor: Cursor | None = None, limit: int = DEFAULT_PAGE_SIZE
+) -> Page:
+    return _page(_assignment_rows(schedule, filters, cursor), assignment_row, limit)
+
+
+def page_calls(
+    schedule: ScheduleOutput, filters: ScheduleFilter, cursor: Cursor | None = None, limit: int = DEFAULT_PAGE_SIZE
+) -> Page:
+    return _page(_call_rows(schedule, filters, cursor), call_row, limit)
+
+
+def stream_assignments(
+    schedule: ScheduleOutput, filters: ScheduleFilter, cursor: Cursor | None = None, limit: int | None = None
+) -> Iterator[bytes]:
+    return _ndjson(_assignment_rows(schedule, filters, cursor), assignment_row, limit)
+
+
+def stream_calls(
+    schedule: ScheduleOutput, filters: ScheduleFilter, cursor: Cursor | None = None, limit: int | None = None
+) -> Iterator[bytes]:
+    return _ndjson(_call_rows(schedule, filters, cursor), call_row, limit)
@@ -4,6 +4,7 @@ from dataclasses import dataclass
 from datetime import date
 from typing import Iterable
 
+from app.core.calendar import federal_holidays
 from app.db.session import InMemorySession
 from app.models import (
     CoverageRequirement,
@@ -51,16 +52,7 @@ HOSPITALS = [
     ("WTH", "Washington Township Hospital"),
 ]
 
-FEDERAL_HOLIDAYS_2026 = [
-    (date(2026, 1, 1), "New Year's Day"),
-    (date(2026, 1, 19), "MLK Day"),
-    (date(2026, 2, 16), "Presidents Day"),
-    (date(2026, 5, 25), "Memorial Day"),
-    (date(2026, 7, 3), "Independence Day Observed"),
-    (date(2026, 9, 7), "Labor Day"),
-    (date(2026, 11, 26), "Thanksgiving"),
-    (date(2026, 12, 25), "Christmas"),
-]
+FEDERAL_HOLIDAYS_2026 = federal_holidays(2026)
 
 
 MD_SEEDS: list[ProviderSeed] = []
@@ -301,8 +293,8 @@ def seed_coverage(session: InMemorySession) -> None:
 
     # WT hospital requirement 1 MD + 2 APNs
     for dow in range(5):
-        add_req("hospital", "WTH", dow, "AM", 1, 2, roles={"md": 1, "apn": 2})
-        add_req("hospital", "WTH", dow, "PM", 1, 2, roles={"md": 1, "apn": 2})
+        add_req("hospital", "WTH", dow, "AM", 1, 2, roles={"md": 1, "apn": 2, "md_shift": "day"})
+        add_req("hospital", "WTH", dow, "PM", 1, 2, roles={"md": 1, "apn": 2, "md_shift": "day"})
 
     # RMC pairing
     for dow in range(5):
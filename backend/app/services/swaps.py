@@ -0,0 +1,234 @@
+from __future__ import annotations
+
+import threading
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import date, datetime
+
+from app.config.registry import CompiledRules
+from app.core.events import ChangeEvent
+from app.db.session import InMemorySession
+from app.models import Provider, VacationRequest
+from app.services.fairness import CALL_METRICS, FairnessIndex
+from app.solver.engine import CALL_POOLS, CallAssignment, ScheduleOutput, call_label, call_pools
+from app.solver.weekend_flow import weekend_of
+
+OPEN = "OPEN"
+ACCEPTED = "ACCEPTED"
+DECLINED = "DECLINED"
+
+WEEKEND_CALL = "weekend_noninv"
+_WEEKEND_CALLS = {WEEKEND_CALL, "interventional_weekend"}
+
+# Why a swap cannot go ahead.
+NO_CALL = "no_call"
+NOT_HOLDER = "not_holder"
+ALREADY_ON_CALL = "already_on_call"
+INELIGIBLE = "ineligible"
+VACATION = "vacation"
+WEEKEND_TAKEN = "weekend_taken"
+WEEKEND_QUOTA = "weekend_quota"
+
+
+@dataclass(frozen=True)
+class SwapProblem:
+    date: date
+    call_type: str
+    provider: str
+    reason: str
+
+
+class SwapError(ValueError):
+    def __init__(self, problems: list[SwapProblem]) -> None:
+        super().__init__(f"{len(problems)} problem(s) with the swap")
+        self.problems = problems
+
+
+@dataclass(frozen=True)
+class CallMove:
+    date: date
+    call_type: str
+    giver: Provider
+    taker: Provider
+
+
+@dataclass
+class CallSwap:
+    id: int
+    giver: Provider
+    taker: Provider
+    date: date
+    call_type: str
+    # A trade: the taker hands this call of theirs back to the giver.
+    return_date: date | None = None
+    return_call_type: str | None = None
+    status: str = OPEN
+    created_at: datetime = field(default_factory=datetime.utcnow)
+
+    def moves(self) -> list[CallMove]:
+        moves = [CallMove(self.date, self.call_type, self.giver, self.taker)]
+        if self.return_date is not None and self.return_call_type is not None:
+            moves.append(CallMove(self.return_date, self.return_call_type, self.taker, self.giver))
+        return moves
+
+
+class SwapBoard:
+    """Proposed and settled call swaps of one stored run, and the indexes that check them.
+
+    Each moved call is checked with a fixed number of lookups: the call by
+    (date, type), the pool of each call type, approved leave per provider and
+    weekend counts per provider and year, so validating or applying a swap
+    costs the same however long the run is. Applying patches the call and the
+    indexes in place; a re-solve that changes the run rebuilds them.
+    """
+
+    def __init__(self, session: InMemorySession, schedule: ScheduleOutput, rules: CompiledRules) -> None:
+        self.session = session
+        self.schedule = schedule
+        self.lock = threading.RLock()
+        self._swaps: dict[int, CallSwap] = {}
+        self._next_id = 1
+        # Bumped whenever a swap is added or settled; read endpoints hash it into their ETag.
+        self.version = 0
+        # provider id -> approved days off, dropped when one of their vacation requests changes
+        self._off: dict[int, frozenset[date]] = {}
+        providers = session.all(Provider)
+        pools = {name: {p.id for p in pool} for name, pool in call_pools(providers).items()}
+        weekend_team = {p.id for p in providers if p.weekend_team_eligible}
+        self._eligible = {
+            call_type: frozenset(pools[pool] & weekend_team if call_type in _WEEKEND_CALLS else pools[pool])
+            for call_type, pool in CALL_POOLS.items()
+        }
+        callable_ids = set().union(*self._eligible.values())
+        self.providers = {p.initials: p for p in providers if p.id in callable_ids}
+        self._targets = {p.id: rules.weekend_targets.target_for(p) for p in self.providers.values()}
+        self.revision = -1
+        self.sync()
+
+    def sync(self) -> None:
+        """Rebuild the call indexes if the run was re-solved since they were built."""
+        with self.lock:
+            if self.revision == self.schedule.revision:
+                return
+            self._calls: dict[tuple[date, str], CallAssignment] = {}
+            self._weekends: Counter = Counter()  # (provider id, year) -> weekend calls
+            self._held: Counter = Counter()  # (provider id, weekend Friday) -> weekend calls
+            for call in self.schedule.call_assignments:
+                self._calls[(call.date, call.call_type)] = call
+                if call.call_type == WEEKEND_CALL:
+                    for provider in call.providers:
+                        self._count_weekend(provider, call.date, 1)
+            self.revision = self.schedule.revision
+
+    def _count_weekend(self, provider: Provider, day: date, delta: int) -> None:
+        self._weekends[(provider.id, day.year)] += delta
+        self._held[(provider.id, weekend_of(day))] += delta
+
+    def observe(self, event: ChangeEvent) -> None:
+        for provider_id in event.provider_ids:
+            self._off.pop(provider_id, None)
+
+    def _days_off(self, provider_id: int) -> frozenset[date]:
+        days = self._off.get(provider_id)
+        if days is None:
+            days = self._off[provider_id] = frozenset(
+                date.fromordinal(ordinal)
+                for request in self.session.all(VacationRequest)
+                if request.provider_id == provider_id and request.status == "APPROVED"
+                for ordinal in range(request.start_date.toordinal(), request.end_date.toordinal() + 1)
+            )
+        return days
+
+    def problems(self, swap: CallSwap) -> list[SwapProblem]:
+        moves = swap.moves()
+        problems: list[SwapProblem] = []
+        weekend_moves = [move for move in moves if move.call_type == WEEKEND_CALL]
+        released = Counter((move.giver.id, weekend_of(move.date)) for move in weekend_moves)
+        for move in moves:
+            call = self._calls.get((move.date, move.call_type))
+            if call is None:
+                problems.append(SwapProblem(move.date, move.call_type, move.giver.initials, NO_CALL))
+                continue
+            reasons = []
+            if all(p.id != move.giver.id for p in call.providers):
+                problems.append(SwapProblem(move.date, move.call_type, move.giver.initials, NOT_HOLDER))
+            if any(p.id == move.taker.id for p in call.providers):
+                reasons.append(ALREADY_ON_CALL)
+            if move.taker.id not in self._eligible[move.call_type]:
+                reasons.append(INELIGIBLE)
+            if move.date in self._days_off(move.taker.id):
+                reasons.append(VACATION)
+            weekend = (move.taker.id, weekend_of(move.date))
+            if move.call_type == WEEKEND_CALL and self._held[weekend] - released[weekend] > 0:
+                reasons.append(WEEKEND_TAKEN)
+            problems.extend(SwapProblem(move.date, move.call_type, move.taker.initials, reason) for reason in reasons)
+        # A trade of two weekend days leaves both counts where they were.
+        gained: Counter = Counter()
+        for move in weekend_moves:
+            gained[(move.taker.id, move.date.year)] += 1
+            gained[(move.giver.id, move.date.year)] -= 1
+        for move in weekend_moves:
+            key = (move.taker.id, move.date.year)
+            if gained[key] > 0 and self._weekends[key] + gained[key] > self._targets.get(move.taker.id, 0):
+                problems.append(SwapProblem(move.date, move.call_type, move.taker.initials, WEEKEND_QUOTA))
+        return problems
+
+    def propose(
+        self,
+        giver: Provider,
+        taker: Provider,
+        day: date,
+        call_type: str,
+        return_date: date | None = None,
+        return_call_type: str | None = None,
+    ) -> CallSwap:
+        with self.lock:
+            self.sync()
+            swap = CallSwap(self._next_id, giver, taker, day, call_type, return_date, return_call_type)
+            problems = self.problems(swap)
+            if problems:
+                raise SwapError(problems)
+            self._swaps[swap.id] = swap
+            self._next_id += 1
+            self.version += 1
+            return swap
+
+    def get(self, swap_id: int) -> CallSwap | None:
+        return self._swaps.get(swap_id)
+
+    def swaps(self, status: str | None = None) -> list[CallSwap]:
+        return [swap for swap in self._swaps.values() if status is None or swap.status == status]
+
+    def decline(self, swap: CallSwap) -> CallSwap:
+        with self.lock:
+            if swap.status == OPEN:
+                swap.status = DECLINED
+                self.version += 1
+            return swap
+
+    def accept(self, swap: CallSwap, index: FairnessIndex | None = None) -> list[CallAssignment]:
+        """Check the swap again and patch it into the run; returns the calls it changed."""
+        with self.lock:
+            self.sync()
+            problems = self.problems(swap)
+            if problems:
+                raise SwapError(problems)
+            changed = []
+            for move in swap.moves():
+                call = self._calls[(move.date, move.call_type)]
+                call.providers = [move.taker if p.id == move.giver.id else p for p in call.providers]
+                call.label = call_label(call.call_type, call.providers)
+                if call.call_type == WEEKEND_CALL:
+                    self._count_weekend(move.giver, move.date, -1)
+                    self._count_weekend(move.taker, move.date, 1)
+                if index is not None:
+                    index.move(CALL_METRICS[call.call_type], move.date, move.giver.initials, move.taker.initials)
+                changed.append(call)
+            swap.status = ACCEPTED
+            self.version += 1
+            self.schedule.revision += 1
+            self.revision = self.schedule.revision
+            if index is not None:
+                index.revision = self.schedule.revision
+            return changed
+
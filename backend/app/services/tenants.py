@@ -0,0 +1,300 @@
+from __future__ import annotations
+
+import importlib
+import json
+import threading
+from dataclasses import replace
+from datetime import date
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, Iterable
+
+from app.config.registry import CompiledRules, RulesRegistry, get_rules_registry
+from app.core.config import BASE_DIR, Settings, settings
+from app.core.events import ChangeEvent, EventBus
+from app.db.session import InMemorySession
+from app.models import SolveRun
+from app.services.fairness import FairnessIndex
+from app.services.feasibility import FEASIBILITY_INPUTS, FeasibilityIndex
+from app.services.invalidation import SCHEDULE_INPUTS, ProviderVersions, StaleWeeks
+from app.services.seed import seed_all
+from app.services.swaps import CallSwap, SwapBoard
+from app.solver.archive import RunArchive
+from app.solver.engine import ScheduleOutput
+from app.solver.pins import save_pin
+from app.solver.trace import DecisionTrace
+
+DEFAULT_TENANT_ID = "default"
+
+SeedFn = Callable[[InMemorySession], None]
+
+_PATH_FIELDS = ("rules_config_path", "template_path", "mapping_config_path", "rules_store_path")
+
+
+class Tenant:
+    def __init__(
+        self,
+        tenant_id: str,
+        name: str = "",
+        tenant_settings: Settings | None = None,
+        seed: SeedFn = seed_all,
+        rules: RulesRegistry | None = None,
+    ) -> None:
+        self.id = tenant_id
+        self.name = name or tenant_id
+        self.settings = tenant_settings or settings
+        self.rules = rules or RulesRegistry(self.settings.rules_config_path, self.settings.rules_store_path)
+        self._seed = seed
+        self._session: InMemorySession | None = None
+        self._outputs: dict[int, ScheduleOutput] = {}
+        # Solve run id -> archive run id; solve run ids restart with the process, archive ids do not.
+        self._archived: dict[int, int] = {}
+        # Solve run id -> accepted swaps not yet in its archived copy.
+        self._unarchived_swaps: dict[int, int] = {}
+        self._archive: RunArchive | None = None
+        self._fairness: dict[int, FairnessIndex] = {}
+        self._traces: dict[int, DecisionTrace] = {}
+        self._swaps: dict[int, SwapBoard] = {}
+        self._feasibility: FeasibilityIndex | None = None
+        self._unsubscribe_feasibility: Callable[[], None] | None = None
+        # Solve run id -> lock held by whatever changes that stored run in place.
+        self._run_locks: dict[int, threading.Lock] = {}
+        self.provider_versions = ProviderVersions()
+        self.stale_weeks = StaleWeeks(self._run_windows)
+        self._lock = threading.Lock()
+
+    @property
+    def session(self) -> InMemorySession:
+        session = self._session
+        if session is None:
+            with self._lock:
+                if self._session is None:
+                    session = InMemorySession()
+                    self._seed(session)
+                    session.events.subscribe(self.provider_versions.observe)
+                    session.events.subscribe(self.stale_weeks.observe, SCHEDULE_INPUTS)
+                    session.events.subscribe(self._schedule_changed, ("schedule",))
+                    self._session = session
+                session = self._session
+        return session
+
+    @property
+    def events(self) -> EventBus:
+        return self.session.events
+
+    def record_run(
+        self,
+        start_date: date,
+        end_date: date,
+        schedule: ScheduleOutput,
+        trace: DecisionTrace | None = None,
+        status: str = "SOLVED",
+    ) -> SolveRun:
+        solve_run = SolveRun(
+            label=f"{start_date}__{end_date}",
+            start_date=start_date,
+            end_date=end_date,
+            status=status,
+            rules_version=schedule.rules_version,
+            objective_breakdown_json={"assignments": len(schedule.assignments)},
+        )
+        session = self.session
+        session.add(solve_run)
+        session.commit()
+        self._outputs[solve_run.id] = schedule
+        if trace is not None:
+            self._traces[solve_run.id] = trace
+        self.archive_run(solve_run.id)
+        return solve_run
+
+    @property
+    def archive(self) -> RunArchive | None:
+        directory = self.settings.archive_path
+        if directory is None:
+            return None
+        with self._lock:
+            if self._archive is None:
+                self._archive = RunArchive(Path(directory) / f"{self.id}.runs")
+        return self._archive
+
+    def archive_run(self, solve_run_id: int) -> int | None:
+        """Write a stored run to the archive, replacing the copy written before it was extended or repaired."""
+        archive = self.archive
+        schedule = self._outputs.get(solve_run_id)
+        if archive is None or schedule is None:
+            return None
+        solve_run = self.session.get(SolveRun, solve_run_id)
+        archive_id = archive.append(schedule, run_id=self._archived.get(solve_run_id), label=solve_run.label)
+        self._archived[solve_run_id] = archive_id
+        self._unarchived_swaps.pop(solve_run_id, None)
+        return archive_id
+
+    def flush_archive(self) -> None:
+        """Archive the runs holding swaps that have not been written yet."""
+        for solve_run_id in list(self._unarchived_swaps):
+            self.archive_run(solve_run_id)
+
+    def schedule_for(self, solve_run_id: int) -> ScheduleOutput | None:
+        return self._outputs.get(solve_run_id)
+
+    def trace_for(self, solve_run_id: int) -> DecisionTrace | None:
+        return self._traces.get(solve_run_id)
+
+    def run_lock(self, solve_run_id: int) -> threading.Lock:
+        """Lock to hold while extending, repairing or patching a stored run."""
+        with self._lock:
+            lock = self._run_locks.get(solve_run_id)
+            if lock is None:
+                lock = self._run_locks[solve_run_id] = threading.Lock()
+        return lock
+
+    def run_changed(self, solve_run_id: int, since: date, until: date | None = None) -> None:
+        """A stored run was extended or repaired over ``since..until``; tell whatever is derived from it."""
+        solve_run = self.session.get(SolveRun, solve_run_id)
+        self.events.publish(ChangeEvent("schedule", solve_run_id, "resolved", since, until or solve_run.end_date))
+
+    def _schedule_changed(self, event: ChangeEvent) -> None:
+        schedule = self._outputs.get(event.entity_id)
+        index = self._fairness.get(event.entity_id)
+        if index is not None and schedule is not None and index.revision != schedule.revision:
+            index.update(schedule, event.start)
+        if event.action == "resolved":
+            self.stale_weeks.clear(event.entity_id, event.start, event.end)
+        elif event.action == "swapped" and self.archive is not None:
+            # A swap moves a handful of calls; rewriting the whole run for each is batched instead.
+            with self._lock:
+                pending = self._unarchived_swaps[event.entity_id] = self._unarchived_swaps.get(event.entity_id, 0) + 1
+            if pending < self.settings.archive_swap_batch:
+                return
+        self.archive_run(event.entity_id)
+
+    def swap_board(self, solve_run_id: int) -> SwapBoard | None:
+        schedule = self._outputs.get(solve_run_id)
+        if schedule is None:
+            return None
+        board = self._swaps.get(solve_run_id)
+        if board is None:
+            solve_run = self.session.get(SolveRun, solve_run_id)
+            try:
+                rules = self.rules.get(solve_run.rules_version) if solve_run.rules_version else self.rules.active
+            except KeyError:
+                # Only the weekend targets are read; the active ones are the best stand-in.
+                rules = self.rules.active
+            with self._lock:
+                board = self._swaps.get(solve_run_id)
+                if board is None:
+                    board = self._swaps[solve_run_id] = SwapBoard(self.session, schedule, rules)
+                    self.session.events.subscribe(board.observe, ("VacationRequest",))
+        return board
+
+    def accept_swap(self, solve_run_id: int, swap: CallSwap) -> None:
+        """Patch an agreed swap into the stored run and pin the calls it moved, without a re-solve."""
+        board = self.swap_board(solve_run_id)
+        index = self.fairness_index(solve_run_id)
+        with self.run_lock(solve_run_id), board.lock:
+            changed = board.accept(swap, index)
+            # The pins keep the swap through later repairs; this run already shows it.
+            with self.stale_weeks.applied(solve_run_id):
+                for call in changed:
+                    save_pin(self.session, call.date, call.call_type, None, call.providers)
+        days = [call.date for call in changed]
+        providers = frozenset((swap.giver.id, swap.taker.id))
+        self.events.publish(ChangeEvent("schedule", solve_run_id, "swapped", min(days), max(days), providers))
+
+    def _run_windows(self) -> dict[int, tuple[date, date]]:
+        session = self.session
+        return {run_id: (run.start_date, run.end_date) for run_id in list(self._outputs) if (run := session.get(SolveRun, run_id))}
+
+    def fairness_index(self, solve_run_id: int) -> FairnessIndex | None:
+        schedule = self._outputs.get(solve_run_id)
+        if schedule is None:
+            return None
+        index = self._fairness.get(solve_run_id)
+        if index is None or index.revision != schedule.revision:
+            index = self._fairness[solve_run_id] = FairnessIndex(schedule)
+        return index
+
+    def feasibility_index(self, rules: CompiledRules) -> FeasibilityIndex:
+        """Slack index for ``rules``, kept across requests and trimmed by the session's events."""
+        session = self.session
+        with self._lock:
+            index = self._feasibility
+            if index is None or index.rules.version != rules.version:
+                if self._unsubscribe_feasibility is not None:
+                    self._unsubscribe_feasibility()
+                index = self._feasibility = FeasibilityIndex(session, rules)
+                self._unsubscribe_feasibility = session.events.subscribe(index.observe, FEASIBILITY_INPUTS)
+        return index
+
+    def latest_run_id(self) -> int | None:
+        return max(self._outputs, default=None)
+
+
+class TenantRegistry:
+    def __init__(self, tenants: Iterable[Tenant] = ()) -> None:
+        self._tenants: dict[str, Tenant] = {}
+        for tenant in tenants:
+            self.register(tenant)
+
+    def register(self, tenant: Tenant) -> Tenant:
+        self._tenants[tenant.id] = tenant
+        return tenant
+
+    def get(self, tenant_id: str) -> Tenant | None:
+        return self._tenants.get(tenant_id)
+
+    def ids(self) -> list[str]:
+        return list(self._tenants)
+
+    def __iter__(self):
+        return iter(self._tenants.values())
+
+
+def _import_seed(dotted: str) -> SeedFn:
+    module_name, _, attr = dotted.partition(":")
+    return getattr(importlib.import_module(module_name), attr or "seed_all")
+
+
+def _tenant_settings(tenant_id: str, entry: dict) -> Settings:
+    overrides = {}
+    for key in _PATH_FIELDS:
+        if key in entry:
+            path = Path(entry[key])
+            overrides[key] = path if path.is_absolute() else BASE_DIR / path
+    if tenant_id != DEFAULT_TENANT_ID:
+        overrides.setdefault("rules_store_path", settings.rules_store_path / tenant_id)
+    return replace(settings, **overrides) if overrides else settings
+
+
+def load_tenants(path: Path | None = None) -> TenantRegistry:
+    target = path or settings.tenants_config_path
+    entries = []
+    if target.exists():
+        with target.open("r", encoding="utf-8") as fh:
+            entries = json.load(fh).get("tenants", [])
+
+    registry = TenantRegistry()
+    for entry in entries:
+        tenant_id = entry["id"]
+        tenant_settings = _tenant_settings(tenant_id, entry)
+        rules = None
+        if tenant_settings is settings:
+            # The default practice shares the process-wide registry used by /config/rules.
+            rules = get_rules_registry()
+        registry.register(
+            Tenant(
+                tenant_id,
+                name=entry.get("name", tenant_id),
+                tenant_settings=tenant_settings,
+                seed=_import_seed(entry.get("seed", "app.services.seed:seed_all")),
+                rules=rules,
+            )
+        )
+    if registry.get(DEFAULT_TENANT_ID) is None:
+        registry.register(Tenant(DEFAULT_TENANT_ID, rules=get_rules_registry()))
+    return registry
+
+
+@lru_cache
+def get_tenants() -> TenantRegistry:
+    return load_tenants()
@@ -0,0 +1,291 @@
+from __future__ import annotations
+
+import csv
+import io
+import re
+import zipfile
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from typing import Any, Iterable
+from xml.etree import ElementTree
+
+import orjson
+
+from app.core.calendar import calendar_for
+from app.db.session import InMemorySession
+from app.models import Holiday, Provider, VacationAllowance, VacationRequest
+
+IMPORT_FORMATS = ("csv", "xlsx", "json")
+# Requests in these states no longer hold the days, so they never conflict with a new row.
+INACTIVE_STATUSES = {"REJECTED", "CANCELLED"}
+CHARGED_STATUS = "APPROVED"
+
+_XLSX_NS = {"m": "http://schemas.openxmlformats.org/spreadsheetml/2006/main"}
+_REL_NS = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}id"
+_EXCEL_EPOCH = date(1899, 12, 30)
+
+
+@dataclass(frozen=True)
+class ImportIssue:
+    row: int
+    message: str
+
+
+@dataclass(frozen=True)
+class VacationRow:
+    row: int
+    provider: Provider
+    start_date: date
+    end_date: date
+    block: str
+    status: str
+
+
+@dataclass
+class ImportResult:
+    created: list[VacationRequest] = field(default_factory=list)
+    window: tuple[date, date] | None = None
+
+
+class VacationImportError(ValueError):
+    def __init__(self, issues: list[ImportIssue]) -> None:
+        super().__init__(f"{len(issues)} invalid vacation row(s)")
+        self.issues = issues
+
+
+# parsing --------------------------------------------------------------------
+
+
+def _read_csv(content: bytes) -> list[dict[str, Any]]:
+    return list(csv.DictReader(io.StringIO(content.decode("utf-8-sig"))))
+
+
+def _read_json(content: bytes) -> list[dict[str, Any]]:
+    data = orjson.loads(content)
+    if isinstance(data, dict):
+        data = data.get("rows", [])
+    if not isinstance(data, list) or not all(isinstance(row, dict) for row in data):
+        raise ValueError("JSON import must be a list of objects or {\"rows\": [...]}")
+    return data
+
+
+def _column(ref: str | None) -> int:
+    match = re.match(r"[A-Z]+", ref or "")
+    if match is None:
+        raise ValueError(f"Bad cell reference: {ref!r}")
+    index = 0
+    for char in match.group(0):
+        index = index * 26 + ord(char) - 64
+    return index - 1
+
+
+def _read_xlsx(content: bytes) -> list[dict[str, Any]]:
+    """Rows of the first worksheet, keyed by the header row; only values are read, not styles."""
+    with zipfile.ZipFile(io.BytesIO(content)) as zf:
+        names = set(zf.namelist())
+        shared: list[str] = []
+        if "xl/sharedStrings.xml" in names:
+            root = ElementTree.fromstring(zf.read("xl/sharedStrings.xml"))
+            shared = ["".join(t.text or "" for t in si.iter(f"{{{_XLSX_NS['m']}}}t")) for si in root.findall("m:si", _XLSX_NS)]
+        workbook = ElementTree.fromstring(zf.read("xl/workbook.xml"))
+        first = workbook.find("m:sheets/m:sheet", _XLSX_NS)
+        if first is None:
+            raise ValueError("Workbook has no worksheets")
+        rels = ElementTree.fromstring(zf.read("xl/_rels/workbook.xml.rels"))
+        target = next((rel.get("Target") for rel in rels if rel.get("Id") == first.get(_REL_NS)), None)
+        if not target:
+            raise ValueError("Workbook does not link its first worksheet")
+        sheet = ElementTree.fromstring(zf.read("xl/" + target.lstrip("/").removeprefix("xl/")))
+
+    table: list[list[Any]] = []
+    for row in sheet.iterfind("m:sheetData/m:row", _XLSX_NS):
+        values: list[Any] = []
+        for cell in row.findall("m:c", _XLSX_NS):
+            column = _column(cell.get("r"))
+            values.extend([None] * (column + 1 - len(values)))
+            kind = cell.get("t")
+            if kind == "inlineStr":
+                values[column] = "".join(t.text or "" for t in cell.iter(f"{{{_XLSX_NS['m']}}}t"))
+                continue
+            raw = cell.findtext("m:v", default=None, namespaces=_XLSX_NS)
+            if raw is None:
+                continue
+            if kind == "s":
+                values[column] = shared[int(raw)]
+            elif kind in ("str", "b"):
+                values[column] = raw
+            else:
+                number = float(raw)
+                values[column] = int(number) if number.is_integer() else number
+        table.append(values)
+    if not table:
+        return []
+    header = [str(name).strip() if name is not None else "" for name in table[0]]
+    return [dict(zip(header, values)) for values in table[1:] if any(v not in (None, "") for v in values)]
+
+
+_READERS = {"csv": _read_csv, "json": _read_json, "xlsx": _read_xlsx}
+
+
+def parse_rows(content: bytes, fmt: str) -> list[dict[str, Any]]:
+    if fmt not in _READERS:
+        raise ValueError(f"Unsupported import format: {fmt}")
+    try:
+        return _READERS[fmt](content)
+    except (UnicodeDecodeError, orjson.JSONDecodeError, zipfile.BadZipFile, ElementTree.ParseError, KeyError, IndexError) as exc:
+        raise ValueError(f"Unreadable {fmt} import") from exc
+
+
+def _to_date(value: Any) -> date:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    if isinstance(value, (int, float)):
+        # Spreadsheet serial day number.
+        return _EXCEL_EPOCH + timedelta(days=int(value))
+    return date.fromisoformat(str(value).strip()[:10])
+
+
+# validation -----------------------------------------------------------------
+
+
+def _normalise(
+    raw_rows: list[dict[str, Any]], by_id: dict[int, Provider], by_initials: dict[str, list[Provider]]
+) -> tuple[list[VacationRow], list[ImportIssue]]:
+    rows: list[VacationRow] = []
+    issues: list[ImportIssue] = []
+    for number, raw in enumerate(raw_rows, start=1):
+        raw = {str(k).strip().lower(): v for k, v in raw.items() if k is not None}
+        key = raw.get("provider_id") or raw.get("provider") or raw.get("initials")
+        candidates: list[Provider] = []
+        if key not in (None, ""):
+            text = str(key).strip()
+            if text.isdigit():
+                candidates = [by_id[int(text)]] if int(text) in by_id else []
+            else:
+                candidates = by_initials.get(text.upper(), [])
+                provider_type = str(raw.get("type") or raw.get("provider_type") or "").strip().upper()
+                if provider_type:
+                    candidates = [p for p in candidates if p.type == provider_type]
+        if not candidates:
+            issues.append(ImportIssue(number, f"Unknown provider: {key}"))
+            continue
+        if len(candidates) > 1:
+            types = ", ".join(sorted(p.type for p in candidates))
+            issues.append(ImportIssue(number, f"{key} names more than one provider ({types}); give provider_id or type"))
+            continue
+        provider = candidates[0]
+        try:
+            start, end = _to_date(raw.get("start_date")), _to_date(raw.get("end_date"))
+        except (TypeError, ValueError):
+            issues.append(ImportIssue(number, "Invalid start_date/end_date"))
+            continue
+        if end < start:
+            issues.append(ImportIssue(number, "end_date is before start_date"))
+            continue
+        block = str(raw.get("block") or "FULLDAY").strip().upper()
+        status = str(raw.get("status") or CHARGED_STATUS).strip().upper()
+        rows.append(VacationRow(number, provider, start, end, block, status))
+    return rows, issues
+
+
+def _overlaps(rows: list[VacationRow], existing: Iterable[VacationRequest]) -> list[ImportIssue]:
+    """Sort-and-sweep per provider; only conflicts that involve an imported row are reported."""
+    intervals: dict[int, list[tuple[date, date, int]]] = defaultdict(list)
+    for request in existing:
+        if request.status not in INACTIVE_STATUSES:
+            intervals[request.provider_id].append((request.start_date, request.end_date, 0))
+    for row in rows:
+        intervals[row.provider.id].append((row.start_date, row.end_date, row.row))
+
+    issues: list[ImportIssue] = []
+    for spans in intervals.values():
+        spans.sort()
+        reach: tuple[date, date, int] | None = None
+        for span in spans:
+            if reach is not None and span[0] <= reach[1]:
+                new, other = (span, reach) if span[2] else (reach, span)
+                if new[2]:
+                    kind = "Duplicate of" if span[:2] == reach[:2] else "Overlaps"
+                    label = f"row {other[2]}" if other[2] else "an existing request"
+                    issues.append(ImportIssue(new[2], f"{kind} {label} ({other[0]}..{other[1]})"))
+            if reach is None or span[1] > reach[1]:
+                reach = span
+    return issues
+
+
+def _charges(session: InMemorySession, rows: list[VacationRow]) -> dict[tuple[int, int], int]:
+    """Working days charged to each (provider, year) allowance by the approved rows."""
+    charged = [row for row in rows if row.status == CHARGED_STATUS]
+    if not charged:
+        return {}
+    start = min(row.start_date for row in charged)
+    end = max(row.end_date for row in charged)
+    table = calendar_for(start, end, session.all(Holiday))
+    workday = table.workday
+    charges: dict[tuple[int, int], int] = defaultdict(int)
+    for row in charged:
+        offset = table.index(row.start_date)
+        for i, day in enumerate(table.between(row.start_date, row.end_date)):
+            if workday[offset + i]:
+                charges[(row.provider.id, day.year)] += 1
+    return charges
+
+
+def import_vacations(session: InMemorySession, raw_rows: list[dict[str, Any]]) -> ImportResult:
+    """Validate every row up front and insert all of them or none.
+
+    Raises ``VacationImportError`` carrying every problem found, so a batch is
+    fixed in one round trip rather than row by row.
+    """
+    providers = session.all(Provider)
+    by_id = {p.id: p for p in providers}
+    # An MD and an APN can share initials; rows naming such initials must say which one.
+    by_initials: dict[str, list[Provider]] = defaultdict(list)
+    for provider in providers:
+        by_initials[provider.initials.upper()].append(provider)
+    rows, issues = _normalise(raw_rows, by_id, by_initials)
+    issues += _overlaps(rows, session.all(VacationRequest))
+
+    allowances = {(a.provider_id, a.year): a for a in session.all(VacationAllowance)}
+    charges = _charges(session, rows)
+    first_row = {}
+    for row in rows:
+        for year in range(row.start_date.year, row.end_date.year + 1):
+            first_row.setdefault((row.provider.id, year), row.row)
+    for (provider_id, year), days in sorted(charges.items()):
+        allowance = allowances.get((provider_id, year))
+        initials = by_id[provider_id].initials
+        if allowance is None:
+            issues.append(ImportIssue(first_row[(provider_id, year)], f"No {year} vacation allowance for {initials}"))
+        elif allowance.days_used + days > allowance.days_total:
+            remaining = allowance.days_total - allowance.days_used
+            issues.append(
+                ImportIssue(first_row[(provider_id, year)], f"{initials} needs {days} day(s) in {year}, {remaining} left")
+            )
+    if issues:
+        raise VacationImportError(sorted(issues, key=lambda issue: issue.row))
+
+    result = ImportResult()
+    for row in rows:
+        request = VacationRequest(
+            provider_id=row.provider.id,
+            start_date=row.start_date,
+            end_date=row.end_date,
+            block=row.block,
+            status=row.status,
+            audit_json={"source": "import", "row": row.row},
+        )
+        session.add(request)
+        result.created.append(request)
+    for key, days in charges.items():
+        allowances[key].days_used += days
+        session.add(allowances[key])
+    session.commit()
+
+    approved = [row for row in rows if row.status == CHARGED_STATUS]
+    if approved:
+        result.window = (min(r.start_date for r in approved), max(r.end_date for r in approved))
+    return result
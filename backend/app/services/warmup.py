@@ -0,0 +1,30 @@
+from __future__ import annotations
+
+import time
+from datetime import date
+from typing import Callable
+
+from app.core.calendar import calendar_for
+from app.models import Holiday
+from app.services.tenants import TenantRegistry, get_tenants
+from app.solver.exporter import load_mapping, load_template
+
+
+def _timed(timings: dict[str, float], name: str, step: Callable[[], object]) -> None:
+    started = time.perf_counter()
+    step()
+    timings[name] = time.perf_counter() - started
+
+
+def warm_up(tenants: TenantRegistry | None = None) -> dict[str, float]:
+    """Pay the one-off costs of a tenant's first request up front; returns seconds per step."""
+    timings: dict[str, float] = {}
+    for tenant in tenants or get_tenants():
+        start = date.fromisoformat(tenant.settings.seed_window_start)
+        end = date.fromisoformat(tenant.settings.seed_window_end)
+        _timed(timings, f"{tenant.id}.seed", lambda: tenant.session)
+        _timed(timings, f"{tenant.id}.rules", lambda: tenant.rules.active)
+        _timed(timings, f"{tenant.id}.template", lambda: load_template(tenant.settings.template_path))
+        _timed(timings, f"{tenant.id}.calendar", lambda: calendar_for(start, end, tenant.session.all(Holiday)))
+    _timed(timings, "mapping", load_mapping)
+    return timings
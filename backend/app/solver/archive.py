@@ -0,0 +1,285 @@
+from __future__ import annotations
+
+import json
+import mmap
+import os
+import struct
+import tempfile
+import threading
+from dataclasses import dataclass
+from datetime import date
+from functools import lru_cache
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Iterator
+
+from app.solver.engine import ScheduleOutput
+
+if TYPE_CHECKING:
+    import numpy as np
+
+# File layout: MAGIC, then segments appended back to back. A segment is a
+# SEGMENT header, a JSON meta blob (code table, rules version, label), the date
+# index -- one uint32 record offset per day from ``start`` to ``end`` plus an end
+# offset -- and then ``count`` fixed-width RECORDs sorted by day. Every part is
+# padded to 8 bytes so the records can be viewed in place.
+MAGIC = b"CVARUN01"
+SEGMENT = struct.Struct("<4sIqqiiII")  # tag, flags, run id, supersedes, start, end, count, meta bytes
+SEGMENT_TAG = b"SEG\0"
+TOMBSTONE = 1
+MAX_PROVIDERS = 4
+RECORD = struct.Struct(f"<iBBH{MAX_PROVIDERS}i")  # day ordinal, kind, block, code, provider ids (-1 = empty)
+
+SESSION, CALL = 0, 1
+BLOCKS = ("AM", "PM")
+NO_BLOCK = 255
+NO_PROVIDER = -1
+
+
+def _pad(size: int) -> int:
+    return -size % 8
+
+
+@lru_cache(maxsize=1)
+def record_dtype() -> np.dtype:
+    np = _numpy()
+    return np.dtype(
+        [
+            ("day", "<i4"),
+            ("kind", "u1"),
+            ("block", "u1"),
+            ("code", "<u2"),
+            ("providers", "<i4", (MAX_PROVIDERS,)),
+        ]
+    )
+
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError as exc:  # pragma: no cover - depends on the install
+        raise RuntimeError("Reading archived runs needs numpy (pip install 'cardio-scheduler[archive]')") from exc
+    return numpy
+
+
+@dataclass(frozen=True)
+class Segment:
+    run_id: int
+    supersedes: int
+    tombstone: bool
+    start: int  # day ordinals, inclusive; both 0 when the run has no records
+    end: int
+    count: int
+    meta: dict[str, Any]
+    offset: int
+    index_offset: int
+    records_offset: int
+    size: int
+
+    @property
+    def codes(self) -> list[str]:
+        return self.meta.get("codes", [])
+
+
+def encode_run(run_id: int, schedule: ScheduleOutput, supersedes: int | None = None, label: str = "") -> bytes:
+    codes: dict[str, int] = {}
+    rows: list[tuple] = []
+
+    def provider_ids(providers) -> list[int]:
+        if len(providers) > MAX_PROVIDERS:
+            raise ValueError(f"At most {MAX_PROVIDERS} providers fit in an archived record")
+        return [p.id for p in providers] + [NO_PROVIDER] * (MAX_PROVIDERS - len(providers))
+
+    for assignment in schedule.assignments:
+        code = codes.setdefault(assignment.site_code, len(codes))
+        block = BLOCKS.index(assignment.block) if assignment.block in BLOCKS else NO_BLOCK
+        rows.append((assignment.date.toordinal(), SESSION, block, code, *provider_ids(assignment.providers)))
+    for call in schedule.call_assignments:
+        code = codes.setdefault(call.call_type, len(codes))
+        rows.append((call.date.toordinal(), CALL, NO_BLOCK, code, *provider_ids(call.providers)))
+    rows.sort(key=lambda row: row[0])
+
+    start, end = (rows[0][0], rows[-1][0]) if rows else (0, 0)
+    index = [0] * ((end - start + 1) if rows else 0)
+    position = 0
+    for offset in range(len(index)):
+        while position < len(rows) and rows[position][0] < start + offset:
+            position += 1
+        index[offset] = position
+    index.append(len(rows))
+    meta = {"codes": list(codes), "rules_version": schedule.rules_version, "label": label}
+    return _segment(run_id, 0, supersedes, start, end, rows, index, meta)
+
+
+def _segment(run_id, flags, supersedes, start, end, rows, index, meta) -> bytes:
+    meta_bytes = json.dumps(meta, separators=(",", ":")).encode("utf-8")
+    parts = [
+        SEGMENT.pack(SEGMENT_TAG, flags, run_id, -1 if supersedes is None else supersedes, start, end, len(rows), len(meta_bytes)),
+        meta_bytes,
+        b"\0" * _pad(len(meta_bytes)),
+        struct.pack(f"<{len(index)}I", *index),
+        b"\0" * _pad(4 * len(index)),
+    ]
+    parts.extend(RECORD.pack(*row) for row in rows)
+    return b"".join(parts)
+
+
+def scan_segments(buffer) -> list[Segment]:
+    """Every segment in file order; only headers and meta are read."""
+    if bytes(buffer[: len(MAGIC)]) != MAGIC:
+        raise ValueError("Not a run archive")
+    segments = []
+    offset = len(MAGIC)
+    while offset + SEGMENT.size <= len(buffer):
+        tag, flags, run_id, supersedes, start, end, count, meta_size = SEGMENT.unpack_from(buffer, offset)
+        if tag != SEGMENT_TAG:
+            raise ValueError(f"Corrupt run archive at byte {offset}")
+        meta_offset = offset + SEGMENT.size
+        index_offset = meta_offset + meta_size + _pad(meta_size)
+        days = end - start + 1 if count else 0
+        records_offset = index_offset + 4 * (days + 1) + _pad(4 * (days + 1))
+        size = records_offset + count * RECORD.size - offset
+        if offset + size > len(buffer):
+            break  # torn tail from an interrupted append; ignored until compaction
+        meta = json.loads(bytes(buffer[meta_offset : meta_offset + meta_size]))
+        segments.append(
+            Segment(run_id, supersedes, bool(flags & TOMBSTONE), start, end, count, meta, offset, index_offset, records_offset, size)
+        )
+        offset += size
+    return segments
+
+
+def live_segments(segments: list[Segment]) -> dict[int, Segment]:
+    """Latest segment per run, minus runs that were superseded or withdrawn."""
+    live: dict[int, Segment] = {}
+    for segment in segments:
+        if segment.supersedes >= 0:
+            live.pop(segment.supersedes, None)
+        if segment.tombstone:
+            live.pop(segment.run_id, None)
+        else:
+            live[segment.run_id] = segment
+    return live
+
+
+class ArchiveReader:
+    """Read-only ``mmap`` of an archive; records come back as NumPy views, never copied.
+
+    Views point into the map, so drop them before calling ``close``.
+    """
+
+    def __init__(self, path: Path) -> None:
+        with open(path, "rb") as fh:
+            self._map = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        self.segments = scan_segments(self._map)
+        self.runs = live_segments(self.segments)
+
+    def __enter__(self) -> ArchiveReader:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._map.close()
+
+    def day_span(self, segment: Segment, start: date | None = None, end: date | None = None) -> tuple[int, int]:
+        """Record positions ``[lo, hi)`` covering ``start..end`` within one run, via its date index."""
+        if not segment.count:
+            return 0, 0
+        first = max(start.toordinal() if start else segment.start, segment.start)
+        last = min(end.toordinal() if end else segment.end, segment.end)
+        if first > last:
+            return 0, 0
+        (lo,) = struct.unpack_from("<I", self._map, segment.index_offset + 4 * (first - segment.start))
+        (hi,) = struct.unpack_from("<I", self._map, segment.index_offset + 4 * (last - segment.start + 1))
+        return lo, hi
+
+    def records(self, segment: Segment, start: date | None = None, end: date | None = None) -> np.ndarray:
+        lo, hi = self.day_span(segment, start, end)
+        dtype = record_dtype()
+        return _numpy().frombuffer(self._map, dtype=dtype, count=hi - lo, offset=segment.records_offset + lo * dtype.itemsize)
+
+    def scan(self, start: date | None = None, end: date | None = None) -> Iterator[tuple[Segment, np.ndarray]]:
+        """Live runs overlapping ``start..end`` with their records in that window."""
+        for segment in self.runs.values():
+            if not segment.count:
+                continue
+            if (start and segment.end < start.toordinal()) or (end and segment.start > end.toordinal()):
+                continue
+            yield segment, self.records(segment, start, end)
+
+
+class RunArchive:
+    """Append-only file of solved runs.
+
+    Appending a run under an existing id, or naming an older run in
+    ``supersedes``, hides the earlier copy from readers; ``compact`` rewrites the
+    file with live runs only. Readers map the file as it was when opened, so an
+    append or compaction never disturbs a scan in progress.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        if not self.path.exists():
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self.path.write_bytes(MAGIC)
+        segments = scan_segments(self.path.read_bytes())
+        self._next_id = max((s.run_id for s in segments), default=0) + 1
+        # Appends always start after the last complete segment, overwriting any torn tail.
+        self._end = segments[-1].offset + segments[-1].size if segments else len(MAGIC)
+
+    def append(self, schedule: ScheduleOutput, run_id: int | None = None, supersedes: int | None = None, label: str = "") -> int:
+        with self._lock:
+            if run_id is None:
+                run_id = self._next_id
+            self._write(encode_run(run_id, schedule, supersedes, label))
+            self._next_id = max(self._next_id, run_id + 1)
+        return run_id
+
+    def supersede(self, run_id: int) -> None:
+        """Withdraw a run without replacing it."""
+        with self._lock:
+            self._write(_segment(run_id, TOMBSTONE, None, 0, 0, [], [0], {}))
+
+    def _write(self, data: bytes) -> None:
+        with open(self.path, "r+b") as fh:
+            fh.seek(self._end)
+            fh.write(data)
+            fh.truncate()
+            fh.flush()
+            os.fsync(fh.fileno())
+        self._end += len(data)
+
+    def open(self) -> ArchiveReader:
+        return ArchiveReader(self.path)
+
+    def compact(self) -> int:
+        """Rewrite the archive with only live runs; returns the bytes reclaimed."""
+        with self._lock:
+            with open(self.path, "rb") as fh:
+                data = fh.read()
+            segments = scan_segments(data)
+            live = live_segments(segments)
+            last_id = max((s.run_id for s in segments), default=0)
+            fd, tmp = tempfile.mkstemp(dir=self.path.parent, prefix=f".{self.path.name}.", suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as out:
+                    out.write(MAGIC)
+                    for segment in sorted(live.values(), key=lambda s: s.run_id):
+                        body = bytearray(data[segment.offset : segment.offset + segment.size])
+                        # The run it replaced is gone, so the link is dropped.
+                        struct.pack_into("<q", body, 16, -1)
+                        out.write(body)
+                    if last_id > max(live, default=0):
+                        # Keep the highest id on file so withdrawn ids are never handed out again.
+                        out.write(_segment(last_id, TOMBSTONE, None, 0, 0, [], [0], {}))
+                    size = out.tell()
+                    out.flush()
+                    os.fsync(out.fileno())
+                os.replace(tmp, self.path)
+            except BaseException:
+                Path(tmp).unlink(missing_ok=True)
+                raise
+            self._end = size
+        return len(data) - size
@@ -0,0 +1,245 @@
+from __future__ import annotations
+
+import os
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import date
+from typing import TYPE_CHECKING, Iterable, Sequence
+
+from app.db.session import InMemorySession
+from app.models import CoverageRequirement, Provider, SiteHospital, SiteOffice
+from app.solver.matching import hopcroft_karp
+
+if TYPE_CHECKING:
+    from app.solver.engine import ScheduleSolver
+
+# Hospitals the solver staffs from a configured rotation rather than from every qualified provider.
+HOSPITAL_ROTATIONS = {"WTH": ("wt_hospital_md", "wt_hospital_apn"), "RMC": ("rmc_md", "rmc_apn")}
+OBL_ROTATION = "obl"
+BLOCKS = ("AM", "PM")
+
+Seat = tuple[int, str, int]  # (seat group index, "MD" | "APN", seat number)
+# (block, site code, site type, provider ids) in emission order.
+DayPlan = list[tuple[str, str, str, tuple[int, ...]]]
+
+
+@dataclass(frozen=True)
+class SeatGroup:
+    """One coverage requirement, with the providers the solver may draw each role from."""
+
+    site_code: str
+    apn_code: str
+    site_type: str
+    block: str
+    min_md: int
+    min_apn: int
+    md_pool: tuple[Provider, ...]
+    apn_pool: tuple[Provider, ...]
+    priority: float
+
+
+@dataclass(frozen=True)
+class SlotTemplate:
+    """A coverage requirement resolved to the codes it is emitted under and where its providers come from.
+
+    ``md_rotation``/``apn_rotation`` name the weekday rotation a role is drawn
+    from; without one the most senior qualified provider is taken. With
+    ``md_shift == "day"`` one MD holds every block of the site that day.
+    """
+
+    site_code: str
+    md_code: str
+    apn_code: str
+    site_type: str
+    block: str
+    min_md: int
+    min_apn: int
+    md_rotation: str | None
+    apn_rotation: str | None
+    md_shift: str = "block"
+
+
+def _site_codes(session: InMemorySession) -> dict[tuple[str, int], str]:
+    site_codes = {("office", o.id): o.code for o in session.all(SiteOffice)}
+    site_codes.update({("hospital", h.id): h.code for h in session.all(SiteHospital)})
+    return site_codes
+
+
+def slot_template(requirement: CoverageRequirement, site_codes: dict[tuple[str, int], str]) -> SlotTemplate | None:
+    code = site_codes.get((requirement.site_type, requirement.site_id))
+    if code is None:
+        return None
+    roles = requirement.roles_json
+    md_code, apn_code = code, f"{code}_APN" if roles.get("apn") else code
+    md_rotation = apn_rotation = None
+    if roles.get("obl"):
+        md_code = apn_code = f"{code}_OBL"
+        md_rotation = OBL_ROTATION
+    elif code in HOSPITAL_ROTATIONS:
+        md_rotation, apn_rotation = HOSPITAL_ROTATIONS[code]
+    return SlotTemplate(
+        code,
+        md_code,
+        apn_code,
+        requirement.site_type,
+        requirement.block,
+        requirement.min_md,
+        requirement.min_apn,
+        md_rotation,
+        apn_rotation,
+        roles.get("md_shift", "block"),
+    )
+
+
+def _fill_order(slot: SlotTemplate) -> tuple:
+    # Rotation-staffed hospitals first, so their day MDs are known before seniority
+    # picks; then every other site by code; OBL sessions last. AM before PM.
+    block = BLOCKS.index(slot.block) if slot.block in BLOCKS else len(BLOCKS)
+    if slot.md_rotation == OBL_ROTATION:
+        return (2, slot.site_code, block)
+    if slot.site_code in HOSPITAL_ROTATIONS:
+        return (0, list(HOSPITAL_ROTATIONS).index(slot.site_code), block)
+    return (1, slot.site_code, block)
+
+
+def compile_slot_templates(session: InMemorySession) -> dict[int, tuple[SlotTemplate, ...]]:
+    """Slot templates per weekday, in the order the greedy pass fills them."""
+    site_codes = _site_codes(session)
+    by_weekday: dict[int, list[SlotTemplate]] = defaultdict(list)
+    for requirement in session.all(CoverageRequirement):
+        slot = slot_template(requirement, site_codes)
+        if slot is not None:
+            by_weekday[requirement.day_of_week].append(slot)
+    return {weekday: tuple(sorted(slots, key=_fill_order)) for weekday, slots in by_weekday.items()}
+
+
+def compile_seat_groups(session: InMemorySession, solver: ScheduleSolver) -> dict[int, list[SeatGroup]]:
+    """Seat groups per weekday, highest priority first; pools keep the solver's preference order."""
+    site_codes = _site_codes(session)
+    bound = solver.bound_rules
+    weights = solver.rules.weights
+
+    def pool(members: Iterable[Provider], code: str, site_type: str) -> tuple[Provider, ...]:
+        return tuple(p for p in members if solver.qualified(p, code, site_type))
+
+    mds = [p for p in solver.providers if p.type == "MD"]
+    apns = [p for p in solver.providers if p.type == "APN"]
+    office_mds = sorted((p for p in mds if not p.is_invasive), key=lambda p: (p.seniority or 0, p.initials))
+    groups: dict[int, list[SeatGroup]] = defaultdict(list)
+    for requirement in session.all(CoverageRequirement):
+        slot = slot_template(requirement, site_codes)
+        if slot is None:
+            continue
+        code, site_type = slot.site_code, slot.site_type
+        if slot.md_rotation == OBL_ROTATION:
+            md_pool, apn_pool = pool(bound.obl_physicians, code, "hospital"), ()
+        elif slot.md_rotation is not None:
+            md_pool = pool(bound.rotation(slot.md_rotation), code, site_type)
+            apn_pool = pool(bound.rotation(slot.apn_rotation), code, site_type)
+        elif site_type == "office":
+            md_pool, apn_pool = pool(office_mds, code, site_type), pool(apns, code, site_type)
+        else:
+            md_pool, apn_pool = pool(mds, code, site_type), pool(apns, code, site_type)
+        priority = weights.get(f"{site_type}_priority", 0.0)
+        groups[requirement.day_of_week].append(
+            SeatGroup(slot.md_code, slot.apn_code, site_type, slot.block, slot.min_md, slot.min_apn, md_pool, apn_pool, priority)
+        )
+    for day_groups in groups.values():
+        day_groups.sort(key=lambda group: -group.priority)
+    return groups
+
+
+def _rotated(pool: Sequence[Provider], day: date) -> list[Provider]:
+    # The preferred start of each pool advances one place per day, independent of other days.
+    if not pool:
+        return []
+    offset = day.toordinal() % len(pool)
+    return list(pool[offset:]) + list(pool[:offset])
+
+
+def match_block(solver: ScheduleSolver, day: date, block: str, groups: Sequence[SeatGroup]) -> dict[Seat, Provider]:
+    """Maximum matching of seats to available providers, seeded with a greedy pass in priority order."""
+    graph: dict[Seat, list[Provider]] = {}
+    for index, group in enumerate(groups):
+        for role, count, members in (("MD", group.min_md, group.md_pool), ("APN", group.min_apn, group.apn_pool)):
+            if not count:
+                continue
+            candidates = [p for p in _rotated(members, day) if solver.available(p, block, day)]
+            for seat in range(count):
+                graph[(index, role, seat)] = candidates
+
+    # The greedy seed decides between equally large matchings; augmenting
+    # paths only ever re-seat providers, so seeded (higher priority) seats stay filled.
+    seed: dict[Seat, Provider] = {}
+    used: set[int] = set()
+    for seat, candidates in graph.items():
+        chosen = next((p for p in candidates if p.id not in used), None)
+        if chosen is not None:
+            seed[seat] = chosen
+            used.add(chosen.id)
+    if len(seed) == len(graph):
+        return seed
+    by_id = {p.id: p for candidates in graph.values() for p in candidates}
+    matching = hopcroft_karp(
+        {seat: [p.id for p in candidates] for seat, candidates in graph.items()},
+        {seat: p.id for seat, p in seed.items()},
+    )
+    return {seat: by_id[provider_id] for seat, provider_id in matching.items()}
+
+
+def plan_day(solver: ScheduleSolver, day: date, groups: Sequence[SeatGroup]) -> DayPlan:
+    by_block: dict[str, list[SeatGroup]] = defaultdict(list)
+    for group in groups:
+        by_block[group.block].append(group)
+    matchings = {block: match_block(solver, day, block, block_groups) for block, block_groups in by_block.items()}
+    positions = {
+        block: {(g.site_code, g.site_type): i for i, g in enumerate(block_groups)} for block, block_groups in by_block.items()
+    }
+
+    # Same emission order as the greedy pass: site by site, AM before PM.
+    plan: DayPlan = []
+    for site in dict.fromkeys((g.site_code, g.site_type) for g in groups):
+        for block in ("AM", "PM"):
+            index = positions.get(block, {}).get(site)
+            if index is None:
+                continue
+            group, matching = by_block[block][index], matchings[block]
+            mds = tuple(matching[(index, "MD", n)].id for n in range(group.min_md) if (index, "MD", n) in matching)
+            apns = tuple(matching[(index, "APN", n)].id for n in range(group.min_apn) if (index, "APN", n) in matching)
+            if group.apn_code == group.site_code:
+                plan.append((block, group.site_code, group.site_type, mds + apns))
+            else:
+                plan.append((block, group.site_code, group.site_type, mds))
+                plan.append((block, group.apn_code, group.site_type, apns))
+    return plan
+
+
+# Solver installed once per worker process, so only day lists cross the process boundary.
+_WORKER_SOLVER: ScheduleSolver | None = None
+
+
+def _init_worker(solver: ScheduleSolver) -> None:
+    global _WORKER_SOLVER
+    _WORKER_SOLVER = solver
+
+
+def _plan_chunk(days: list[date]) -> dict[date, DayPlan]:
+    solver = _WORKER_SOLVER
+    groups = solver.seat_groups
+    return {day: plan_day(solver, day, groups.get(day.weekday(), ())) for day in days}
+
+
+def plan_days(solver: ScheduleSolver, days: Sequence[date], workers: int) -> dict[date, DayPlan]:
+    """Plans for many days at once; days are independent, so chunks run in a process pool."""
+    workers = min(workers, os.cpu_count() or 1, max(len(days) // 20, 1))
+    if workers <= 1:
+        groups = solver.seat_groups
+        return {day: plan_day(solver, day, groups.get(day.weekday(), ())) for day in days}
+    size = -(-len(days) // workers)
+    chunks = [list(days[i : i + size]) for i in range(0, len(days), size)]
+    plans: dict[date, DayPlan] = {}
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(solver,)) as pool:
+        for chunk in pool.map(_plan_chunk, chunks):
+            plans.update(chunk)
+    return plans
@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import hashlib
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from typing import Iterable
+from weakref import WeakKeyDictionary
+
+from app.solver.engine import ScheduleOutput
+
+SlotKey = tuple[date, str, str | None]
+
+
+@dataclass(frozen=True)
+class SlotChange:
+    date: date
+    slot: str
+    block: str | None
+    before: tuple[str, ...]
+    after: tuple[str, ...]
+
+
+@dataclass
+class WeekDigest:
+    rollup: int = 0
+    slots: dict[SlotKey, tuple[str, ...]] = field(default_factory=dict)
+
+
+@dataclass
+class ScheduleDigest:
+    revision: int
+    weeks: dict[date, WeekDigest]
+
+
+@dataclass
+class ScheduleDiff:
+    weeks_compared: int
+    changed_weeks: list[date]
+    changes: list[SlotChange]
+
+
+_DIGESTS: WeakKeyDictionary[ScheduleOutput, ScheduleDigest] = WeakKeyDictionary()
+
+
+def week_of(day: date) -> date:
+    return day - timedelta(days=day.weekday())
+
+
+def _slot_hash(key: SlotKey, providers: tuple[str, ...]) -> int:
+    day, slot, block = key
+    payload = f"{day.toordinal()}|{slot}|{block or ''}|{','.join(providers)}".encode("utf-8")
+    return int.from_bytes(hashlib.blake2b(payload, digest_size=8).digest(), "big")
+
+
+def schedule_digest(schedule: ScheduleOutput) -> ScheduleDigest:
+    cached = _DIGESTS.get(schedule)
+    if cached is not None and cached.revision == schedule.revision:
+        return cached
+
+    weeks: dict[date, WeekDigest] = {}
+
+    def record(key: SlotKey, providers: tuple[str, ...]) -> None:
+        week = weeks.get(week_of(key[0]))
+        if week is None:
+            week = weeks[week_of(key[0])] = WeekDigest()
+        previous = week.slots.get(key)
+        if previous is not None:
+            week.rollup ^= _slot_hash(key, previous)
+            providers = previous + providers
+        week.slots[key] = providers
+        # XOR keeps the rollup independent of assignment order.
+        week.rollup ^= _slot_hash(key, providers)
+
+    for assignment in schedule.assignments:
+        record((assignment.date, assignment.site_code, assignment.block), tuple(p.initials for p in assignment.providers))
+    for call in schedule.call_assignments:
+        record((call.date, call.call_type, None), tuple(p.initials for p in call.providers))
+
+    digest = ScheduleDigest(revision=schedule.revision, weeks=weeks)
+    _DIGESTS[schedule] = digest
+    return digest
+
+
+def diff_schedules(base: ScheduleOutput, other: ScheduleOutput) -> ScheduleDiff:
+    before = schedule_digest(base).weeks
+    after = schedule_digest(other).weeks
+    empty = WeekDigest()
+
+    changed_weeks: list[date] = []
+    changes: list[SlotChange] = []
+    for week in sorted(before.keys() | after.keys()):
+        old = before.get(week, empty)
+        new = after.get(week, empty)
+        if old.rollup == new.rollup and len(old.slots) == len(new.slots):
+            continue
+        week_changes = [
+            SlotChange(key[0], key[1], key[2], old.slots.get(key, ()), new.slots.get(key, ()))
+            for key in old.slots.keys() | new.slots.keys()
+            if old.slots.get(key, ()) != new.slots.get(key, ())
+        ]
+        if week_changes:
+            changed_weeks.append(week)
+            week_changes.sort(key=lambda change: (change.date, change.slot, change.block or ""))
+            changes.extend(week_changes)
+    return ScheduleDiff(
+        weeks_compared=len(before.keys() | after.keys()),
+        changed_weeks=changed_weeks,
+        changes=changes,
+    )
+
+
+def changes_in_week(changes: Iterable[SlotChange], week_start: date) -> list[SlotChange]:
+    week_end = week_start + timedelta(days=6)
+    return [change for change in changes if week_start <= change.date <= week_end]
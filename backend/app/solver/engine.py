@@ -1,14 +1,54 @@
 from __future__ import annotations
 
-from collections import defaultdict, deque
+from collections import defaultdict
 from dataclasses import dataclass
 from datetime import date, timedelta
+from functools import cached_property
 from typing import Iterable
 
-from app.config import load as load_rules
+from app.config.registry import CompiledRules, get_rules_registry
+from app.core.calendar import calendar_for
 from app.core.config import settings
 from app.db.session import InMemorySession
 from app.models import Holiday, Provider, SiteHospital, SiteOffice, VacationRequest
+from app.solver.daily import (
+    HOSPITAL_ROTATIONS,
+    OBL_ROTATION,
+    DayPlan,
+    SeatGroup,
+    SlotTemplate,
+    compile_seat_groups,
+    compile_slot_templates,
+    plan_day,
+    plan_days,
+)
+from app.solver.rotation import LoadLedger, Rotation
+from app.solver.trace import TRACED_METHODS, DecisionTrace, SolverTracer
+from app.solver.weekend_flow import allocate_weekends
+
+
+RotationState = tuple[tuple, ...]
+
+# Call type -> the call pool (``call_pools``) it is staffed from; the weekend interventional
+# call goes to whoever has Sunday's non-invasive call.
+CALL_POOLS = {
+    "noninvasive_weekday": "noninv_md",
+    "interventional_weekday": "inv_md",
+    "weekend_noninv": "noninv_md",
+    "interventional_weekend": "noninv_md",
+}
+
+
+@dataclass(frozen=True)
+class Pin:
+    date: date
+    slot: str
+    block: str | None
+    provider_ids: tuple[int, ...]
+
+
+class ExtendError(ValueError):
+    """The stored run cannot be extended in place."""
 
 
 @dataclass
@@ -34,25 +74,47 @@ class ScheduleOutput:
         self.call_assignments: list[CallAssignment] = []
         self.vacations: dict[str, list[tuple[date, date, str]]] = defaultdict(list)
         self.icd_sites: dict[date, str] = {}
+        self.rules_version: str | None = None
+        # Rotation positions at the start of each workday / call week, used to resume solving.
+        self.weekday_states: dict[date, RotationState] = {}
+        self.call_states: dict[date, RotationState] = {}
+        # Bumped on every change so derived caches (digests, indexes) can tell they are stale.
+        self.revision = 0
 
     def add_assignment(self, assignment: DayAssignment) -> None:
         self.assignments.append(assignment)
+        self.revision += 1
 
     def add_call(self, call: CallAssignment) -> None:
         self.call_assignments.append(call)
+        self.revision += 1
 
 
 class ScheduleSolver:
-    def __init__(self, session: InMemorySession) -> None:
+    def __init__(self, session: InMemorySession, rules: CompiledRules | None = None, trace: DecisionTrace | None = None) -> None:
         self.session = session
         self.providers: list[Provider] = session.all(Provider)
         self.providers_by_initials = {p.initials: p for p in self.providers}
+        self.providers_by_id = {p.id: p for p in self.providers}
         self.holidays = {h.date: h for h in session.all(Holiday)}
         self.offices = {o.code: o for o in session.all(SiteOffice)}
         self.hospitals = {h.code: h for h in session.all(SiteHospital)}
-        self.rules = load_rules()
+        self.rules = rules or get_rules_registry().active
+        self.bound_rules = self.rules.bind(self.providers_by_initials)
         self.vacations = self._build_vacation_lookup()
         self.output = ScheduleOutput()
+        self._set_pins(())
+        self._weekend_plan: dict[date, Provider] | None = None
+        self._day_plans: dict[date, DayPlan] = {}
+        if trace is not None:
+            SolverTracer(self, trace)
+
+    def __getstate__(self) -> dict:
+        # Pool workers get the solver without its tracer (it holds a lock and an open file); they plan untraced.
+        state = dict(self.__dict__)
+        for name in TRACED_METHODS:
+            state.pop(name, None)
+        return state
 
     def _build_vacation_lookup(self) -> dict[int, set[date]]:
         lookup: dict[int, set[date]] = defaultdict(set)
@@ -66,9 +128,17 @@ class ScheduleSolver:
 
     # provider filters -------------------------------------------------
     def _eligible(self, provider: Provider, site_code: str, site_type: str, block: str, day: date) -> bool:
-        if provider.initials == "MJK":
+        return self.available(provider, block, day) and self.qualified(provider, site_code, site_type)
+
+    def available(self, provider: Provider, block: str, day: date) -> bool:
+        if self._pinned_busy and provider.id in self._pinned_busy.get((day, block), ()):
             return False
-        if day in self.vacations.get(provider.id, set()):
+        return day not in self.vacations.get(provider.id, set())
+
+    @staticmethod
+    def qualified(provider: Provider, site_code: str, site_type: str) -> bool:
+        """Date-independent part of eligibility: site restrictions and privileges."""
+        if provider.initials == "MJK":
             return False
         if site_type == "hospital":
             # weekend restrictions
@@ -96,7 +166,6 @@ class ScheduleSolver:
                     return False
                 if provider.initials == "AG" and site_code not in {"COO", "WTH"}:
                     return False
-            privileges = provider.privileges_json.get("hospital", {})
         else:
             if provider.initials == "SMC" and site_code != "SVI":
                 return False
@@ -125,8 +194,11 @@ class ScheduleSolver:
                     return False
                 if provider.initials == "AG" and site_code not in {"VEIN"}:
                     return False
-            privileges = provider.privileges_json.get("office", {})
+        return ScheduleSolver.has_privileges(provider, site_code, site_type)
 
+    @staticmethod
+    def has_privileges(provider: Provider, site_code: str, site_type: str) -> bool:
+        privileges = provider.privileges_json.get("hospital" if site_type == "hospital" else "office", {})
         allowed_roles = privileges.get(site_code)
         if allowed_roles is None:
             # allow derived special codes
@@ -136,6 +208,14 @@ class ScheduleSolver:
                 allowed_roles = privileges.get("WT")
         return allowed_roles is not None
 
+    @cached_property
+    def slot_templates(self) -> dict[int, tuple[SlotTemplate, ...]]:
+        return compile_slot_templates(self.session)
+
+    @cached_property
+    def seat_groups(self) -> dict[int, list[SeatGroup]]:
+        return compile_seat_groups(self.session, self)
+
     def _md_candidates(self, site_code: str, block: str, day: date) -> list[Provider]:
         return [
             p
@@ -151,13 +231,169 @@ class ScheduleSolver:
         ]
 
     # solving ----------------------------------------------------------
-    def solve(self, start_date: date, end_date: date) -> ScheduleOutput:
+    def solve(self, start_date: date, end_date: date, pins: Iterable[Pin] = ()) -> ScheduleOutput:
         self.output = ScheduleOutput()
+        self.output.rules_version = self.rules.version
+        self.calendar = calendar_for(start_date, end_date, self.holidays.values())
+        self._set_pins(pins)
         self._record_vacations()
         self._build_weekday_schedule(start_date, end_date)
         self._build_call_schedule(start_date, end_date)
         return self.output
 
+    def repair(
+        self,
+        schedule: ScheduleOutput,
+        start_date: date,
+        end_date: date,
+        pins: Iterable[Pin],
+        since: date,
+        until: date,
+    ) -> tuple[ScheduleOutput, ScheduleOutput]:
+        """Re-solve from ``since`` until rotations re-join the stored run; returns (replaced, patch)."""
+        self.calendar = calendar_for(start_date, end_date, self.holidays.values())
+        self._set_pins(pins)
+        first_day = next(iter(self._iter_workdays(max(since, start_date), end_date)), None)
+        call_week = self._first_monday(max(self.calendar.week_start(since), start_date))
+        call_converge: dict[date, RotationState] | None = schedule.call_states
+        if self.rules.allocation.weekend_call == "flow":
+            # Weekend owners come from one allocation over the whole window, so calls are re-run in full.
+            call_week, call_converge = self._first_monday(start_date), None
+        weekday_state = schedule.weekday_states.get(first_day) if first_day else None
+        call_state = schedule.call_states.get(call_week) if call_week <= end_date else None
+        if (first_day and weekday_state is None) or (call_week <= end_date and call_state is None):
+            # No checkpoints to resume from: fall back to a full re-solve of the window.
+            replaced = ScheduleOutput()
+            replaced.assignments, replaced.call_assignments = schedule.assignments, schedule.call_assignments
+            patch = self.solve(start_date, end_date, pins)
+            self._splice(schedule, patch, start_date, None, start_date, None)
+            return replaced, patch
+
+        self.output = patch = ScheduleOutput()
+        weekday_stop = call_stop = None
+        if first_day:
+            cycles = self._restore(self._weekday_cycles(), weekday_state)
+            weekday_stop = self._run_weekdays(first_day, end_date, cycles, schedule.weekday_states, until)
+        if call_week <= end_date:
+            cycles = self._restore(self._call_cycles(), call_state)
+            call_stop = self._run_call_weeks(call_week, end_date, cycles, call_converge, until)
+        self._record_vacations()
+
+        weekday_from = first_day or end_date + timedelta(days=1)
+        replaced = self._splice(schedule, patch, weekday_from, weekday_stop, call_week, call_stop)
+        return replaced, patch
+
+    def extend(
+        self,
+        schedule: ScheduleOutput,
+        start_date: date,
+        end_date: date,
+        new_end: date,
+        pins: Iterable[Pin] = (),
+    ) -> ScheduleOutput:
+        """Append ``end_date``..``new_end`` to ``schedule``; returns the appended part.
+
+        Rotations resume from the stored state of the run's last workday and
+        last call week. Those two are replayed and only what falls after
+        ``end_date`` is kept, so the work does not grow with the run's history.
+        With ``weekend_call: flow`` the weekends are planned over the new weeks
+        only, counting the weekend calls the run already holds that year.
+        Raises ``ExtendError`` when the run has no stored state to resume from.
+        """
+        self.calendar = calendar_for(start_date, new_end, self.holidays.values())
+        self._set_pins(pins)
+        weekdays = self.calendar.weekdays_between(max(end_date - timedelta(days=6), start_date), end_date)
+        replay_day = weekdays[-1] if weekdays else None
+        call_week = max(self.calendar.week_start(end_date), self._first_monday(start_date))
+        weekday_state = schedule.weekday_states.get(replay_day) if replay_day else None
+        call_state = schedule.call_states.get(call_week) if call_week <= end_date else None
+        if (replay_day and weekday_state is None) or (call_week <= end_date and call_state is None):
+            raise ExtendError(f"Run {start_date}..{end_date} has no rotation state to extend from")
+
+        self.output = patch = ScheduleOutput()
+        patch.rules_version = schedule.rules_version
+        # A run without a workday or call week left its rotations untouched: start them fresh.
+        weekday_cycles = self._weekday_cycles()
+        if weekday_state is not None:
+            self._restore(weekday_cycles, weekday_state)
+        call_cycles = self._call_cycles()
+        if call_state is not None:
+            self._restore(call_cycles, call_state)
+        self._run_weekdays(replay_day or end_date + timedelta(days=1), new_end, weekday_cycles)
+        stored_weekends = {
+            c.date: c.providers[0]
+            for c in schedule.call_assignments
+            if c.call_type == "weekend_noninv" and c.providers and c.date <= end_date
+        }
+        self._run_call_weeks(call_week, new_end, call_cycles, stored_weekends=stored_weekends)
+        self._record_vacations()
+
+        patch.assignments = [a for a in patch.assignments if a.date > end_date]
+        patch.call_assignments = [c for c in patch.call_assignments if c.date > end_date]
+        patch.icd_sites = {day: site for day, site in patch.icd_sites.items() if day > end_date}
+        # Only the replayed call week can hold calls past the old end (its weekend); drop those.
+        calls = schedule.call_assignments
+        tail = len(calls)
+        while tail and calls[tail - 1].date >= call_week:
+            tail -= 1
+        calls[tail:] = [c for c in calls[tail:] if c.date <= end_date]
+        schedule.assignments.extend(patch.assignments)
+        calls.extend(patch.call_assignments)
+        schedule.icd_sites.update(patch.icd_sites)
+        schedule.vacations = patch.vacations
+        schedule.weekday_states.update(patch.weekday_states)
+        schedule.call_states.update(patch.call_states)
+        schedule.revision += 1
+        return patch
+
+    def _splice(
+        self,
+        schedule: ScheduleOutput,
+        patch: ScheduleOutput,
+        weekday_from: date,
+        weekday_stop: date | None,
+        call_from: date,
+        call_stop: date | None,
+    ) -> ScheduleOutput:
+        def replaced_range(day: date, low: date, stop: date | None) -> bool:
+            return day >= low and (stop is None or day < stop)
+
+        replaced = ScheduleOutput()
+        replaced.assignments = [a for a in schedule.assignments if replaced_range(a.date, weekday_from, weekday_stop)]
+        replaced.call_assignments = [c for c in schedule.call_assignments if replaced_range(c.date, call_from, call_stop)]
+
+        schedule.assignments = (
+            [a for a in schedule.assignments if a.date < weekday_from]
+            + patch.assignments
+            + [a for a in schedule.assignments if weekday_stop is not None and a.date >= weekday_stop]
+        )
+        schedule.call_assignments = (
+            [c for c in schedule.call_assignments if c.date < call_from]
+            + patch.call_assignments
+            + [c for c in schedule.call_assignments if call_stop is not None and c.date >= call_stop]
+        )
+        for day in [d for d in schedule.icd_sites if replaced_range(d, weekday_from, weekday_stop)]:
+            del schedule.icd_sites[day]
+        schedule.icd_sites.update(patch.icd_sites)
+        schedule.vacations = patch.vacations
+        schedule.weekday_states.update(patch.weekday_states)
+        schedule.call_states.update(patch.call_states)
+        schedule.revision += 1
+        return replaced
+
+    def _set_pins(self, pins: Iterable[Pin]) -> None:
+        self.pins = {}
+        self._pinned_busy = defaultdict(set)
+        self._pins_by_day = defaultdict(list)
+        self._emitted_pins = set()
+        for pin in pins:
+            providers = tuple(self.providers_by_id[i] for i in pin.provider_ids if i in self.providers_by_id)
+            key = (pin.date, pin.slot, pin.block)
+            self.pins[key] = providers
+            self._pins_by_day[pin.date].append(key)
+            if pin.block is not None:
+                self._pinned_busy[(pin.date, pin.block)].update(p.id for p in providers)
+
     def _record_vacations(self) -> None:
         for provider in self.providers:
             days = sorted(self.vacations.get(provider.id, set()))
@@ -173,161 +409,310 @@ class ScheduleSolver:
             self.output.vacations[provider.initials].append((start, end, "FULL"))
 
     def _iter_workdays(self, start: date, end: date) -> Iterable[date]:
-        current = start
-        while current <= end:
-            if current.weekday() < 5:
-                yield current
-            current += timedelta(days=1)
-
+        return self.calendar.weekdays_between(start, end)
+
+    def _first_monday(self, start: date) -> date:
+        return self.calendar.first_monday(start)
+
+    # rotation state ---------------------------------------------------
+    def _weekday_cycles(self) -> dict[str, Rotation]:
+        rules = self.bound_rules
+        ledger = LoadLedger()
+        mode = self.rules.allocation.rotation
+        # Keyed by rotation name; the order fixes the layout of stored rotation states.
+        cycles = {name: Rotation(rules.rotation(name), ledger, mode) for names in HOSPITAL_ROTATIONS.values() for name in names}
+        cycles[OBL_ROTATION] = Rotation(rules.obl_physicians, ledger, mode)
+        return cycles
+
+    def _call_cycles(self) -> dict[str, Rotation]:
+        ledger = LoadLedger()
+        mode = self.rules.allocation.rotation
+        return {name: Rotation(pool, ledger, mode) for name, pool in call_pools(self.providers).items()}
+
+    @staticmethod
+    def _snapshot(cycles: dict[str, Rotation]) -> RotationState:
+        return tuple(cycle.state() for cycle in cycles.values())
+
+    def _restore(self, cycles: dict[str, Rotation], state: RotationState) -> dict[str, Rotation]:
+        for cycle, cycle_state in zip(cycles.values(), state):
+            cycle.restore(cycle_state, self.providers_by_id)
+        return cycles
+
+    # weekday sessions -------------------------------------------------
     def _build_weekday_schedule(self, start: date, end: date) -> None:
-        rotations = self.rules.get("rotations", {})
-        wt_md_cycle = deque(self._providers_from_initials(rotations.get("wt_hospital_md", [])))
-        wt_apn_cycle = deque(self._providers_from_initials(rotations.get("wt_hospital_apn", [])))
-        rmc_md_cycle = deque(self._providers_from_initials(rotations.get("rmc_md", [])))
-        rmc_apn_cycle = deque(self._providers_from_initials(rotations.get("rmc_apn", [])))
-        obl_cycle = deque(self._providers_from_initials(self.rules.get("obl", {}).get("physicians", [])))
-
+        self._run_weekdays(start, end, self._weekday_cycles())
+
+    def _run_weekdays(
+        self,
+        start: date,
+        end: date,
+        cycles: dict[str, Rotation],
+        converge: dict[date, RotationState] | None = None,
+        until: date | None = None,
+    ) -> date | None:
+        allocation = self.rules.allocation
+        if allocation.daily == "matching" and allocation.daily_workers > 1:
+            days = [d for d in self._iter_workdays(start, end) if not self.calendar.extend_weekend[self.calendar.index(d)]]
+            self._day_plans = plan_days(self, days, allocation.daily_workers)
         for day in self._iter_workdays(start, end):
-            holiday = self.holidays.get(day)
-            is_holiday = bool(holiday and holiday.is_office_closed)
-            md_assignments: dict[str, Provider] = {}
-            apn_assignments: dict[str, list[Provider]] = defaultdict(list)
+            state = self._snapshot(cycles)
+            if converge is not None and day > until and converge.get(day) == state:
+                # Same rotation state as the stored run from here on: the rest is unchanged.
+                return day
+            self.output.weekday_states[day] = state
+            self._solve_workday(day, cycles)
+        return None
 
-            if is_holiday and holiday and holiday.extend_weekend:
-                # Skip weekday assignments; weekend handling later
-                continue
+    def _solve_workday(self, day: date, cycles: dict[str, Rotation]) -> None:
+        if self.calendar.extend_weekend[self.calendar.index(day)]:
+            # Skip weekday assignments; weekend handling later
+            self._flush_pins(day)
+            return
 
-            # WTH hospital
-            if wt_md_cycle:
-                md = self._advance_until(wt_md_cycle, lambda p: self._eligible(p, "WTH", "hospital", "AM", day))
-                if md:
-                    md_assignments["WTH"] = md
-            for block in ("AM", "PM"):
-                if "WTH" in md_assignments:
-                    self.output.add_assignment(DayAssignment(day, block, "WTH", "hospital", [md_assignments["WTH"]]))
-                apns: list[Provider] = []
-                for _ in range(2):
-                    apn = self._advance_until(
-                        wt_apn_cycle,
-                        lambda p: self._eligible(p, "WTH", "hospital", block, day)
-                        and p not in apns,
-                    )
-                    if apn:
-                        apns.append(apn)
-                if apns:
-                    apn_assignments[f"WTH_{block}"].extend(apns)
-                    self.output.add_assignment(DayAssignment(day, block, "WTH_APN", "hospital", apns))
-
-            # RMC hospital MD/APN pair
-            for block in ("AM", "PM"):
-                md = self._advance_until(rmc_md_cycle, lambda p: self._eligible(p, "RMC", "hospital", block, day))
-                apn = self._advance_until(rmc_apn_cycle, lambda p: self._eligible(p, "RMC", "hospital", block, day))
-                providers = [p for p in [md, apn] if p]
-                if providers:
-                    self.output.add_assignment(DayAssignment(day, block, "RMC", "hospital", providers))
-
-            # Offices HH, HH3, SVI, WT
-            office_codes = ["HH", "HH3", "SVI", "WT"]
-            for office_code in office_codes:
-                for block in ("AM", "PM"):
-                    md = self._find_office_md(day, office_code, block, skip=list(md_assignments.values()))
+        if self.rules.allocation.daily == "matching":
+            self._emit_day_plan(day)
+        else:
+            self._solve_workday_greedy(day, cycles)
+        self._solve_icd_clinic(day)
+        self._flush_pins(day)
+
+    def _emit_day_plan(self, day: date) -> None:
+        plan = self._day_plans.pop(day, None)
+        if plan is None:
+            plan = plan_day(self, day, self.seat_groups.get(day.weekday(), ()))
+        for block, site_code, site_type, provider_ids in plan:
+            self._emit(day, block, site_code, site_type, [self.providers_by_id[i] for i in provider_ids])
+
+    def _solve_workday_greedy(self, day: date, cycles: dict[str, Rotation]) -> None:
+        # MDs holding a whole-day hospital shift are not offered to any other site.
+        day_mds: dict[str, Provider] = {}
+        slots = self.slot_templates.get(day.weekday(), ())
+        shift_blocks: dict[str, list[str]] = defaultdict(list)
+        for slot in slots:
+            if slot.md_shift == "day":
+                shift_blocks[slot.site_code].append(slot.block)
+        for slot in slots:
+            md_cycle = cycles.get(slot.md_rotation) if slot.md_rotation else None
+            if md_cycle is not None and not md_cycle and not slot.min_apn:
+                continue
+            if slot.md_shift == "day":
+                if slot.site_code not in day_mds:
+                    # Picked at the first block but held for all of them, so it must be free in each.
+                    blocks = tuple(b for b in shift_blocks[slot.site_code] if b != slot.block)
+                    md = self._pick_mds(slot, day, md_cycle, list(day_mds.values()), blocks)
                     if md:
-                        self.output.add_assignment(DayAssignment(day, block, office_code, "office", [md]))
-
-            # OBL on Wednesdays
-            if day.weekday() == 2 and obl_cycle:
-                for block in ("AM", "PM"):
-                    physician = self._advance_until(obl_cycle, lambda p: self._eligible(p, "COO", "hospital", block, day))
-                    if physician:
-                        self.output.add_assignment(DayAssignment(day, block, "COO_OBL", "hospital", [physician]))
-
-            # ICD clinic rotation (EP MD + two APNs)
-            if self.rules.get("icd_clinic", {}).get("enabled"):
-                site = "WT" if day.weekday() % 2 == 0 else "SVI"
-                ep_md = self._pick_ep_md(day)
-                ep_apns = self._pick_ep_apns(day)
-                if ep_md and len(ep_apns) == 2:
-                    self.output.icd_sites[day] = site
-                    self.output.add_assignment(DayAssignment(day, "AM", f"ICD_{site}", "office", [ep_md] + ep_apns))
-                    self.output.add_assignment(DayAssignment(day, "PM", f"ICD_{site}", "office", [ep_md] + ep_apns))
-
+                        day_mds[slot.site_code] = md[0]
+                mds = [day_mds[slot.site_code]] if slot.site_code in day_mds else []
+            else:
+                mds = self._pick_mds(slot, day, md_cycle, list(day_mds.values()))
+            apns = self._pick_apns(slot, day, cycles.get(slot.apn_rotation) if slot.apn_rotation else None)
+            if slot.apn_code == slot.md_code:
+                self._emit(day, slot.block, slot.md_code, slot.site_type, mds + apns)
+                continue
+            if mds:
+                self._emit(day, slot.block, slot.md_code, slot.site_type, mds)
+            self._emit(day, slot.block, slot.apn_code, slot.site_type, apns)
+
+    def _pick_mds(
+        self, slot: SlotTemplate, day: date, cycle: Rotation | None, skip: list[Provider], blocks: tuple[str, ...] = ()
+    ) -> list[Provider]:
+        """``blocks`` are further blocks the MD will hold that day; they must be free in those too."""
+        picked: list[Provider] = []
+        for _ in range(slot.min_md):
+            if cycle is not None:
+                taken = {p.id for p in picked}
+                md = self._advance_until(
+                    cycle,
+                    day,
+                    lambda p: p.id not in taken
+                    and all(self.available(p, block, day) for block in blocks)
+                    and self._eligible(p, slot.site_code, slot.site_type, slot.block, day),
+                )
+            else:
+                md = self._senior_md(day, slot.site_code, slot.site_type, slot.block, skip + picked, blocks)
+            if md is None:
+                break
+            picked.append(md)
+        return picked
+
+    def _pick_apns(self, slot: SlotTemplate, day: date, cycle: Rotation | None) -> list[Provider]:
+        if not slot.min_apn:
+            return []
+        if cycle is None:
+            return self._apn_candidates(slot.site_code, slot.block, day)[: slot.min_apn]
+        picked: list[Provider] = []
+        taken: set[int] = set()
+        for _ in range(slot.min_apn):
+            apn = self._advance_until(
+                cycle, day, lambda p: p.id not in taken and self._eligible(p, slot.site_code, slot.site_type, slot.block, day)
+            )
+            if apn:
+                picked.append(apn)
+                taken.add(apn.id)
+        return picked
+
+    def _solve_icd_clinic(self, day: date) -> None:
+        # ICD clinic rotation (EP MD + two APNs)
+        if self.rules.icd_clinic.enabled:
+            site = "WT" if day.weekday() % 2 == 0 else "SVI"
+            ep_md = self._pick_ep_md(day)
+            ep_apns = self._pick_ep_apns(day)
+            if ep_md and len(ep_apns) == 2:
+                self.output.icd_sites[day] = site
+                self._emit(day, "AM", f"ICD_{site}", "office", [ep_md] + ep_apns)
+                self._emit(day, "PM", f"ICD_{site}", "office", [ep_md] + ep_apns)
+
+    # call schedule ----------------------------------------------------
     def _build_call_schedule(self, start: date, end: date) -> None:
-        # Weekend call rotation
-        noninv_md_cycle = deque(
-            [p for p in self.providers if p.type == "MD" and not p.is_invasive and not p.is_ep and p.initials not in {"HAS", "DAS"}]
+        self._run_call_weeks(self._first_monday(start), end, self._call_cycles())
+
+    def _run_call_weeks(
+        self,
+        first_monday: date,
+        end: date,
+        cycles: dict[str, Rotation],
+        converge: dict[date, RotationState] | None = None,
+        until: date | None = None,
+        stored_weekends: dict[date, Provider] | None = None,
+    ) -> date | None:
+        self._weekend_plan = self._plan_weekends(first_monday, end, cycles["noninv_md"], stored_weekends or {})
+        for current in self.calendar.mondays_between(first_monday, end):
+            state = self._snapshot(cycles)
+            if converge is not None and current > until and converge.get(current) == state:
+                return current
+            self.output.call_states[current] = state
+            self._solve_call_week(current, end, cycles)
+        return None
+
+    def _solve_call_week(self, current: date, end: date, cycles: dict[str, Rotation]) -> None:
+        noninv_md_cycle = cycles["noninv_md"]
+        inv_md_cycle = cycles["inv_md"]
+
+        # Build weekday call for this week (Mon-Fri)
+        week = self.calendar.week(current)
+        friday_label: str | None = None
+        for day in week[:5]:
+            if day > end:
+                break
+            noninv_hh = self._advance_until(noninv_md_cycle, day, lambda p: day not in self.vacations.get(p.id, set()))
+            noninv_ch = self._advance_until(
+                noninv_md_cycle,
+                day,
+                lambda p: day not in self.vacations.get(p.id, set()) and p != noninv_hh,
+            )
+            pair = [noninv_hh, noninv_ch] if noninv_hh and noninv_ch else []
+            label = self._emit_call(day, "noninvasive_weekday", pair)
+            if label and day.weekday() == 4:
+                friday_label = label
+            primary = self._advance_until(inv_md_cycle, day, lambda p: day not in self.vacations.get(p.id, set()))
+            backup = self._advance_until(inv_md_cycle, day, lambda p: day not in self.vacations.get(p.id, set()) and p != primary)
+            self._emit_call(day, "interventional_weekday", [primary, backup] if primary and backup else [])
+
+        # Weekend assignments (Fri-Sun)
+        fri, sat, sun = week[4:]
+        weekend_names: list[Provider] = []
+        if self._weekend_plan is not None:
+            weekend_names = [self._weekend_plan[d] for d in (fri, sat, sun) if d in self._weekend_plan]
+        else:
+            for wk_day in (fri, sat, sun):
+                provider = self._advance_until(noninv_md_cycle, wk_day, lambda p: wk_day not in self.vacations.get(p.id, set()))
+                if provider:
+                    weekend_names.append(provider)
+        labels = [p.initials for p in weekend_names]
+        if len(labels) == 3:
+            self._emit_call(fri, "weekend_noninv", [weekend_names[0]], friday_label or labels[0])
+            self._emit_call(sat, "weekend_noninv", [weekend_names[1]])
+            self._emit_call(sun, "weekend_noninv", [weekend_names[2]])
+            if weekend_names:
+                self._emit_call(fri, "interventional_weekend", [weekend_names[-1]])
+
+        for day in week:
+            self._flush_pins(day, calls=True)
+
+    def _plan_weekends(
+        self, first_monday: date, end: date, pool: Iterable[Provider], stored: dict[date, Provider]
+    ) -> dict[date, Provider] | None:
+        """Weekend owners from one flow allocation; ``stored`` holds weekends an extended run already published."""
+        if self.rules.allocation.weekend_call != "flow":
+            return None
+        days = [day for monday in self.calendar.mondays_between(first_monday, end) for day in self.calendar.week(monday)[4:]]
+        fixed = {}
+        for day in days:
+            pinned = self.pins.get((day, "weekend_noninv", None))
+            if pinned:
+                fixed[day] = pinned[0]
+            elif day in stored:
+                fixed[day] = stored[day]
+        # Targets are yearly, so calls published earlier in the same year count towards them.
+        prior: dict[int, int] = defaultdict(int)
+        if days:
+            for day, provider in stored.items():
+                if day < days[0] and day.year == days[0].year:
+                    prior[provider.id] += 1
+        providers = [p for p in pool if p.weekend_team_eligible]
+        allocation = allocate_weekends(
+            days,
+            providers,
+            {p.id: self.rules.weekend_targets.target_for(p) for p in providers},
+            lambda p, day: day not in self.vacations.get(p.id, set()),
+            fixed,
+            prior,
         )
-        inv_md_cycle = deque([p for p in self.providers if p.type == "MD" and p.is_invasive])
-
-        current = start
-        while current <= end:
-            if current.weekday() == 0:
-                # Build weekday call for this week (Mon-Fri)
-                friday_label: str | None = None
-                for offset in range(5):
-                    day = current + timedelta(days=offset)
-                    if day > end:
-                        break
-                    noninv_hh = self._advance_until(noninv_md_cycle, lambda p: day not in self.vacations.get(p.id, set()))
-                    noninv_ch = self._advance_until(
-                        noninv_md_cycle,
-                        lambda p: day not in self.vacations.get(p.id, set()) and p != noninv_hh,
-                    )
-                    if noninv_hh and noninv_ch:
-                        label = f"HH: {noninv_hh.initials} CH: {noninv_ch.initials}"
-                        self.output.add_call(CallAssignment(day, "noninvasive_weekday", label, [noninv_hh, noninv_ch]))
-                        if day.weekday() == 4:
-                            friday_label = label
-                    primary = self._advance_until(inv_md_cycle, lambda p: day not in self.vacations.get(p.id, set()))
-                    backup = self._advance_until(inv_md_cycle, lambda p: day not in self.vacations.get(p.id, set()) and p != primary)
-                    if primary and backup:
-                        label = f"{primary.initials}. {backup.initials}."
-                        self.output.add_call(CallAssignment(day, "interventional_weekday", label, [primary, backup]))
-
-                # Weekend assignments (Fri-Sun)
-                fri = current + timedelta(days=4)
-                sat = fri + timedelta(days=1)
-                sun = fri + timedelta(days=2)
-                weekend_names: list[Provider] = []
-                for wk_day in (fri, sat, sun):
-                    provider = self._advance_until(noninv_md_cycle, lambda p: wk_day not in self.vacations.get(p.id, set()))
-                    if provider:
-                        weekend_names.append(provider)
-                labels = [p.initials for p in weekend_names]
-                if len(labels) == 3:
-                    friday_text = friday_label or labels[0]
-                    self.output.add_call(CallAssignment(fri, "weekend_noninv", friday_text, [weekend_names[0]]))
-                    self.output.add_call(CallAssignment(sat, "weekend_noninv", labels[1], [weekend_names[1]]))
-                    self.output.add_call(CallAssignment(sun, "weekend_noninv", labels[2], [weekend_names[2]]))
-                    if weekend_names:
-                        last_weekday = current + timedelta(days=4)
-                        self.output.add_call(
-                            CallAssignment(last_weekday, "interventional_weekend", weekend_names[-1].initials, [weekend_names[-1]])
-                        )
-            current += timedelta(days=1)
+        return allocation.owners
+
+    # pinned slots -----------------------------------------------------
+    def _emit(self, day: date, block: str, site_code: str, site_type: str, providers: list[Provider]) -> None:
+        key = (day, site_code, block)
+        pinned = self.pins.get(key)
+        if pinned is not None:
+            self._emitted_pins.add(key)
+            providers = list(pinned)
+        if providers:
+            self.output.add_assignment(DayAssignment(day, block, site_code, site_type, providers))
+
+    def _emit_call(self, day: date, call_type: str, providers: list[Provider], label: str | None = None) -> str | None:
+        key = (day, call_type, None)
+        pinned = self.pins.get(key)
+        if pinned is not None:
+            self._emitted_pins.add(key)
+            providers = list(pinned)
+            label = None
+        if not providers:
+            return None
+        label = label or call_label(call_type, providers)
+        self.output.add_call(CallAssignment(day, call_type, label, providers))
+        return label
+
+    def _flush_pins(self, day: date, calls: bool = False) -> None:
+        # Pinned slots the solver never reached (closed days, unstaffed sites) are still honoured.
+        for key in self._pins_by_day.get(day, []):
+            if key in self._emitted_pins or (key[2] is None) != calls:
+                continue
+            _, slot, block = key
+            if calls:
+                self._emit_call(day, slot, [])
+            else:
+                base = slot[4:] if slot.startswith("ICD_") else slot.removesuffix("_APN").removesuffix("_OBL")
+                self._emit(day, block, slot, "hospital" if base in self.hospitals else "office", [])
 
     # helper methods ---------------------------------------------------
-    def _advance_until(self, pool: deque[Provider], predicate) -> Provider | None:
-        if not pool:
-            return None
-        for _ in range(len(pool)):
-            provider = pool[0]
-            pool.rotate(-1)
-            if predicate(provider):
-                return provider
-        return None
+    def _advance_until(self, pool: Rotation, day: date, predicate) -> Provider | None:
+        return pool.next(day, predicate)
 
     def _providers_from_initials(self, initials_list: Iterable[str]) -> list[Provider]:
         return [self.providers_by_initials[i] for i in initials_list if i in self.providers_by_initials]
 
-    def _find_office_md(self, day: date, office_code: str, block: str, skip: list[Provider]) -> Provider | None:
+    def _senior_md(
+        self, day: date, site_code: str, site_type: str, block: str, skip: list[Provider], blocks: tuple[str, ...] = ()
+    ) -> Provider | None:
         candidates = [
             p
             for p in self.providers
             if p.type == "MD"
-            and not p.is_invasive
-            and self._eligible(p, office_code, "office", block, day)
+            and not (site_type == "office" and p.is_invasive)
+            and all(self.available(p, other, day) for other in blocks)
+            and self._eligible(p, site_code, site_type, block, day)
             and p not in skip
-            and day not in self.vacations.get(p.id, set())
         ]
         if not candidates:
             return None
@@ -335,17 +720,15 @@ class ScheduleSolver:
         return candidates[0]
 
     def _pick_ep_md(self, day: date) -> Provider | None:
-        pool = self._providers_from_initials(self.rules.get("icd_clinic", {}).get("ep_mds", []))
-        for provider in pool:
+        for provider in self.bound_rules.icd_ep_mds:
             if day not in self.vacations.get(provider.id, set()):
                 return provider
         return None
 
     def _pick_ep_apns(self, day: date) -> list[Provider]:
-        pool = self._providers_from_initials(self.rules.get("icd_clinic", {}).get("ep_apns", []))
         selected: list[Provider] = []
-        nmc_days = set(self.rules.get("icd_clinic", {}).get("nmc_days", []))
-        for provider in pool:
+        nmc_days = self.rules.icd_clinic.nmc_days
+        for provider in self.bound_rules.icd_ep_apns:
             if provider.initials == "NMC" and day.weekday() not in nmc_days:
                 continue
             if day in self.vacations.get(provider.id, set()):
@@ -356,6 +739,43 @@ class ScheduleSolver:
         return selected[:2]
 
 
-def solve_schedule(session: InMemorySession, start_date: date, end_date: date) -> ScheduleOutput:
-    solver = ScheduleSolver(session)
-    return solver.solve(start_date, end_date)
\ No newline at end of file
+def call_pools(providers: Iterable[Provider]) -> dict[str, list[Provider]]:
+    """Providers each call rotation draws from; see ``CALL_POOLS`` for which pool covers which call."""
+    providers = list(providers)
+    return {
+        "noninv_md": [p for p in providers if p.type == "MD" and not p.is_invasive and not p.is_ep and p.initials not in {"HAS", "DAS"}],
+        "inv_md": [p for p in providers if p.type == "MD" and p.is_invasive],
+    }
+
+
+def call_label(call_type: str, providers: list[Provider]) -> str:
+    if call_type == "noninvasive_weekday" and len(providers) == 2:
+        return f"HH: {providers[0].initials} CH: {providers[1].initials}"
+    if call_type == "interventional_weekday":
+        return " ".join(f"{p.initials}." for p in providers)
+    return "/".join(p.initials for p in providers)
+
+
+def extend_schedule(
+    session: InMemorySession,
+    schedule: ScheduleOutput,
+    start_date: date,
+    end_date: date,
+    new_end: date,
+    rules: CompiledRules | None = None,
+    pins: Iterable[Pin] = (),
+) -> ScheduleOutput:
+    solver = ScheduleSolver(session, rules)
+    return solver.extend(schedule, start_date, end_date, new_end, pins)
+
+
+def solve_schedule(
+    session: InMemorySession,
+    start_date: date,
+    end_date: date,
+    rules: CompiledRules | None = None,
+    pins: Iterable[Pin] = (),
+    trace: DecisionTrace | None = None,
+) -> ScheduleOutput:
+    solver = ScheduleSolver(session, rules, trace)
+    return solver.solve(start_date, end_date, pins)
\ No newline at end of file
@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+import hashlib
+import io
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from datetime import date
+from functools import lru_cache
+from pathlib import Path
+from typing import BinaryIO, Iterable
+
+from app.core.config import settings
+from app.solver.diff import SlotChange
+from app.solver.engine import ScheduleOutput
+from app.solver.exporter import WeekSlice, load_mapping, render_week, week_slice
+
+SUFFIX = ".xlsx"
+
+
+def _file_digest(path: Path) -> str:
+    stat = path.stat()
+    return _cached_digest(str(path), stat.st_mtime_ns, stat.st_size)
+
+
+@lru_cache(maxsize=32)
+def _cached_digest(path: str, mtime_ns: int, size: int) -> str:
+    return hashlib.sha256(Path(path).read_bytes()).hexdigest()
+
+
+class ExportCache:
+    """Rendered workbooks on disk, named by a hash of everything that goes into them.
+
+    The key covers the template bytes, the cell mapping and the week's slice of
+    the schedule, so a hit is byte-for-byte what ``export_week`` would return.
+    Files are written to a temporary name and renamed into place; once the
+    directory holds more than ``max_bytes`` the least recently served files go.
+    A path from ``get`` or ``export`` can be evicted by a later ``put``, so
+    whatever is sent to a client comes from ``open``: the file is opened under
+    the lock, and an open file stays readable after it is unlinked.
+    """
+
+    def __init__(self, directory: Path, max_bytes: int) -> None:
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        # key -> size, oldest first; rebuilt from modification times so eviction survives restarts.
+        self._entries: OrderedDict[str, int] = OrderedDict()
+        self._total = 0
+        files = sorted(self.directory.glob(f"*{SUFFIX}"), key=lambda path: path.stat().st_mtime_ns)
+        for path in files:
+            self._entries[path.stem] = path.stat().st_size
+            self._total += self._entries[path.stem]
+
+    @staticmethod
+    def key(template: Path, week: WeekSlice) -> str:
+        parts = (_file_digest(template), _file_digest(settings.mapping_config_path), week.digest())
+        return hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()
+
+    def path_for(self, key: str) -> Path:
+        return self.directory / f"{key}{SUFFIX}"
+
+    def get(self, key: str) -> Path | None:
+        with self._lock:
+            return self._touch(key)
+
+    def _touch(self, key: str) -> Path | None:
+        path = self.path_for(key)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            self._total -= self._entries.pop(key, 0)
+            return None
+        if key in self._entries:
+            self._entries.move_to_end(key)
+        else:
+            self._entries[key] = path.stat().st_size
+            self._total += self._entries[key]
+        return path
+
+    def put(self, key: str, data: bytes) -> Path:
+        path = self.path_for(key)
+        fd, tmp = tempfile.mkstemp(dir=self.directory, prefix=f".{key}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as fh:
+                fh.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+        with self._lock:
+            self._total += len(data) - self._entries.pop(key, 0)
+            self._entries[key] = len(data)
+            self._evict(keep=key)
+        return path
+
+    def _evict(self, keep: str) -> None:
+        while self._total > self.max_bytes and len(self._entries) > 1:
+            key, size = next(iter(self._entries.items()))
+            if key == keep:
+                self._entries.move_to_end(key)
+                continue
+            del self._entries[key]
+            self._total -= size
+            self.path_for(key).unlink(missing_ok=True)
+
+    def _week(
+        self,
+        schedule: ScheduleOutput,
+        week_start: date,
+        template_path: Path | None,
+        highlight: Iterable[SlotChange] | None,
+    ) -> tuple[str, WeekSlice, Path, dict]:
+        template = template_path or settings.template_path
+        mapping = load_mapping()
+        week = week_slice(schedule, week_start, mapping, highlight)
+        return self.key(template, week), week, template, mapping
+
+    def export(
+        self,
+        schedule: ScheduleOutput,
+        week_start: date,
+        template_path: Path | None = None,
+        highlight: Iterable[SlotChange] | None = None,
+    ) -> Path:
+        """Path of the workbook for this week, rendering it only on a miss."""
+        key, week, template, mapping = self._week(schedule, week_start, template_path, highlight)
+        path = self.get(key)
+        if path is None:
+            path = self.put(key, render_week(week, template, mapping))
+        return path
+
+    def open(self, key: str) -> BinaryIO | None:
+        """The cached workbook opened for reading, or None on a miss."""
+        with self._lock:
+            path = self._touch(key)
+            return path.open("rb") if path is not None else None
+
+    def open_week(
+        self,
+        schedule: ScheduleOutput,
+        week_start: date,
+        template_path: Path | None = None,
+        highlight: Iterable[SlotChange] | None = None,
+    ) -> BinaryIO:
+        """The workbook for this week opened for reading, rendering it only on a miss."""
+        key, week, template, mapping = self._week(schedule, week_start, template_path, highlight)
+        handle = self.open(key)
+        if handle is None:
+            data = render_week(week, template, mapping)
+            self.put(key, data)
+            handle = io.BytesIO(data)
+        return handle
+
+
+@lru_cache
+def get_export_cache() -> ExportCache:
+    return ExportCache(settings.export_cache_path, settings.export_cache_max_bytes)
@@ -1,16 +1,23 @@
 from __future__ import annotations
 
+import copy
+import hashlib
 import io
 from collections import defaultdict
-from datetime import date, timedelta
+from dataclasses import dataclass
+from datetime import date
+from functools import lru_cache
 from pathlib import Path
 from typing import Iterable
 import xml.etree.ElementTree as ET
 import zipfile
 
 import json
+import re
 
+from app.core.calendar import calendar_for
 from app.core.config import settings
+from app.solver.diff import SlotChange
 from app.solver.engine import ScheduleOutput
 
 MAIN_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
@@ -27,6 +34,29 @@ ROW_OFFSETS = {
 
 WEEKDAY_LABELS = {0: "Mon", 1: "Tue", 2: "Wed", 3: "Thu", 4: "Fri"}
 VACATION_ABBREV = {0: "M", 1: "T", 2: "W", 3: "Th", 4: "F", 5: "Sa", 6: "Su"}
+WEEKEND_CALL_KEYS = {4: "friday", 5: "saturday", 6: "sunday"}
+
+HIGHLIGHT_FILL = '<fill><patternFill patternType="solid"><fgColor rgb="FFFFFF00"/><bgColor indexed="64"/></patternFill></fill>'
+
+
+@dataclass(frozen=True)
+class Template:
+    items: tuple[zipfile.ZipInfo, ...]
+    parts: dict[str, bytes]
+
+
+def load_template(path: Path | None = None) -> Template:
+    """The template's zip entries, read once per file version."""
+    target = Path(path or settings.template_path)
+    stat = target.stat()
+    return _read_template(str(target), stat.st_mtime_ns, stat.st_size)
+
+
+@lru_cache(maxsize=8)
+def _read_template(path: str, mtime_ns: int, size: int) -> Template:
+    with zipfile.ZipFile(path, "r") as zf:
+        items = tuple(zf.infolist())
+        return Template(items, {item.filename: zf.read(item.filename) for item in items})
 
 
 def load_mapping(path: Path | None = None) -> dict:
@@ -80,11 +110,8 @@ def _format_rmc_cell(md: str | None, apn: str | None) -> str:
 
 
 def _format_vacation_span(start: date, end: date) -> str:
-    days = []
-    current = start
-    while current <= end:
-        days.append(VACATION_ABBREV[current.weekday()])
-        current += timedelta(days=1)
+    table = calendar_for(start, end)
+    days = [VACATION_ABBREV[table.weekdays[table.index(day)]] for day in table.between(start, end)]
     if not days:
         return ""
     if len(days) == 1:
@@ -92,18 +119,139 @@ def _format_vacation_span(start: date, end: date) -> str:
     return f"{days[0]}–{days[-1]}"
 
 
-def export_week(schedule: ScheduleOutput, week_start: date, template_path: Path | None = None) -> bytes:
-    template = template_path or settings.template_path
-    mapping = load_mapping()
+class _StyleHighlighter:
+    """Clones the cell formats of highlighted cells with a solid fill appended to styles.xml."""
+
+    def __init__(self, styles_xml: bytes) -> None:
+        self.text = styles_xml.decode("utf-8")
+        cell_xfs = re.search(r"<cellXfs count=\"(\d+)\">(.*?)</cellXfs>", self.text, re.S)
+        if cell_xfs is None:
+            raise ValueError("Invalid template: missing cellXfs")
+        self.xfs = re.findall(r"<xf\b[^>]*?/>|<xf\b[^>]*?>.*?</xf>", cell_xfs.group(2), re.S)
+        fills = re.search(r"<fills count=\"(\d+)\"", self.text)
+        self.fill_id = int(fills.group(1)) if fills else 0
+        self.clones: dict[int, int] = {}
+
+    def style_for(self, original: int) -> int:
+        if original not in self.clones:
+            self.clones[original] = len(self.xfs) + len(self.clones)
+        return self.clones[original]
+
+    def render(self) -> bytes:
+        if not self.clones:
+            return self.text.encode("utf-8")
+        text = re.sub(r"<fills count=\"(\d+)\">", lambda m: f'<fills count="{int(m.group(1)) + 1}">', self.text, count=1)
+        text = text.replace("</fills>", f"{HIGHLIGHT_FILL}</fills>", 1)
+        clones = "".join(
+            self._with_fill(self.xfs[original] if original < len(self.xfs) else "<xf/>")
+            for original, _ in sorted(self.clones.items(), key=lambda item: item[1])
+        )
+        text = re.sub(
+            r"<cellXfs count=\"(\d+)\">",
+            lambda m: f'<cellXfs count="{len(self.xfs) + len(self.clones)}">',
+            text,
+            count=1,
+        )
+        text = text.replace("</cellXfs>", f"{clones}</cellXfs>", 1)
+        return text.encode("utf-8")
+
+    def _with_fill(self, xf: str) -> str:
+        head_end = xf.index(">")
+        self_closing = xf[head_end - 1] == "/"
+        head = xf[: head_end - 1 if self_closing else head_end]
+        for name, value in (("fillId", str(self.fill_id)), ("applyFill", "1")):
+            pattern = rf'\s{name}="[^"]*"'
+            if re.search(pattern, head):
+                head = re.sub(pattern, f' {name}="{value}"', head)
+            else:
+                head = f'{head} {name}="{value}"'
+        return head + xf[head_end - 1 if self_closing else head_end :]
+
+
+def _column_row(cell_ref: str) -> tuple[str, int]:
+    return "".join(filter(str.isalpha, cell_ref)), int("".join(filter(str.isdigit, cell_ref)))
+
+
+def _highlight_refs(mapping: dict, week_start: date, changes: Iterable[SlotChange]) -> list[str]:
+    offices = mapping["cells"].get("offices", {})
+    hospitals = mapping["cells"].get("hospitals", {})
+    call_cells = mapping.get("call_cells", {})
+
+    refs: set[str] = set()
+    for change in changes:
+        offset = (change.date - week_start).days
+        if not 0 <= offset <= 6:
+            continue
+        if change.block is not None:
+            code = "WTH" if change.slot == "WTH_APN" else change.slot
+            cell_map = offices.get(code) or hospitals.get(code) or {}
+            row_index = ROW_OFFSETS.get(offset, {}).get(change.block)
+            if row_index is None or not cell_map.get(change.block) or (code == "COO_OBL" and offset != 2):
+                continue
+            column, _ = _column_row(cell_map[change.block])
+            refs.add(_cell_ref(column, row_index))
+            continue
 
-    week_days = [week_start + timedelta(days=i) for i in range(5)]
-    assignments_by_day: dict[date, dict[str, dict[str, list[str]]]] = defaultdict(lambda: defaultdict(lambda: defaultdict(list)))
+        weekday = change.date.weekday()
+        if change.slot in ("noninvasive_weekday", "interventional_weekday"):
+            cell_ref = call_cells.get(change.slot, {}).get(str(weekday))
+            if cell_ref:
+                refs.add(cell_ref)
+            if change.slot == "noninvasive_weekday" and weekday == 4:
+                # The weekday Friday label is mirrored into the weekend Friday cell.
+                cell_ref = call_cells.get("weekend_noninv", {}).get("friday")
+                if cell_ref:
+                    refs.add(cell_ref)
+        elif change.slot == "weekend_noninv" and weekday in WEEKEND_CALL_KEYS:
+            cell_ref = call_cells.get("weekend_noninv", {}).get(WEEKEND_CALL_KEYS[weekday])
+            if cell_ref:
+                refs.add(cell_ref)
+        elif change.slot == "interventional_weekend":
+            cell_ref = call_cells.get("weekend_interv", {}).get("summary")
+            if cell_ref:
+                refs.add(cell_ref)
+    return sorted(refs)
+
+
+def _find_cell(row: ET.Element, cell_ref: str) -> ET.Element:
+    cell_tag = f"{{{MAIN_NS}}}c"
+    for cell in row.findall(cell_tag):
+        if cell.attrib.get("r") == cell_ref:
+            return cell
+    return ET.SubElement(row, cell_tag, {"r": cell_ref})
 
+
+@dataclass(frozen=True)
+class WeekSlice:
+    """Everything export_week writes into the template for one week."""
+
+    week_start: date
+    assignments: tuple[tuple[date, str, str, tuple[str, ...]], ...]
+    call_labels: tuple[tuple[tuple[str, object], str], ...]
+    vacation_entries: tuple[str, ...]
+    highlight_refs: tuple[str, ...]
+
+    def digest(self) -> str:
+        return hashlib.sha256(repr(self).encode("utf-8")).hexdigest()
+
+
+def week_slice(
+    schedule: ScheduleOutput,
+    week_start: date,
+    mapping: dict | None = None,
+    highlight: Iterable[SlotChange] | None = None,
+) -> WeekSlice:
+    mapping = mapping if mapping is not None else load_mapping()
+    highlight_refs = _highlight_refs(mapping, week_start, highlight) if highlight is not None else []
+
+    week = calendar_for(week_start, week_start).week(week_start)
+    week_days = list(week[:5])
+    assignments = []
     for assignment in schedule.assignments:
         if assignment.date not in week_days:
             continue
-        initials = [provider.initials for provider in assignment.providers]
-        assignments_by_day[assignment.date][assignment.site_code][assignment.block].extend(initials)
+        initials = tuple(provider.initials for provider in assignment.providers)
+        assignments.append((assignment.date, assignment.site_code, assignment.block, initials))
 
     # Prepare call labels
     call_labels = defaultdict(str)
@@ -128,30 +276,67 @@ def export_week(schedule: ScheduleOutput, week_start: date, template_path: Path
     vacation_entries: list[str] = []
     for provider, ranges in schedule.vacations.items():
         for start, end, _ in ranges:
-            if end < week_start or start > week_start + timedelta(days=6):
+            if end < week_start or start > week[6]:
                 continue
             span_start = max(start, week_start)
-            span_end = min(end, week_start + timedelta(days=6))
+            span_end = min(end, week[6])
             vacation_entries.append(f"{provider} — {_format_vacation_span(span_start, span_end)}")
 
+    return WeekSlice(
+        week_start=week_start,
+        assignments=tuple(assignments),
+        call_labels=tuple(call_labels.items()),
+        vacation_entries=tuple(vacation_entries),
+        highlight_refs=tuple(highlight_refs),
+    )
+
+
+def render_week(week: WeekSlice, template_path: Path | None = None, mapping: dict | None = None) -> bytes:
+    template = template_path or settings.template_path
+    mapping = mapping if mapping is not None else load_mapping()
+    highlight_refs = list(week.highlight_refs)
+    assignments_by_day: dict[date, dict[str, dict[str, list[str]]]] = defaultdict(lambda: defaultdict(lambda: defaultdict(list)))
+    for day, site_code, block, initials in week.assignments:
+        assignments_by_day[day][site_code][block].extend(initials)
+
+    cached = load_template(template)
+    parts = cached.parts
+    highlighter = _StyleHighlighter(parts["xl/styles.xml"]) if highlight_refs else None
+    # The sheet is populated first so highlighted styles are known before styles.xml is written.
+    sheet = _populate_sheet(
+        parts["xl/worksheets/sheet1.xml"],
+        mapping,
+        week.week_start,
+        assignments_by_day,
+        dict(week.call_labels),
+        list(week.vacation_entries),
+        highlight_refs,
+        highlighter,
+    )
     buffer = io.BytesIO()
-    with zipfile.ZipFile(template, "r") as zf:
-        with zipfile.ZipFile(buffer, "w") as output_zip:
-            for item in zf.infolist():
-                data = zf.read(item.filename)
-                if item.filename == "xl/worksheets/sheet1.xml":
-                    data = _populate_sheet(
-                        data,
-                        mapping,
-                        week_start,
-                        assignments_by_day,
-                        call_labels,
-                        vacation_entries,
-                    )
-                output_zip.writestr(item, data)
+    with zipfile.ZipFile(buffer, "w") as output_zip:
+        for item in cached.items:
+            if item.filename == "xl/worksheets/sheet1.xml":
+                data = sheet
+            elif item.filename == "xl/styles.xml" and highlighter is not None:
+                data = highlighter.render()
+            else:
+                data = parts[item.filename]
+            # writestr fills in offsets and sizes on the ZipInfo, so the cached one stays untouched.
+            output_zip.writestr(copy.copy(item), data)
     return buffer.getvalue()
 
 
+def export_week(
+    schedule: ScheduleOutput,
+    week_start: date,
+    template_path: Path | None = None,
+    highlight: Iterable[SlotChange] | None = None,
+) -> bytes:
+    mapping = load_mapping()
+    return render_week(week_slice(schedule, week_start, mapping, highlight), template_path, mapping)
+
+
 def _populate_sheet(
     xml_bytes: bytes,
     mapping: dict,
@@ -159,15 +344,18 @@ def _populate_sheet(
     assignments_by_day: dict,
     call_labels: dict,
     vacation_entries: list[str],
+    highlight_refs: list[str] | None = None,
+    highlighter: _StyleHighlighter | None = None,
 ) -> bytes:
     tree = ET.fromstring(xml_bytes)
     sheet_data = tree.find("main:sheetData", NS)
     if sheet_data is None:
         raise ValueError("Invalid template: missing sheetData")
+    week = calendar_for(week_start, week_start).week(week_start)
 
     # Weekday placements
     for idx, day in enumerate(range(5)):
-        day_date = week_start + timedelta(days=idx)
+        day_date = week[idx]
         day_assignments = assignments_by_day.get(day_date, {})
         for office_code, cell_map in mapping["cells"].get("offices", {}).items():
             block_row = ROW_OFFSETS[idx]
@@ -185,7 +373,7 @@ def _populate_sheet(
 
     # WT hospital
     for idx, block_row in ROW_OFFSETS.items():
-        day_date = week_start + timedelta(days=idx)
+        day_date = week[idx]
         day_assignments = assignments_by_day.get(day_date, {})
         for block, row_index in block_row.items():
             column_ref = mapping["cells"]["hospitals"]["WTH"].get(block)
@@ -199,7 +387,7 @@ def _populate_sheet(
 
     # RMC pairs
     for idx, block_row in ROW_OFFSETS.items():
-        day_date = week_start + timedelta(days=idx)
+        day_date = week[idx]
         day_assignments = assignments_by_day.get(day_date, {})
         for block, row_index in block_row.items():
             column_ref = mapping["cells"]["hospitals"]["RMC"].get(block)
@@ -214,7 +402,7 @@ def _populate_sheet(
     for idx, block_row in ROW_OFFSETS.items():
         if idx != 2:
             continue
-        day_date = week_start + timedelta(days=idx)
+        day_date = week[idx]
         day_assignments = assignments_by_day.get(day_date, {})
         for block, row_index in block_row.items():
             column_ref = mapping["cells"]["hospitals"]["COO_OBL"].get(block)
@@ -274,4 +462,10 @@ def _populate_sheet(
         _set_cell(row, _cell_ref(column, row_index), entry)
         pointer += 1
 
+    if highlight_refs and highlighter is not None:
+        for cell_ref in highlight_refs:
+            _, row_index = _column_row(cell_ref)
+            cell = _find_cell(_ensure_row(sheet_data, row_index), cell_ref)
+            cell.attrib["s"] = str(highlighter.style_for(int(cell.attrib.get("s", "0"))))
+
     return ET.tostring(tree, encoding="utf-8", xml_declaration=True)
\ No newline at end of file
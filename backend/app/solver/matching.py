@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+from collections import deque
+from typing import Hashable, Iterable, Mapping, TypeVar
+
+L = TypeVar("L", bound=Hashable)
+R = TypeVar("R", bound=Hashable)
+
+_INF = float("inf")
+
+
+def hopcroft_karp(adjacency: Mapping[L, Iterable[R]], initial: Mapping[L, R] | None = None) -> dict[L, R]:
+    """Maximum bipartite matching; ``initial`` seeds it with a partial matching to extend.
+
+    Left vertices and their neighbours are tried in the order given, so the
+    result is deterministic for a given input.
+    """
+    graph = {left: list(rights) for left, rights in adjacency.items()}
+    match_left: dict[L, R | None] = {left: None for left in graph}
+    match_right: dict[R, L] = {}
+    for left, right in (initial or {}).items():
+        if left in graph and right not in match_right:
+            match_left[left], match_right[right] = right, left
+
+    dist: dict[L | None, float] = {}
+
+    def bfs() -> bool:
+        queue: deque[L] = deque()
+        for left in graph:
+            if match_left[left] is None:
+                dist[left] = 0
+                queue.append(left)
+            else:
+                dist[left] = _INF
+        dist[None] = _INF
+        while queue:
+            left = queue.popleft()
+            if dist[left] < dist[None]:
+                for right in graph[left]:
+                    partner = match_right.get(right)
+                    if dist[partner] == _INF:
+                        dist[partner] = dist[left] + 1
+                        if partner is not None:
+                            queue.append(partner)
+        return dist[None] != _INF
+
+    def dfs(left: L) -> bool:
+        # Iterative DFS along layered edges, so long augmenting paths cannot hit the recursion limit.
+        stack = [(left, iter(graph[left]))]
+        path: list[tuple[L, R]] = []
+        while stack:
+            node, rights = stack[-1]
+            advanced = False
+            for right in rights:
+                partner = match_right.get(right)
+                if dist[partner] != dist[node] + 1:
+                    continue
+                path.append((node, right))
+                if partner is None:
+                    for l, r in path:
+                        match_left[l], match_right[r] = r, l
+                    return True
+                stack.append((partner, iter(graph[partner])))
+                advanced = True
+                break
+            if not advanced:
+                dist[node] = _INF
+                stack.pop()
+                if path:
+                    path.pop()
+        return False
+
+    while bfs():
+        for left in graph:
+            if match_left[left] is None:
+                dfs(left)
+    return {left: right for left, right in match_left.items() if right is not None}
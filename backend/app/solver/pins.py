@@ -0,0 +1,185 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import date
+from typing import Iterable
+
+from app.config.registry import CompiledRules, get_rules_registry
+from app.db.session import InMemorySession
+from app.models import Assignment, Provider, ScheduleBlock, SiteHospital, SiteOffice, VacationRequest
+from app.solver.diff import SlotChange, diff_schedules
+from app.solver.engine import CALL_POOLS, Pin, ScheduleOutput, ScheduleSolver, call_pools
+
+CALL_BLOCK = "CALL"
+
+_ROLE_SUFFIXES = {"APN": "_APN", "OBL": "_OBL"}
+
+
+@dataclass
+class RepairResult:
+    revision: int
+    changes: list[SlotChange]
+
+
+def _site_codes(session: InMemorySession) -> dict[tuple[str, int], str]:
+    codes = {("office", o.id): o.code for o in session.all(SiteOffice)}
+    codes.update({("hospital", h.id): h.code for h in session.all(SiteHospital)})
+    return codes
+
+
+def block_slot(block: ScheduleBlock, codes: dict[tuple[str, int], str]) -> tuple[str, str | None] | None:
+    if block.block == CALL_BLOCK:
+        return block.role, None
+    code = codes.get((block.site_type, block.site_id))
+    if code is None:
+        return None
+    if block.role == "ICD":
+        return f"ICD_{code}", block.block
+    return code + _ROLE_SUFFIXES.get(block.role, ""), block.block
+
+
+def _slot_site(session: InMemorySession, slot: str) -> tuple[str, str, int, str]:
+    """(site code, site type, site id, role) of a slot code such as ``WTH_APN``."""
+    role = ""
+    code = slot
+    if slot.startswith("ICD_"):
+        role, code = "ICD", slot[4:]
+    else:
+        for name, suffix in _ROLE_SUFFIXES.items():
+            if slot.endswith(suffix):
+                role, code = name, slot[: -len(suffix)]
+    for site_type, model in (("hospital", SiteHospital), ("office", SiteOffice)):
+        site = next((s for s in session.all(model) if s.code == code), None)
+        if site is not None:
+            return code, site_type, site.id, role
+    raise KeyError(slot)
+
+
+def _slot_block(session: InMemorySession, day: date, slot: str, block: str | None) -> ScheduleBlock:
+    if block is None:
+        return ScheduleBlock(date=day, block=CALL_BLOCK, site_type="call", role=slot)
+    _, site_type, site_id, role = _slot_site(session, slot)
+    return ScheduleBlock(date=day, block=block, site_type=site_type, site_id=site_id, role=role)
+
+
+def pin_problems(
+    session: InMemorySession,
+    day: date,
+    slot: str,
+    block: str | None,
+    providers: Iterable[Provider],
+    rules: CompiledRules | None = None,
+) -> list[str]:
+    """Why ``providers`` cannot be pinned to the slot: approved leave that day, or a slot they may not work.
+
+    Raises ``KeyError`` for an unknown slot, like ``save_pin``.
+    """
+    on_leave = {
+        v.provider_id for v in session.all(VacationRequest) if v.status == "APPROVED" and v.start_date <= day <= v.end_date
+    }
+    if block is None:
+        if slot not in CALL_POOLS:
+            raise KeyError(slot)
+        pool = {p.id for p in call_pools(session.all(Provider))[CALL_POOLS[slot]]}
+
+        def allowed(provider: Provider) -> bool:
+            return provider.id in pool
+
+    else:
+        code, site_type, _, role = _slot_site(session, slot)
+        rules = rules or get_rules_registry().active
+        icd = rules.icd_clinic
+
+        def allowed(provider: Provider) -> bool:
+            if role == "ICD":
+                return provider.initials in (icd.ep_mds if provider.type == "MD" else icd.ep_apns)
+            if role == "OBL" and (provider.type != "MD" or provider.initials not in rules.obl.physicians):
+                return False
+            if role == "APN" and provider.type != "APN":
+                return False
+            return ScheduleSolver.qualified(provider, code, site_type)
+
+    problems = []
+    for provider in providers:
+        if provider.id in on_leave:
+            problems.append(f"{provider.initials} is on leave on {day}")
+        elif not allowed(provider):
+            problems.append(f"{provider.initials} cannot be pinned to {slot}")
+    return problems
+
+
+def load_pins(session: InMemorySession, start_date: date, end_date: date) -> list[Pin]:
+    codes = _site_codes(session)
+    providers: dict[int, list[int]] = {}
+    for assignment in session.all(Assignment):
+        providers.setdefault(assignment.schedule_block_id, []).append(assignment.provider_id)
+    pins = []
+    for block in session.all(ScheduleBlock):
+        if not block.locked or not start_date <= block.date <= end_date:
+            continue
+        slot = block_slot(block, codes)
+        if slot is not None:
+            pins.append(Pin(block.date, slot[0], slot[1], tuple(providers.get(block.id, ()))))
+    return pins
+
+
+class PinError(ValueError):
+    def __init__(self, problems: list[str]) -> None:
+        super().__init__("; ".join(problems))
+        self.problems = problems
+
+
+def save_pin(
+    session: InMemorySession,
+    day: date,
+    slot: str,
+    block: str | None,
+    providers: Iterable[Provider],
+    rules: CompiledRules | None = None,
+) -> ScheduleBlock:
+    providers = list(providers)
+    problems = pin_problems(session, day, slot, block, providers, rules)
+    if problems:
+        raise PinError(problems)
+    template = _slot_block(session, day, slot, block)
+    existing = next(
+        (
+            b
+            for b in session.all(ScheduleBlock)
+            if (b.date, b.block, b.site_type, b.site_id, b.role)
+            == (template.date, template.block, template.site_type, template.site_id, template.role)
+        ),
+        None,
+    )
+    schedule_block = existing or template
+    schedule_block.locked = True
+    session.add(schedule_block)
+    for assignment in [a for a in session.all(Assignment) if a.schedule_block_id == schedule_block.id]:
+        session.delete(assignment)
+    for provider in providers:
+        session.add(
+            Assignment(
+                schedule_block_id=schedule_block.id,
+                provider_id=provider.id,
+                is_call=block is None,
+                is_weekend=day.weekday() >= 5,
+                source="pinned",
+            )
+        )
+    session.commit()
+    return schedule_block
+
+
+def repair_schedule(
+    session: InMemorySession,
+    schedule: ScheduleOutput,
+    start_date: date,
+    end_date: date,
+    rules: CompiledRules,
+    since: date,
+    until: date,
+) -> RepairResult:
+    solver = ScheduleSolver(session, rules)
+    pins = load_pins(session, start_date, end_date)
+    replaced, patch = solver.repair(schedule, start_date, end_date, pins, since, until)
+    return RepairResult(revision=schedule.revision, changes=diff_schedules(replaced, patch).changes)
@@ -0,0 +1,221 @@
+from __future__ import annotations
+
+import heapq
+from collections import deque
+from datetime import date
+from typing import Callable, Generic, Hashable, Iterable, Iterator, Mapping, TypeVar
+
+from app.models import Provider
+
+K = TypeVar("K", bound=Hashable)
+
+
+class IndexedHeap(Generic[K]):
+    """Binary min-heap with a position index, so any item's key can be changed in O(log n)."""
+
+    def __init__(self) -> None:
+        self._items: list[K] = []
+        self._keys: dict[K, tuple] = {}
+        self._positions: dict[K, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __contains__(self, item: K) -> bool:
+        return item in self._positions
+
+    def push(self, item: K, key: tuple) -> None:
+        self._items.append(item)
+        self._keys[item] = key
+        self._positions[item] = len(self._items) - 1
+        self._sift_up(len(self._items) - 1)
+
+    def pop(self) -> K:
+        top = self._items[0]
+        last = self._items.pop()
+        del self._positions[top], self._keys[top]
+        if self._items:
+            self._items[0] = last
+            self._positions[last] = 0
+            self._sift_down(0)
+        return top
+
+    def update(self, item: K, key: tuple) -> None:
+        old = self._keys[item]
+        self._keys[item] = key
+        if key < old:
+            self._sift_up(self._positions[item])
+        else:
+            self._sift_down(self._positions[item])
+
+    def ordered(self) -> Iterator[K]:
+        """Items in key order, produced lazily without modifying the heap."""
+        items, keys = self._items, self._keys
+        if not items:
+            return
+        yield items[0]
+        size = len(items)
+        frontier = [(keys[items[child]], child) for child in (1, 2) if child < size]
+        heapq.heapify(frontier)
+        while frontier:
+            _, i = heapq.heappop(frontier)
+            yield items[i]
+            for child in (2 * i + 1, 2 * i + 2):
+                if child < size:
+                    heapq.heappush(frontier, (keys[items[child]], child))
+
+    def clear(self) -> None:
+        self._items.clear()
+        self._keys.clear()
+        self._positions.clear()
+
+    def _sift_up(self, i: int) -> None:
+        keys, items, positions = self._keys, self._items, self._positions
+        item = items[i]
+        key = keys[item]
+        while i:
+            parent = (i - 1) >> 1
+            if key >= keys[items[parent]]:
+                break
+            items[i] = items[parent]
+            positions[items[i]] = i
+            i = parent
+        items[i] = item
+        positions[item] = i
+
+    def _sift_down(self, i: int) -> None:
+        keys, items, positions = self._keys, self._items, self._positions
+        size = len(items)
+        item = items[i]
+        key = keys[item]
+        while True:
+            child = 2 * i + 1
+            if child >= size:
+                break
+            if child + 1 < size and keys[items[child + 1]] < keys[items[child]]:
+                child += 1
+            if key <= keys[items[child]]:
+                break
+            items[i] = items[child]
+            positions[items[i]] = i
+            i = child
+        items[i] = item
+        positions[item] = i
+
+
+class LoadLedger:
+    """Assignments handed out so far in one solver pass, shared by that pass's ``load`` rotations."""
+
+    def __init__(self) -> None:
+        self.load: dict[int, int] = {}
+        self.last: dict[int, int] = {}
+        # Provider id -> the rotations it belongs to, so a pick only re-keys those.
+        self._rotations: dict[int, list[Rotation]] = {}
+
+    def attach(self, rotation: Rotation, provider_id: int) -> None:
+        self._rotations.setdefault(provider_id, []).append(rotation)
+
+    def detach(self, rotation: Rotation) -> None:
+        for rotations in self._rotations.values():
+            if rotation in rotations:
+                rotations.remove(rotation)
+
+    def record(self, provider_id: int, day: date) -> None:
+        self.load[provider_id] = self.load.get(provider_id, 0) + 1
+        self.last[provider_id] = day.toordinal()
+        for rotation in self._rotations.get(provider_id, ()):
+            rotation.refresh(provider_id)
+
+
+class Rotation:
+    """Provider rotation.
+
+    ``cycle`` mode is the original deque: every provider examined moves to the
+    back. ``load`` mode keeps an indexed heap keyed on (cumulative load, last
+    assigned day, rotation order) and picks the first eligible provider in key
+    order; skipped providers are only looked at, never moved.
+    """
+
+    def __init__(self, members: Iterable[Provider], ledger: LoadLedger, mode: str = "cycle") -> None:
+        self.mode = mode
+        self._ledger = ledger
+        self._providers: dict[int, Provider] = {}
+        self._pool: deque[int] = deque()
+        self._order: dict[int, int] = {}
+        self._heap: IndexedHeap[int] = IndexedHeap()
+        self._counter = 0
+        self._fill(list(members))
+
+    def __len__(self) -> int:
+        return len(self._providers)
+
+    def __iter__(self) -> Iterator[Provider]:
+        if self.mode == "cycle":
+            return (self._providers[i] for i in self._pool)
+        return (self._providers[i] for i in sorted(self._providers, key=self._key))
+
+    def _fill(self, members: list[Provider]) -> None:
+        for provider in members:
+            if provider.id in self._providers:
+                continue
+            self._providers[provider.id] = provider
+            if self.mode == "cycle":
+                self._pool.append(provider.id)
+                continue
+            self._order[provider.id] = self._next_ticket()
+            self._heap.push(provider.id, self._key(provider.id))
+            self._ledger.attach(self, provider.id)
+
+    def _next_ticket(self) -> int:
+        self._counter += 1
+        return self._counter
+
+    def _key(self, provider_id: int) -> tuple:
+        ledger = self._ledger
+        return (ledger.load.get(provider_id, 0), ledger.last.get(provider_id, 0), self._order[provider_id])
+
+    def refresh(self, provider_id: int) -> None:
+        self._heap.update(provider_id, self._key(provider_id))
+
+    def next(self, day: date, predicate: Callable[[Provider], bool]) -> Provider | None:
+        providers = self._providers
+        if self.mode == "cycle":
+            pool = self._pool
+            for _ in range(len(pool)):
+                provider = providers[pool[0]]
+                pool.rotate(-1)
+                if predicate(provider):
+                    return provider
+            return None
+
+        chosen = next((i for i in self._heap.ordered() if predicate(providers[i])), None)
+        if chosen is None:
+            return None
+        self._order[chosen] = self._next_ticket()
+        # Re-keys the chosen provider here and in every other rotation it belongs to.
+        self._ledger.record(chosen, day)
+        return providers[chosen]
+
+    def state(self) -> tuple:
+        if self.mode == "cycle":
+            return tuple(self._pool)
+        ranked = sorted(self._providers, key=self._key)
+        ledger = self._ledger
+        return tuple((i, ledger.load.get(i, 0), ledger.last.get(i, 0)) for i in ranked)
+
+    def restore(self, state: tuple, providers_by_id: Mapping[int, Provider]) -> None:
+        self._providers.clear()
+        self._pool.clear()
+        self._order.clear()
+        self._heap.clear()
+        self._ledger.detach(self)
+        self._counter = 0
+        members = []
+        for entry in state:
+            provider_id = entry if self.mode == "cycle" else entry[0]
+            if provider_id not in providers_by_id:
+                continue
+            if self.mode != "cycle":
+                self._ledger.load[provider_id], self._ledger.last[provider_id] = entry[1], entry[2]
+            members.append(providers_by_id[provider_id])
+        self._fill(members)
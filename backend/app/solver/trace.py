@@ -0,0 +1,226 @@
+from __future__ import annotations
+
+import threading
+from collections import deque
+from dataclasses import dataclass
+from datetime import date
+from pathlib import Path
+from typing import TYPE_CHECKING, Iterator
+
+import orjson
+
+from app.models import Provider
+
+if TYPE_CHECKING:
+    from app.solver.daily import SlotTemplate
+    from app.solver.engine import ScheduleSolver
+    from app.solver.rotation import Rotation
+
+# Why a candidate ahead of the winner did not get the slot.
+VACATION = "vacation"
+PINNED_ELSEWHERE = "pinned_elsewhere"
+SITE_RESTRICTION = "site_restriction"
+PRIVILEGES = "privileges"
+ALREADY_ASSIGNED = "already_assigned"
+
+
+@dataclass(frozen=True)
+class SlotDecision:
+    date: date
+    block: str | None
+    slot: str
+    winners: tuple[str, ...]
+    rejected: tuple[tuple[str, str], ...]  # (initials, reason) of those ahead of the winners, in order
+    pinned: bool = False
+
+    def as_dict(self) -> dict:
+        return {
+            "date": self.date.isoformat(),
+            "block": self.block,
+            "slot": self.slot,
+            "winners": list(self.winners),
+            "rejected": [list(entry) for entry in self.rejected],
+            "pinned": self.pinned,
+        }
+
+
+class DecisionTrace:
+    """The last ``capacity`` slot decisions of a solve, oldest dropped first.
+
+    With ``path`` every decision is also appended to that file as a JSON line,
+    so a full run can be kept when the buffer is too small for it.
+    """
+
+    def __init__(self, capacity: int = 20_000, path: Path | None = None) -> None:
+        self._decisions: deque[SlotDecision] = deque(maxlen=capacity)
+        self._lock = threading.Lock()
+        self._file = open(path, "ab") if path is not None else None
+
+    def __len__(self) -> int:
+        return len(self._decisions)
+
+    def __iter__(self) -> Iterator[SlotDecision]:
+        with self._lock:
+            return iter(list(self._decisions))
+
+    def record(self, decision: SlotDecision) -> None:
+        with self._lock:
+            self._decisions.append(decision)
+            if self._file is not None:
+                self._file.write(orjson.dumps(decision.as_dict()) + b"\n")
+
+    def select(self, day: date | None = None, slot: str | None = None) -> list[SlotDecision]:
+        return [d for d in self if (day is None or d.date == day) and (slot is None or d.slot == slot)]
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+# Solver methods a tracer shadows on the instance it traces.
+TRACED_METHODS = ("_eligible", "_advance_until", "_senior_md", "_pick_mds", "_pick_apns", "_emit", "_emit_call", "solve")
+
+
+class SolverTracer:
+    """Records slot decisions by shadowing a solver's selection methods on that one instance.
+
+    The solver class itself is never touched, so a solve without a trace runs
+    exactly the untraced code. Candidates are collected while a role is picked
+    and attributed to the slot when it is emitted.
+    """
+
+    def __init__(self, solver: ScheduleSolver, trace: DecisionTrace) -> None:
+        self.solver = solver
+        self.trace = trace
+        # provider id -> rejection reason (None while eligible), for the pick in progress
+        self._scratch: dict[int, str | None] = {}
+        self._pending: dict[tuple[date, str | None, str], dict[int, str | None]] = {}
+        self._day: date | None = None
+        # Other blocks the MD being picked must also be free in (whole-day shifts).
+        self._blocks: tuple[str, ...] = ()
+        self._eligible = solver._eligible
+        self._advance_until = solver._advance_until
+        self._senior_md = solver._senior_md
+        self._pick_mds = solver._pick_mds
+        self._pick_apns = solver._pick_apns
+        self._emit = solver._emit
+        self._emit_call = solver._emit_call
+        self._solve = solver.solve
+        for name in TRACED_METHODS:
+            setattr(solver, name, getattr(self, name.lstrip("_")))
+
+    def solve(self, *args, **kwargs):
+        output = self._solve(*args, **kwargs)
+        self._flush()
+        return output
+
+    def reason(self, provider: Provider, site_code: str, site_type: str, block: str, day: date) -> str:
+        solver = self.solver
+        if day in solver.vacations.get(provider.id, ()):
+            return VACATION
+        if provider.id in solver._pinned_busy.get((day, block), ()):
+            return PINNED_ELSEWHERE
+        if not solver.has_privileges(provider, site_code, site_type):
+            return PRIVILEGES
+        return SITE_RESTRICTION
+
+    def eligible(self, provider: Provider, site_code: str, site_type: str, block: str, day: date) -> bool:
+        ok = self._eligible(provider, site_code, site_type, block, day)
+        if provider.id not in self._scratch:
+            self._scratch[provider.id] = None if ok else self.reason(provider, site_code, site_type, block, day)
+        return ok
+
+    def advance_until(self, pool: Rotation, day: date, predicate) -> Provider | None:
+        def traced(provider: Provider) -> bool:
+            ok = predicate(provider)
+            if not ok and provider.id not in self._scratch:
+                # Turned down before eligibility was even checked: on leave, pinned in another
+                # block of a whole-day shift, or taken earlier in this slot or day.
+                self._scratch[provider.id] = self._unavailable(provider, day, self._blocks) or ALREADY_ASSIGNED
+            return ok
+
+        return self._advance_until(pool, day, traced)
+
+    def _unavailable(self, provider: Provider, day: date, blocks: tuple[str, ...]) -> str | None:
+        solver = self.solver
+        if day in solver.vacations.get(provider.id, ()):
+            return VACATION
+        if any(provider.id in solver._pinned_busy.get((day, block), ()) for block in blocks):
+            return PINNED_ELSEWHERE
+        return None
+
+    def senior_md(
+        self, day: date, site_code: str, site_type: str, block: str, skip: list[Provider], blocks: tuple[str, ...] = ()
+    ) -> Provider | None:
+        for provider in skip:
+            self._scratch.setdefault(provider.id, ALREADY_ASSIGNED)
+        if blocks:
+            for provider in self.solver.providers:
+                reason = self._unavailable(provider, day, blocks) if provider.type == "MD" else None
+                if reason is not None:
+                    self._scratch.setdefault(provider.id, reason)
+        picked = self._senior_md(day, site_code, site_type, block, skip, blocks)
+        # Candidates were checked in roster order; "ahead" means more senior.
+        by_id = self.solver.providers_by_id
+        ranked = sorted(self._scratch.items(), key=lambda item: (by_id[item[0]].seniority or 0, by_id[item[0]].initials))
+        self._scratch = dict(ranked)
+        return picked
+
+    def pick_mds(
+        self, slot: SlotTemplate, day: date, cycle: Rotation | None, skip: list[Provider], blocks: tuple[str, ...] = ()
+    ) -> list[Provider]:
+        self._scratch.clear()
+        self._blocks = blocks
+        try:
+            picked = self._pick_mds(slot, day, cycle, skip, blocks)
+        finally:
+            self._blocks = ()
+        self._park(day, slot.block, slot.md_code)
+        return picked
+
+    def pick_apns(self, slot: SlotTemplate, day: date, cycle: Rotation | None) -> list[Provider]:
+        self._scratch.clear()
+        picked = self._pick_apns(slot, day, cycle)
+        self._park(day, slot.block, slot.apn_code)
+        return picked
+
+    def _park(self, day: date, block: str | None, code: str) -> None:
+        if day != self._day:
+            self._flush()
+            self._day = day
+        self._pending.setdefault((day, block, code), {}).update(self._scratch)
+        self._scratch.clear()
+
+    def _flush(self) -> None:
+        # Roles nobody could fill are never emitted; record them as unstaffed.
+        pending, self._pending = self._pending, {}
+        for (day, block, slot), considered in pending.items():
+            self._record(day, block, slot, [], considered)
+
+    def emit(self, day: date, block: str, site_code: str, site_type: str, providers: list[Provider]) -> None:
+        self._park(day, block, site_code)
+        self._record(day, block, site_code, providers, self._pending.pop((day, block, site_code)))
+        self._emit(day, block, site_code, site_type, providers)
+
+    def emit_call(self, day: date, call_type: str, providers: list[Provider], label: str | None = None) -> str | None:
+        self._park(day, None, call_type)
+        self._record(day, None, call_type, providers, self._pending.pop((day, None, call_type)))
+        return self._emit_call(day, call_type, providers, label)
+
+    def _record(
+        self, day: date, block: str | None, slot: str, providers: list[Provider], considered: dict[int, str | None]
+    ) -> None:
+        pinned = self.solver.pins.get((day, slot, block))
+        winners = list(pinned) if pinned is not None else providers
+        winner_ids = {p.id for p in winners}
+        order = list(considered)
+        # Whoever was looked at after the last winner was not in the way.
+        cut = max((order.index(i) for i in winner_ids if i in considered), default=len(order) - 1)
+        by_id = self.solver.providers_by_id
+        rejected = tuple(
+            (by_id[provider_id].initials, considered[provider_id])
+            for provider_id in order[: cut + 1]
+            if provider_id not in winner_ids and considered[provider_id] is not None
+        )
+        self.trace.record(SlotDecision(day, block, slot, tuple(p.initials for p in winners), rejected, pinned is not None))
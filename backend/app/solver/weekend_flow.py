@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+from collections import deque
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Callable, Mapping, Sequence
+
+from app.models import Provider
+
+
+def weekend_of(day: date) -> date:
+    """Friday that opens the Fri-Sun weekend containing ``day``."""
+    return day - timedelta(days=(day.weekday() - 4) % 7)
+
+
+@dataclass
+class WeekendAllocation:
+    owners: dict[date, Provider]
+    counts: dict[int, int]
+    unfilled: list[date]
+
+
+class _Network:
+    """Residual view of source -> day -> (provider, weekend) -> provider -> sink.
+
+    Every arc has capacity one; the (provider, weekend) layer keeps a provider to
+    one day per weekend. Only provider -> sink arcs carry cost, and that cost is
+    convex per provider, so min-cost max-flow is reached by admitting sink units
+    cheapest first and augmenting one path per unit (a matroid greedy): a unit
+    that cannot be augmented stays infeasible for the rest of the run.
+    """
+
+    def __init__(self, days: Sequence[date], providers: Sequence[Provider], available: Callable[[Provider, date], bool]):
+        self.days = list(days)
+        self.providers = list(providers)
+        self.owner: list[int | None] = [None] * len(self.days)
+        self.held: dict[tuple[int, date], int] = {}
+        self.by_provider: list[list[int]] = [
+            [i for i, day in enumerate(self.days) if available(provider, day)] for provider in self.providers
+        ]
+        self.by_weekend: dict[date, list[int]] = {}
+        for i, day in enumerate(self.days):
+            self.by_weekend.setdefault(weekend_of(day), []).append(i)
+
+    def _assign(self, i: int, j: int) -> None:
+        previous = self.owner[i]
+        if previous is not None and self.held.get((previous, weekend_of(self.days[i]))) == i:
+            del self.held[(previous, weekend_of(self.days[i]))]
+        self.owner[i] = j
+        self.held[(j, weekend_of(self.days[i]))] = i
+
+    def augment(self, target: int) -> bool:
+        # Fast path: a free day the provider can take outright, earliest first.
+        for i in self.by_provider[target]:
+            if self.owner[i] is None and (target, weekend_of(self.days[i])) not in self.held:
+                self._assign(i, target)
+                return True
+        return self._augment_bfs(target)
+
+    def _augment_bfs(self, target: int) -> bool:
+        # Search backwards from the target for a chain of hand-overs ending on a free day:
+        # target takes day d0 from p1, p1 takes d1 from p2, ..., pk takes a free day.
+        # A search state is the day its provider is giving up (None for the target).
+        parent: dict[int, int | None] = {}
+        queue: deque[int | None] = deque([None])
+        while queue:
+            released = queue.popleft()
+            j = target if released is None else self.owner[released]
+            for i in self.by_provider[j]:
+                owner = self.owner[i]
+                if owner == j or i in parent:
+                    continue
+                kept = self.held.get((j, weekend_of(self.days[i])))
+                if kept is not None and kept != released:
+                    continue
+                parent[i] = released
+                if owner is None:
+                    chain = [i]
+                    while parent[chain[-1]] is not None:
+                        chain.append(parent[chain[-1]])
+                    # chain[k] moves to the current owner of chain[k + 1] (the target for the last).
+                    takers = [self.owner[d] for d in chain[1:]] + [target]
+                    for day_index, provider_index in zip(chain, takers):
+                        self._assign(day_index, provider_index)
+                    return True
+                queue.append(i)
+        return False
+
+
+def allocate_weekends(
+    days: Sequence[date],
+    providers: Sequence[Provider],
+    targets: Mapping[int, int],
+    available: Callable[[Provider, date], bool],
+    fixed: Mapping[date, Provider] | None = None,
+    prior: Mapping[int, int] | None = None,
+) -> WeekendAllocation:
+    fixed = fixed or {}
+    prior = prior or {}
+    open_days = [day for day in days if day not in fixed]
+    network = _Network(open_days, providers, available)
+    # ``prior``: weekend calls each provider already holds towards its target outside ``days``.
+    counts = {p.id: prior.get(p.id, 0) for p in providers}
+    positions = {p.id: j for j, p in enumerate(providers)}
+    for day, provider in fixed.items():
+        if provider.id in positions:
+            counts[provider.id] += 1
+            # A pinned day still uses the provider's slot for that weekend.
+            network.held[(positions[provider.id], weekend_of(day))] = -1
+
+    # Units ordered by cost: first fill every provider towards its target in
+    # proportion, then spread any overflow one call at a time.
+    units: list[tuple[int, float, int, int]] = []
+    horizon = len(network.by_weekend) + 1
+    for j, provider in enumerate(providers):
+        target = targets.get(provider.id, 0)
+        for k in range(counts[provider.id] + 1, prior.get(provider.id, 0) + horizon + 1):
+            if k <= target:
+                units.append((0, k / target, j, k))
+            else:
+                units.append((1, k - target, j, k))
+    units.sort()
+
+    remaining = len(open_days)
+    blocked: set[int] = set()
+    for _, _, j, _ in units:
+        if remaining == 0:
+            break
+        if j in blocked:
+            continue
+        if network.augment(j):
+            counts[providers[j].id] += 1
+            remaining -= 1
+        else:
+            blocked.add(j)
+
+    owners = dict(fixed)
+    unfilled = []
+    for i, day in enumerate(open_days):
+        if network.owner[i] is None:
+            unfilled.append(day)
+        else:
+            owners[day] = providers[network.owner[i]]
+    return WeekendAllocation(owners=owners, counts=counts, unfilled=unfilled)
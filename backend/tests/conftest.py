@@ -2,9 +2,20 @@ from __future__ import annotations
 
 import pytest
 
+from app.core.config import settings
 from app.db.session import InMemorySession
 
 
+@pytest.fixture(autouse=True, scope="session")
+def _state_dirs(tmp_path_factory):
+    """Keep the rules store and export cache the tests write to out of the user's directories."""
+    patch = pytest.MonkeyPatch()
+    patch.setattr(settings, "rules_store_path", tmp_path_factory.mktemp("state") / "rules_versions")
+    patch.setattr(settings, "export_cache_path", tmp_path_factory.mktemp("cache") / "exports")
+    yield
+    patch.undo()
+
+
 @pytest.fixture
 def session() -> InMemorySession:
-    return InMemorySession()
\ No newline at end of file
+    return InMemorySession()
@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+from datetime import date
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from app.api import deps, router, solve as solve_routes
+from app.api.deps import get_tenant
+from app.core.admission import AdmissionGate, Saturated, SingleFlight
+from app.models import Provider, VacationRequest
+from app.services.tenants import Tenant
+
+
+def test_gate_queues_then_turns_callers_away():
+    async def scenario():
+        gate = AdmissionGate(concurrency=1, queue=1)
+        await gate.acquire()
+        queued = asyncio.ensure_future(gate.acquire())
+        await asyncio.sleep(0)
+        with pytest.raises(Saturated) as rejected:
+            await gate.acquire()
+        assert gate.active == 1 and gate.waiting == 1 and not queued.done()
+        gate.release(held=3.0)
+        await queued
+        gate.release()
+        return rejected.value.retry_after, gate.active
+
+    rejected, active = asyncio.run(scenario())
+    assert rejected >= 1 and active == 0
+
+
+def test_identical_calls_share_one_execution():
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return len(calls)
+
+    async def scenario():
+        flight = SingleFlight()
+        results = await asyncio.gather(*(flight.run("key", work) for _ in range(5)), flight.run("other", work))
+        return results, flight.in_flight()
+
+    results, in_flight = asyncio.run(scenario())
+    assert len(calls) == 2 and in_flight == 0
+    assert len(set(results[:5])) == 1
+
+
+def _app(tenant: Tenant) -> FastAPI:
+    app = FastAPI()
+    app.include_router(router)
+    app.dependency_overrides[get_tenant] = lambda: tenant
+    return app
+
+
+def test_concurrent_identical_solves_share_a_run(monkeypatch):
+    tenant = Tenant("admission")
+    release = threading.Event()
+    solves = []
+    solve_schedule = solve_routes.solve_schedule
+
+    def slow_solve(*args, **kwargs):
+        solves.append(args[1:3])
+        release.wait(5)
+        return solve_schedule(*args, **kwargs)
+
+    monkeypatch.setattr(solve_routes, "solve_schedule", slow_solve)
+    body = {"start_date": "2026-03-02", "end_date": "2026-03-06"}
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=_app(tenant))
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            requests = [asyncio.ensure_future(client.post("/solve", json=body)) for _ in range(4)]
+            await asyncio.sleep(0.2)
+            release.set()
+            return await asyncio.gather(*requests)
+
+    responses = asyncio.run(scenario())
+    assert len(solves) == 1
+    assert len({r.json()["solve_run_id"] for r in responses}) == 1
+
+
+def test_solves_after_a_data_change_do_not_join_the_running_one(monkeypatch):
+    tenant = Tenant("admission-changed")
+    release = threading.Event()
+    solves = []
+    solve_schedule = solve_routes.solve_schedule
+
+    def slow_solve(*args, **kwargs):
+        solves.append(args[1:3])
+        release.wait(5)
+        return solve_schedule(*args, **kwargs)
+
+    monkeypatch.setattr(solve_routes, "solve_schedule", slow_solve)
+    body = {"start_date": "2026-03-02", "end_date": "2026-03-06"}
+    provider = tenant.session.all(Provider)[0]
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=_app(tenant))
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            first = asyncio.ensure_future(client.post("/solve", json=body))
+            await asyncio.sleep(0.2)
+            tenant.session.add(
+                VacationRequest(provider_id=provider.id, start_date=date(2026, 3, 4), end_date=date(2026, 3, 4), status="APPROVED")
+            )
+            tenant.session.commit()
+            second = asyncio.ensure_future(client.post("/solve", json=body))
+            await asyncio.sleep(0.2)
+            release.set()
+            return await asyncio.gather(first, second)
+
+    first, second = asyncio.run(scenario())
+    assert len(solves) == 2
+    assert first.json()["solve_run_id"] != second.json()["solve_run_id"]
+
+
+def test_saturated_class_answers_429_without_blocking_other_routes(monkeypatch):
+    tenant = Tenant("admission")
+    monkeypatch.setitem(deps.GATES, "solve", AdmissionGate(concurrency=0, queue=0))
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=_app(tenant))
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            rejected = await client.post("/solve", json={"start_date": "2026-03-02", "end_date": "2026-03-06"})
+            other = await client.get("/config/rules/history")
+            return rejected, other
+
+    rejected, other = asyncio.run(scenario())
+    assert rejected.status_code == 429 and int(rejected.headers["retry-after"]) >= 1
+    assert other.status_code == 200
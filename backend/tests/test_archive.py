@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+from dataclasses import replace
+from datetime import date
+
+import pytest
+
+from app.core.config import settings
+from app.services.tenants import Tenant
+from app.solver.archive import BLOCKS, CALL, SESSION, RunArchive
+from app.solver.engine import solve_schedule
+
+START = date(2026, 3, 2)
+END = date(2026, 3, 13)
+
+
+def _schedule(tenant: Tenant, end: date = END):
+    return solve_schedule(tenant.session, START, end)
+
+
+def test_superseded_and_withdrawn_runs_disappear_and_compact_away(tmp_path):
+    tenant = Tenant("archive")
+    archive = RunArchive(tmp_path / "runs")
+    first = archive.append(_schedule(tenant), label="first")
+    second = archive.append(_schedule(tenant))
+    archive.append(_schedule(tenant, date(2026, 3, 20)), run_id=first, label="extended")
+    third = archive.append(_schedule(tenant), supersedes=second)
+    archive.supersede(third)
+
+    with archive.open() as reader:
+        assert len(reader.segments) == 5
+        assert list(reader.runs) == [first]
+        assert reader.runs[first].meta["label"] == "extended"
+        assert reader.runs[first].end >= date(2026, 3, 20).toordinal()
+
+    reclaimed = archive.compact()
+    assert reclaimed > 0
+    reopened = RunArchive(archive.path)
+    assert reopened.append(_schedule(tenant)) == third + 1
+    with reopened.open() as reader:
+        assert [s.run_id for s in reader.segments] == [first, third, third + 1]
+        assert list(reader.runs) == [first, third + 1]
+
+
+def test_torn_tail_is_ignored_and_overwritten(tmp_path):
+    tenant = Tenant("archive")
+    archive = RunArchive(tmp_path / "runs")
+    archive.append(_schedule(tenant))
+    with open(archive.path, "ab") as fh:
+        fh.write(b"SEG\0partial")
+    reopened = RunArchive(archive.path)
+    reopened.append(_schedule(tenant))
+    with reopened.open() as reader:
+        assert list(reader.runs) == [1, 2]
+
+
+def test_records_are_views_over_the_file(tmp_path):
+    np = pytest.importorskip("numpy")
+    tenant = Tenant("archive")
+    schedule = _schedule(tenant)
+    archive = RunArchive(tmp_path / "runs")
+    run_id = archive.append(schedule)
+    wednesday = date(2026, 3, 4)
+
+    with archive.open() as reader:
+        segment = reader.runs[run_id]
+        records = reader.records(segment)
+        assert len(records) == len(schedule.assignments) + len(schedule.call_assignments)
+        assert not records.flags.writeable
+        day = reader.records(segment, wednesday, wednesday)
+        assert set(day["day"]) == {wednesday.toordinal()}
+
+        codes = segment.codes
+        expected = sorted(
+            (codes.index(a.site_code), BLOCKS.index(a.block), tuple(p.id for p in a.providers))
+            for a in schedule.assignments
+            if a.date == wednesday
+        )
+        sessions = day[day["kind"] == SESSION]
+        stored = sorted(
+            (int(r["code"]), int(r["block"]), tuple(int(i) for i in r["providers"] if i >= 0)) for r in sessions
+        )
+        assert stored == expected
+        calls = records[records["kind"] == CALL]
+        assert len(calls) == len(schedule.call_assignments)
+        scanned = {s.run_id: window for s, window in reader.scan(date(2026, 3, 9), date(2026, 3, 9))}
+        assert np.all(scanned[run_id]["day"] == date(2026, 3, 9).toordinal())
+        del records, day, sessions, calls, scanned
+
+
+def test_tenant_archive_keeps_one_live_copy_per_run(tmp_path):
+    tenant = Tenant("archive", tenant_settings=replace(settings, archive_path=tmp_path))
+    run = tenant.record_run(START, END, _schedule(tenant))
+    archive_id = tenant.archive_run(run.id)
+
+    with tenant.archive.open() as reader:
+        assert list(reader.runs) == [archive_id]
+        assert reader.runs[archive_id].meta["label"] == f"{START}__{END}"
+        assert len(reader.segments) == 2
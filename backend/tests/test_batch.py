@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+import json
+from datetime import date
+
+from app.config.registry import RulesRegistry
+from app.core.config import settings
+from app.services.batch import BatchJob, fair_order, run_batch
+from app.services.tenants import Tenant, TenantRegistry
+from app.solver.engine import solve_schedule
+
+
+def _tenants(tmp_path) -> TenantRegistry:
+    north = RulesRegistry(settings.rules_config_path, tmp_path / "north")
+    south = RulesRegistry(settings.rules_config_path, tmp_path / "south")
+    raw = json.loads(settings.rules_config_path.read_text())
+    raw["rotations"]["rmc_md"] = ["GHM"]
+    south.publish(raw)
+    return TenantRegistry([Tenant("north", rules=north), Tenant("south", rules=south)])
+
+
+def test_fair_order_interleaves_tenants():
+    jobs = [BatchJob("a", date(2026, 1, 5), date(2026, 1, 9))] * 3 + [BatchJob("b", date(2026, 1, 5), date(2026, 1, 9))]
+    assert [job.tenant_id for _, job in fair_order(jobs)] == ["a", "b", "a", "a"]
+
+
+def test_batch_solves_per_tenant_in_process_pool(tmp_path):
+    tenants = _tenants(tmp_path)
+    windows = [(date(2026, 1, 5), date(2026, 1, 30)), (date(2026, 2, 2), date(2026, 2, 27))]
+    jobs = [BatchJob(tenant_id, start, end) for start, end in windows for tenant_id in ("north", "south")]
+
+    runs = run_batch(jobs, tenants, max_workers=2)
+
+    assert sorted(runs) == ["north", "south"]
+    for tenant_id, tenant_runs in runs.items():
+        tenant = tenants.get(tenant_id)
+        assert [(run.start_date, run.end_date) for run in tenant_runs] == windows
+        for run in tenant_runs:
+            assert run.rules_version == tenant.rules.active.version
+            assert tenant.session.get(type(run), run.id) is run
+            pooled = tenant.schedule_for(run.id)
+            inline = solve_schedule(tenant.session, run.start_date, run.end_date, tenant.rules.active)
+            assert [(a.date, a.site_code, a.block, [p.initials for p in a.providers]) for a in pooled.assignments] == [
+                (a.date, a.site_code, a.block, [p.initials for p in a.providers]) for a in inline.assignments
+            ]
+
+    south = tenants.get("south")
+    south_rmc = {
+        a.providers[0].initials
+        for run in runs["south"]
+        for a in south.schedule_for(run.id).assignments
+        if a.site_code == "RMC"
+    }
+    assert south_rmc == {"GHM"}
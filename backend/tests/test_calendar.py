@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+from datetime import date, timedelta
+
+from app.core.calendar import HolidayRule, calendar_for, federal_holidays, holidays_between
+from app.models import Holiday
+
+
+def test_federal_rules_reproduce_2026_holidays():
+    assert federal_holidays(2026) == [
+        (date(2026, 1, 1), "New Year's Day"),
+        (date(2026, 1, 19), "MLK Day"),
+        (date(2026, 2, 16), "Presidents Day"),
+        (date(2026, 5, 25), "Memorial Day"),
+        (date(2026, 7, 3), "Independence Day Observed"),
+        (date(2026, 9, 7), "Labor Day"),
+        (date(2026, 11, 26), "Thanksgiving"),
+        (date(2026, 12, 25), "Christmas"),
+    ]
+
+
+def test_observed_shifts_cross_year_boundaries():
+    # New Year's Day 2022 fell on a Saturday and was observed on Friday 2021-12-31.
+    assert (date(2021, 12, 31), "New Year's Day Observed") in federal_holidays(2021)
+    assert all(day.year == 2022 for day, _ in federal_holidays(2022))
+    assert holidays_between(date(2027, 7, 1), date(2027, 7, 31)) == [(date(2027, 7, 5), "Independence Day Observed")]
+    assert HolidayRule("Last Friday", 1, weekday=4, nth=-1).actual(2026) == date(2026, 1, 30)
+
+
+def test_table_slices_match_date_arithmetic():
+    holidays = [Holiday(date=date(2027, 5, 31), name="Memorial Day"), Holiday(date=date(2027, 6, 1), extend_weekend=False)]
+    table = calendar_for(date(2026, 3, 4), date(2027, 8, 20), holidays)
+    assert calendar_for(date(2026, 1, 5), date(2027, 12, 31), holidays) is table
+
+    start, end = date(2026, 12, 30), date(2027, 1, 12)
+    expected = [start + timedelta(days=i) for i in range((end - start).days + 1)]
+    assert list(table.between(start, end)) == expected
+    assert list(table.weekdays_between(start, end)) == [d for d in expected if d.weekday() < 5]
+    assert list(table.mondays_between(start, end)) == [date(2027, 1, 4), date(2027, 1, 11)]
+    assert table.first_monday(date(2027, 1, 1)) == date(2027, 1, 4)
+    assert table.week_start(date(2027, 1, 1)) == date(2026, 12, 28)
+    assert table.week(date(2026, 12, 28))[4:] == (date(2027, 1, 1), date(2027, 1, 2), date(2027, 1, 3))
+
+    memorial, after = table.index(date(2027, 5, 31)), table.index(date(2027, 6, 1))
+    assert table.holiday[memorial] and table.extend_weekend[memorial] and not table.workday[memorial]
+    assert table.holiday[after] and not table.extend_weekend[after]
+    assert table.iso_weeks[memorial] == 22 and table.weekdays[memorial] == 0
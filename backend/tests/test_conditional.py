@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+from datetime import date
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api import deps, router, solve as solve_routes
+from app.api.deps import get_tenant
+from app.models import Provider, VacationRequest
+from app.services.tenants import Tenant
+from app.solver import export_cache
+from app.solver.engine import solve_schedule
+from app.solver.export_cache import ExportCache
+
+
+START = date(2026, 3, 2)
+END = date(2026, 3, 13)
+
+
+def _client(tenant: Tenant) -> TestClient:
+    app = FastAPI()
+    app.include_router(router)
+    app.dependency_overrides[get_tenant] = lambda: tenant
+    return TestClient(app)
+
+
+def test_export_is_revalidated_without_rebuilding(monkeypatch, tmp_path):
+    tenant = Tenant("conditional")
+    run = tenant.record_run(START, END, solve_schedule(tenant.session, START, END))
+    client = _client(tenant)
+    calls = []
+    cache = ExportCache(tmp_path, 10 * 1024 * 1024)
+    render_week = export_cache.render_week
+    monkeypatch.setattr(solve_routes, "get_export_cache", lambda: cache)
+    monkeypatch.setattr(export_cache, "render_week", lambda *a, **kw: calls.append(a) or render_week(*a, **kw))
+
+    url = f"/solve/{run.id}/export/{START}"
+    first = client.get(url)
+    assert first.status_code == 200
+    assert first.headers["cache-control"] == "private, no-cache"
+    assert int(first.headers["content-length"]) == len(first.content)
+    etag = first.headers["etag"]
+
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+    again = client.get(url)
+    assert again.headers["etag"] == etag and again.content == first.content
+    assert len(calls) == 1
+    assert client.get(f"/solve/{run.id}/export/2026-03-09", headers={"If-None-Match": etag}).status_code == 200
+
+
+def test_data_changes_invalidate_the_etag():
+    tenant = Tenant("conditional")
+    client = _client(tenant)
+    provider = next(p for p in tenant.session.all(Provider) if p.initials == "JOO")
+    url = f"/vacations/allowances/{provider.id}/2026"
+
+    etag = client.get(url).headers["etag"]
+    assert client.get(url, headers={"If-None-Match": f'"other", {etag}'}).status_code == 304
+
+    tenant.session.add(VacationRequest(provider_id=provider.id, start_date=START, end_date=START, status="PENDING"))
+    tenant.session.commit()
+    changed = client.get(url, headers={"If-None-Match": etag})
+    assert changed.status_code == 200 and changed.headers["etag"] != etag
+
+
+def test_run_side_lists_revalidate_and_restarts_change_every_etag(monkeypatch):
+    tenant = Tenant("conditional")
+    run = tenant.record_run(START, END, solve_schedule(tenant.session, START, END))
+    client = _client(tenant)
+    swaps, stale = f"/solve/{run.id}/swaps", f"/solve/{run.id}/stale"
+
+    etags = {url: client.get(url).headers["etag"] for url in (swaps, stale)}
+    for url, etag in etags.items():
+        assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+
+    calls = [c for c in tenant.schedule_for(run.id).call_assignments if c.call_type == "interventional_weekday"]
+    for first, second in zip(calls, calls[1:]):
+        giver, taker = first.providers[0], second.providers[0]
+        payload = {"giver": giver.initials, "taker": taker.initials, "date": str(first.date), "call_type": first.call_type}
+        payload.update(return_date=str(second.date), return_call_type=second.call_type)
+        if client.post(swaps, json=payload).status_code == 200:
+            break
+    assert client.get(swaps, headers={"If-None-Match": etags[swaps]}).status_code == 200
+
+    tenant.session.add(VacationRequest(provider_id=giver.id, start_date=END, end_date=END, status="APPROVED"))
+    tenant.session.commit()
+    assert client.get(stale, headers={"If-None-Match": etags[stale]}).status_code == 200
+
+    # Same data after a restart: run revisions and data versions start over, the boot id does not repeat.
+    etag = client.get(stale).headers["etag"]
+    monkeypatch.setattr(deps, "BOOT_ID", "next-boot")
+    assert client.get(stale, headers={"If-None-Match": etag}).status_code == 200
@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import json
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+
+from app.config.registry import compile_rules
+from app.core.config import settings
+from app.models import Provider, VacationRequest
+from app.services.feasibility import FeasibilityIndex
+from app.services.seed import seed_all
+from app.solver import daily
+from app.solver.engine import solve_schedule
+
+
+START = date(2026, 3, 2)
+END = date(2026, 3, 27)
+
+
+def _matching_rules(**allocation):
+    raw = json.loads(settings.rules_config_path.read_text())
+    raw["allocation"] = {"daily": "matching", **allocation}
+    return compile_rules(raw)
+
+
+def _rows(schedule):
+    return [(a.date, a.block, a.site_code, [p.initials for p in a.providers]) for a in schedule.assignments]
+
+
+def test_every_block_is_filled_to_its_maximum_matching(session):
+    seed_all(session)
+    mds = {p.initials: p for p in session.all(Provider) if p.type == "MD"}
+    for initials in ("JOO", "LMS", "FRG"):
+        session.add(VacationRequest(provider_id=mds[initials].id, start_date=START, end_date=date(2026, 3, 13), status="APPROVED"))
+    session.commit()
+    rules = _matching_rules()
+
+    schedule = solve_schedule(session, START, END, rules)
+
+    index = FeasibilityIndex(session, rules, START, END)
+    for day, block in index.slack:
+        seated = [
+            p.id
+            for a in schedule.assignments
+            if a.date == day and a.block == block and not a.site_code.startswith("ICD_")
+            for p in a.providers
+        ]
+        assert len(seated) == len(set(seated)), (day, block)
+        assert len(seated) == len(index.matching(day, block)), (day, block)
+
+
+def test_days_are_independent_and_parallel_plans_match(session, monkeypatch):
+    seed_all(session)
+    end = date(2026, 6, 26)
+    sequential = solve_schedule(session, START, end, _matching_rules())
+    # The worker count is capped at the CPU count; pretend there are enough so a one-CPU runner still uses the pool.
+    pools = []
+    monkeypatch.setattr(daily.os, "cpu_count", lambda: 4)
+    monkeypatch.setattr(daily, "ProcessPoolExecutor", lambda **kw: pools.append(kw) or ProcessPoolExecutor(**kw))
+    parallel = solve_schedule(session, START, end, _matching_rules(daily_workers=2))
+    later = solve_schedule(session, date(2026, 5, 4), end, _matching_rules())
+
+    assert [kw["max_workers"] for kw in pools] == [2]
+    assert _rows(parallel) == _rows(sequential)
+    assert _rows(later) == [row for row in _rows(sequential) if row[0] >= date(2026, 5, 4)]
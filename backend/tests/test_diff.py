@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import io
+import re
+from datetime import date, timedelta
+from zipfile import ZipFile
+
+from app.models import Provider, VacationRequest
+from app.services.seed import seed_all
+from app.solver import export_week
+from app.solver.diff import changes_in_week, diff_schedules, week_of
+from app.solver.engine import solve_schedule
+
+
+START = date(2026, 1, 5)
+END = date(2026, 12, 31)
+
+
+def test_identical_schedules_have_no_changes(session):
+    seed_all(session)
+    base = solve_schedule(session, START, END)
+    other = solve_schedule(session, START, END)
+    result = diff_schedules(base, other)
+    assert result.changes == [] and result.changed_weeks == []
+    assert result.weeks_compared == len({week_of(a.date) for a in base.assignments} | {week_of(c.date) for c in base.call_assignments})
+
+
+def test_diff_reports_only_changed_weeks(session):
+    seed_all(session)
+    base = solve_schedule(session, START, END)
+    day = date(2026, 6, 9)
+    rmc = next(a for a in base.assignments if a.date == day and a.site_code == "RMC")
+    md = rmc.providers[0]
+    session.add(VacationRequest(provider_id=md.id, start_date=day, end_date=day, status="APPROVED"))
+    other = solve_schedule(session, START, END)
+
+    result = diff_schedules(base, other)
+    assert result.changes
+    assert min(result.changed_weeks) == week_of(day)
+    assert all(change.date >= day for change in result.changes)
+    moved = next(c for c in result.changes if c.date == day and c.slot == "RMC" and c.block == rmc.block)
+    assert md.initials in moved.before and md.initials not in moved.after
+
+
+def test_export_highlights_changed_cells(session):
+    seed_all(session)
+    base = solve_schedule(session, START, START + timedelta(days=4))
+    ram = next(p for p in session.all(Provider) if p.initials == "RAM" and p.type == "MD")
+    session.add(VacationRequest(provider_id=ram.id, start_date=START, end_date=START, status="APPROVED"))
+    other = solve_schedule(session, START, START + timedelta(days=4))
+
+    changes = changes_in_week(diff_schedules(base, other).changes, START)
+    assert changes
+    plain = export_week(other, START)
+    highlighted = export_week(other, START, highlight=changes)
+    assert export_week(other, START, highlight=[]) == plain
+
+    with ZipFile(io.BytesIO(plain)) as zf:
+        plain_count = int(re.search(rb'<cellXfs count="(\d+)"', zf.read("xl/styles.xml")).group(1))
+    with ZipFile(io.BytesIO(highlighted)) as zf:
+        styles = zf.read("xl/styles.xml")
+        sheet = zf.read("xl/worksheets/sheet1.xml").decode()
+    assert int(re.search(rb'<cellXfs count="(\d+)"', styles).group(1)) > plain_count
+    assert b'rgb="FFFFFF00"' in styles
+    assert re.search(rf'r="B12"[^>]*s="{plain_count}', sheet) or re.search(rf's="{plain_count}[^"]*"[^>]*r="B12"', sheet)
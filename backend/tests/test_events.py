@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+from datetime import date
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api import router
+from app.api.deps import get_tenant
+from app.core.events import ChangeEvent
+from app.db.session import InMemorySession
+from app.models import Provider, VacationRequest
+from app.services.tenants import Tenant
+from app.solver.engine import solve_schedule
+
+START = date(2026, 3, 2)
+END = date(2026, 3, 27)
+
+
+def _client(tenant: Tenant) -> TestClient:
+    app = FastAPI()
+    app.include_router(router)
+    app.dependency_overrides[get_tenant] = lambda: tenant
+    return TestClient(app)
+
+
+def test_session_publishes_changes_on_commit():
+    session = InMemorySession()
+    seen: list[ChangeEvent] = []
+    session.events.subscribe(seen.append, ("VacationRequest",))
+
+    vacation = VacationRequest(provider_id=3, start_date=date(2026, 3, 10), end_date=date(2026, 3, 11))
+    session.add(vacation)
+    session.add(Provider(initials="NEW"))
+    assert seen == []
+    session.commit()
+    assert [(e.action, e.start, e.end, e.provider_ids) for e in seen] == [
+        ("added", date(2026, 3, 10), date(2026, 3, 11), frozenset({3}))
+    ]
+
+    # Moving a request affects both the old and the new dates.
+    vacation.start_date = vacation.end_date = date(2026, 4, 1)
+    session.add(vacation)
+    session.delete(vacation)
+    session.commit()
+    assert [(e.action, e.start, e.end) for e in seen[1:]] == [
+        ("updated", date(2026, 3, 10), date(2026, 4, 1)),
+        ("deleted", date(2026, 4, 1), date(2026, 4, 1)),
+    ]
+
+
+def test_approved_vacation_marks_weeks_stale_until_repaired():
+    tenant = Tenant("events")
+    client = _client(tenant)
+    run = tenant.record_run(START, END, solve_schedule(tenant.session, START, END))
+    provider = next(p for p in tenant.session.all(Provider) if p.initials == "JOO")
+
+    created = client.post(
+        "/vacations/requests",
+        json={"provider_id": provider.id, "start_date": "2026-03-12", "end_date": "2026-03-17", "block": "FULLDAY"},
+    ).json()
+    assert client.patch(f"/vacations/requests/{created['id']}", json={"status": "APPROVED"}).status_code == 200
+    stale = client.get(f"/solve/{run.id}/stale").json()
+    assert stale == [
+        {"week_start": "2026-03-09", "providers": ["JOO"]},
+        {"week_start": "2026-03-16", "providers": ["JOO"]},
+    ]
+
+    tenant.run_changed(run.id, date(2026, 3, 9), date(2026, 3, 13))
+    assert [w["week_start"] for w in client.get(f"/solve/{run.id}/stale").json()] == ["2026-03-16"]
+
+    # A rules change is not tied to dates or providers: every week of the run is stale.
+    client.post("/config/rules/" + tenant.rules.active.version + "/activate")
+    weeks = client.get(f"/solve/{run.id}/stale").json()
+    assert len(weeks) == 4 and all(w["providers"] == [] for w in weeks)
+
+
+def test_allowance_etag_ignores_other_providers():
+    tenant = Tenant("events-etag")
+    client = _client(tenant)
+    joo, other = [p for p in tenant.session.all(Provider) if p.initials in {"JOO", "DPR"}]
+    url = f"/vacations/allowances/{joo.id}/2026"
+    etag = client.get(url).headers["etag"]
+
+    tenant.session.add(VacationRequest(provider_id=other.id, start_date=START, end_date=START, status="PENDING"))
+    tenant.session.commit()
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import threading
+from datetime import date, timedelta
+
+from app.models import Provider, VacationRequest
+from app.services.seed import seed_all
+from app.solver import export_week
+from app.solver.engine import solve_schedule
+from app.solver.export_cache import ExportCache
+
+
+START = date(2026, 1, 5)
+END = date(2026, 2, 27)
+
+
+def test_cached_workbooks_match_fresh_exports(session, tmp_path):
+    seed_all(session)
+    schedule = solve_schedule(session, START, END)
+    cache = ExportCache(tmp_path, 10 * 1024 * 1024)
+
+    path = cache.export(schedule, START)
+    assert path.read_bytes() == export_week(schedule, START)
+    assert cache.export(schedule, START) == path
+    assert [p.name for p in tmp_path.iterdir()] == [path.name]
+
+
+def test_unchanged_weeks_of_a_new_run_share_a_file(session, tmp_path):
+    seed_all(session)
+    first = solve_schedule(session, START, END)
+    provider = next(p for p in session.all(Provider) if p.initials == "DJT")
+    session.add(VacationRequest(provider_id=provider.id, start_date=date(2026, 2, 23), end_date=date(2026, 2, 27), status="APPROVED"))
+    session.commit()
+    second = solve_schedule(session, START, END)
+    cache = ExportCache(tmp_path, 10 * 1024 * 1024)
+
+    assert cache.export(first, START) == cache.export(second, START)
+    last_week = date(2026, 2, 23)
+    assert cache.export(first, last_week) != cache.export(second, last_week)
+
+
+def test_least_recently_served_files_are_evicted(session, tmp_path):
+    seed_all(session)
+    schedule = solve_schedule(session, START, END)
+    weeks = [START + timedelta(weeks=n) for n in range(4)]
+    size = len(export_week(schedule, START))
+    cache = ExportCache(tmp_path, int(size * 2.5))
+
+    first, second = cache.export(schedule, weeks[0]), cache.export(schedule, weeks[1])
+    cache.export(schedule, weeks[0])
+    third = cache.export(schedule, weeks[2])
+    assert first.exists() and third.exists() and not second.exists()
+
+    # A restarted cache picks up what is on disk and keeps evicting in the same order.
+    reopened = ExportCache(tmp_path, int(size * 2.5))
+    reopened.export(schedule, weeks[3])
+    assert sorted(p.name for p in tmp_path.iterdir()) == sorted([third.name, reopened.export(schedule, weeks[3]).name])
+
+
+def test_opened_workbooks_survive_eviction(session, tmp_path):
+    seed_all(session)
+    schedule = solve_schedule(session, START, END)
+    expected = export_week(schedule, START)
+    cache = ExportCache(tmp_path, len(expected))
+    key = cache.export(schedule, START).stem
+
+    touched, go = threading.Event(), threading.Event()
+    touch = cache._touch
+
+    def slow_touch(key):
+        path = touch(key)
+        touched.set()
+        go.wait(5)
+        return path
+
+    cache._touch = slow_touch
+    handles = []
+    reader = threading.Thread(target=lambda: handles.append(cache.open(key)))
+    reader.start()
+    touched.wait(5)
+    # This put evicts the file being opened, but only once the open has let go of the lock.
+    writer = threading.Thread(target=cache.put, args=("other", b"x" * 10))
+    writer.start()
+    writer.join(0.2)
+    assert writer.is_alive()
+    go.set()
+    reader.join(5)
+    writer.join(5)
+
+    assert [p.name for p in tmp_path.iterdir()] == ["other.xlsx"]
+    (handle,) = handles
+    with handle:
+        assert handle.read() == expected
+    cache._touch = touch
+    assert cache.open(key) is None
+    with cache.open_week(schedule, START) as handle:
+        assert handle.read() == expected
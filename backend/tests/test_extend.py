@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import json
+from collections import Counter
+from datetime import date
+
+import pytest
+
+from app.config.registry import compile_rules
+from app.core.config import settings
+from app.services.seed import seed_all
+from app.solver.engine import ExtendError, ScheduleSolver, extend_schedule, solve_schedule
+
+
+START = date(2026, 1, 5)
+END = date(2026, 6, 26)
+
+
+def _rows(schedule):
+    assignments = [(a.date, a.block, a.site_code, [p.initials for p in a.providers]) for a in schedule.assignments]
+    calls = sorted((c.date, c.call_type, c.label) for c in schedule.call_assignments)
+    return assignments, calls, dict(schedule.icd_sites), dict(schedule.vacations)
+
+
+def test_extending_matches_solving_the_whole_window(session):
+    seed_all(session)
+    full = solve_schedule(session, START, END)
+    # Runs ending on a Friday, mid-week and on a Sunday.
+    for end in (date(2026, 3, 27), date(2026, 3, 25), date(2026, 3, 29)):
+        published = solve_schedule(session, START, end)
+        kept = list(published.assignments)
+        revision = published.revision
+
+        added = extend_schedule(session, published, START, end, END)
+
+        assert _rows(published) == _rows(full), end
+        assert published.assignments[: len(kept)] == kept
+        assert min(a.date for a in added.assignments) > end
+        assert published.revision > revision
+
+
+def test_published_weeks_are_not_re_solved(session, monkeypatch):
+    seed_all(session)
+    end = date(2026, 5, 29)
+    published = solve_schedule(session, START, end)
+    solved = []
+    solve_workday = ScheduleSolver._solve_workday
+
+    def record(self, day, cycles):
+        solved.append(day)
+        return solve_workday(self, day, cycles)
+
+    monkeypatch.setattr(ScheduleSolver, "_solve_workday", record)
+    extend_schedule(session, published, START, end, END)
+
+    # Only the last published workday is replayed to pick the rotations back up.
+    assert min(solved) == end
+
+
+def _flow_rules():
+    raw = json.loads(settings.rules_config_path.read_text())
+    raw["allocation"] = {"weekend_call": "flow"}
+    return compile_rules(raw)
+
+
+def test_flow_weekends_are_planned_over_the_new_weeks_only(session, monkeypatch):
+    seed_all(session)
+    rules = _flow_rules()
+    end = date(2026, 3, 29)
+    published = solve_schedule(session, START, end, rules)
+    kept = list(published.call_assignments)
+    planned = []
+    plan_weekends = ScheduleSolver._plan_weekends
+
+    def record(self, first_monday, last, pool, stored):
+        planned.append(first_monday)
+        return plan_weekends(self, first_monday, last, pool, stored)
+
+    monkeypatch.setattr(ScheduleSolver, "_plan_weekends", record)
+    added = extend_schedule(session, published, START, end, END, rules)
+
+    assert planned == [date(2026, 3, 23)]
+    assert published.call_assignments[: len(kept)] == kept
+    weekends = [c.date for c in added.call_assignments if c.call_type == "weekend_noninv"]
+    assert min(weekends) > end and len(weekends) == 3 * 13
+
+
+def test_runs_without_rotation_state_are_not_re_solved(session):
+    seed_all(session)
+    end = date(2026, 3, 27)
+    published = solve_schedule(session, START, end)
+    published.weekday_states.clear()
+    with pytest.raises(ExtendError):
+        extend_schedule(session, published, START, end, END)
+
+    # A weekend-only run never moved the rotations, so extending it starts them fresh.
+    saturday = date(2026, 1, 3)
+    short = solve_schedule(session, saturday, date(2026, 1, 4))
+    extend_schedule(session, short, saturday, date(2026, 1, 4), END)
+    assert _rows(short) == _rows(solve_schedule(session, saturday, END))
+
+
+def test_flow_extension_counts_weekends_already_published(session):
+    seed_all(session)
+    rules = _flow_rules()
+    end, year_end = date(2026, 3, 29), date(2026, 12, 27)
+    full = solve_schedule(session, START, year_end, rules)
+    published = solve_schedule(session, START, end, rules)
+    extend_schedule(session, published, START, end, year_end, rules)
+
+    def weekends(schedule):
+        return Counter(c.providers[0].id for c in schedule.call_assignments if c.call_type == "weekend_noninv")
+
+    extended, solved = weekends(published), weekends(full)
+    # Ties may fall to different providers, but the yearly spread is the one a full solve reaches.
+    assert sorted(extended.values()) == sorted(solved.values())
+    assert all(abs(extended[i] - solved[i]) <= 1 for i in extended | solved)
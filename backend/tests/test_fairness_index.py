@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+from collections import Counter
+from datetime import date, timedelta
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api import router
+from app.api.deps import get_tenant
+from app.services.fairness import FAIRNESS_METRICS, FairnessIndex, _metric_hits
+from app.services.seed import seed_all
+from app.services.tenants import Tenant
+from app.solver.engine import extend_schedule, solve_schedule
+
+START = date(2026, 1, 5)
+END = date(2026, 3, 27)
+
+
+def _brute_force(schedule, metric, start, end):
+    return Counter(i for m, day, i in _metric_hits(schedule) if m == metric and start <= day <= end)
+
+
+def test_windows_match_counting_directly(session):
+    seed_all(session)
+    schedule = solve_schedule(session, START, END)
+    index = FairnessIndex(schedule)
+
+    windows = [(START, END), (date(2026, 2, 7), date(2026, 2, 8)), (date(2025, 12, 1), date(2026, 1, 31)), (END, END)]
+    for metric in FAIRNESS_METRICS:
+        for start, end in windows:
+            values = index.window(metric, start, end)
+            assert {k: v for k, v in values.items() if v} == _brute_force(schedule, metric, start, end), (metric, start)
+    assert sum(index.window("weekend_noninv").values()) == sum(
+        1 for c in schedule.call_assignments if c.call_type == "weekend_noninv"
+    )
+
+
+def test_update_after_extend_matches_a_fresh_index(session):
+    seed_all(session)
+    schedule = solve_schedule(session, START, END)
+    index = FairnessIndex(schedule)
+    extend_schedule(session, schedule, START, END, date(2026, 5, 1))
+
+    index.update(schedule, END + timedelta(days=1))
+    fresh = FairnessIndex(schedule)
+    assert (index.origin, index.days) == (fresh.origin, fresh.days)
+    for metric in FAIRNESS_METRICS:
+        assert index.window(metric, date(2026, 3, 1), date(2026, 4, 30)) == fresh.window(metric, date(2026, 3, 1), date(2026, 4, 30))
+
+
+def test_endpoint_answers_windows_from_the_stored_run():
+    tenant = Tenant("fairness")
+    app = FastAPI()
+    app.include_router(router)
+    app.dependency_overrides[get_tenant] = lambda: tenant
+    client = TestClient(app)
+    run = tenant.record_run(START, END, solve_schedule(tenant.session, START, END))
+
+    params = {"start": "2026-02-01", "end": "2026-02-28", "metric": "hospital_sessions"}
+    (summary,) = client.get("/analytics/fairness", params=params).json()
+    expected = _brute_force(tenant.schedule_for(run.id), "hospital_sessions", date(2026, 2, 1), date(2026, 2, 28))
+    assert {k: v for k, v in summary["values"].items() if v} == expected
+
+    extended = client.post(f"/solve/{run.id}/extend", json={"end_date": "2026-04-24"})
+    assert extended.status_code == 200
+    april = client.get("/analytics/fairness", params={"start": "2026-04-01", "metric": "weekend_noninv"}).json()
+    assert sum(april[0]["values"].values()) > 0
+    assert tenant.fairness_index(run.id) is tenant.fairness_index(run.id)
+
+    stateless = solve_schedule(tenant.session, START, END)
+    stateless.call_states.clear()
+    revision = stateless.revision
+    other = tenant.record_run(START, END, stateless)
+    assert client.post(f"/solve/{other.id}/extend", json={"end_date": "2026-04-24"}).status_code == 409
+    assert stateless.revision == revision
+
+    assert len(client.get("/analytics/fairness").json()) == len(FAIRNESS_METRICS)
+    assert client.get("/analytics/fairness", params={"metric": "nope"}).status_code == 422
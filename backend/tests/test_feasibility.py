@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import itertools
+import random
+from datetime import date, timedelta
+
+from app.models import CoverageRequirement, Holiday, Provider, VacationRequest
+from app.services.feasibility import Absence, FeasibilityIndex, check_absences
+from app.services.seed import seed_all
+from app.services.tenants import Tenant
+from app.solver.matching import hopcroft_karp
+
+
+WEEK = (date(2026, 3, 2), date(2026, 3, 6))
+
+
+def _brute_force_size(graph: dict[int, list[int]]) -> int:
+    lefts = list(graph)
+    for size in range(len(lefts), 0, -1):
+        for subset in itertools.combinations(lefts, size):
+            if any(len(set(rights)) == size for rights in itertools.product(*(graph[l] for l in subset))):
+                return size
+    return 0
+
+
+def test_hopcroft_karp_is_maximum_and_extends_a_seed():
+    rng = random.Random(3)
+    for _ in range(200):
+        graph = {left: rng.sample(range(6), rng.randint(0, 3)) for left in range(rng.randint(1, 6))}
+        matching = hopcroft_karp(graph)
+        assert len(set(matching.values())) == len(matching)
+        assert all(right in graph[left] for left, right in matching.items())
+        assert len(matching) == _brute_force_size(graph)
+        seed = dict(list(matching.items())[: len(matching) // 2])
+        assert len(hopcroft_karp(graph, seed)) == len(matching)
+
+
+def test_absences_that_strand_a_site_are_reported(session):
+    seed_all(session)
+    providers = {p.initials: p for p in session.all(Provider) if p.type == "APN"}
+    index = FeasibilityIndex(session, None, *WEEK)
+    wth = next(s for s in index.slack[(date(2026, 3, 4), "AM")] if s.site_code == "WTH")
+    assert wth.apn == 2
+
+    # Two of the four WTH-qualified APNs can be away; a third leaves one seat unfillable every block.
+    ok = index.check([Absence(providers[i].id, *WEEK) for i in ("AG", "ACS")])
+    assert ok.feasible and ok.checked == 10 and ok.min_slack == 0
+    result = index.check([Absence(providers[i].id, *WEEK) for i in ("AG", "ACS", "MB")])
+    assert not result.feasible
+    assert {(g.site_code, g.missing_md, g.missing_apn) for g in result.gaps} == {("WTH", 0, 1)}
+    assert len(result.gaps) == 10
+
+
+def test_already_approved_absences_are_not_counted_twice(session):
+    seed_all(session)
+    providers = {p.initials: p for p in session.all(Provider) if p.type == "APN"}
+    session.add(VacationRequest(provider_id=providers["AG"].id, start_date=WEEK[0], end_date=WEEK[1], status="APPROVED"))
+    session.add(VacationRequest(provider_id=providers["ACS"].id, start_date=WEEK[0], end_date=WEEK[1], status="APPROVED"))
+    session.commit()
+
+    assert check_absences(session, None, [Absence(providers["AG"].id, *WEEK)]).feasible
+    assert not check_absences(session, None, [Absence(providers["AD"].id, date(2026, 3, 4), date(2026, 3, 4))]).feasible
+
+
+def test_tenant_index_drops_only_the_weeks_a_change_touches():
+    tenant = Tenant("feasibility")
+    session, rules = tenant.session, tenant.rules.active
+    index = tenant.feasibility_index(rules)
+    assert tenant.feasibility_index(rules) is index
+    providers = {p.initials: p for p in session.all(Provider) if p.type == "APN"}
+    first, second = date(2026, 3, 2), date(2026, 3, 9)
+    absences = [Absence(providers[i].id, first, second + timedelta(days=4)) for i in ("AG", "MB")]
+
+    def week(monday):
+        return {key: slack for key, slack in index.slack.items() if monday <= key[0] < monday + timedelta(days=7)}
+
+    def same_as_fresh():
+        fresh = FeasibilityIndex(session, rules).check(absences)
+        assert index.check(absences) == fresh
+
+    same_as_fresh()
+    kept = week(second)
+    session.add(VacationRequest(provider_id=providers["ACS"].id, start_date=first, end_date=first + timedelta(days=2), status="APPROVED"))
+    session.commit()
+    assert week(first) == {} and week(second) == kept
+    same_as_fresh()
+
+    kept = week(first)
+    session.add(Holiday(date=date(2026, 3, 11), name="Closure"))
+    session.commit()
+    assert week(second) == {} and all(kept[key] is slack for key, slack in week(first).items())
+    same_as_fresh()
+
+    session.add(CoverageRequirement(site_type="office", site_id=1, day_of_week=2, block="AM", min_apn=1))
+    session.commit()
+    assert index.slack == {}
+    same_as_fresh()
@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+import io
+import re
+import zipfile
+from datetime import date, timedelta
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api import router
+from app.api.deps import get_tenant
+from app.models import Provider, SolveRun
+from app.services.fairness import FairnessIndex
+from app.services.history_import import IMPORTED_STATUS, ProviderIndex, import_history, read_workbooks
+from app.services.tenants import Tenant
+from app.solver.engine import solve_schedule
+from app.solver.exporter import export_week
+
+START = date(2026, 1, 5)
+END = date(2026, 3, 29)
+
+
+def _client(tenant: Tenant) -> TestClient:
+    app = FastAPI()
+    app.include_router(router)
+    app.dependency_overrides[get_tenant] = lambda: tenant
+    return TestClient(app)
+
+
+def _workbooks(schedule, start=START, end=END):
+    mondays = [start + timedelta(weeks=n) for n in range((end - start).days // 7 + 1)]
+    return [(f"SCHEDULE_{monday}.xlsx", export_week(schedule, monday)) for monday in mondays]
+
+
+def _calls(schedule):
+    # Exported sheets carry Friday's weekday pair in the weekend cells and leave Saturday and Sunday blank.
+    return {
+        (c.date, c.call_type, c.label, tuple(p.initials for p in c.providers))
+        for c in schedule.call_assignments
+        if c.call_type != "weekend_noninv"
+    }
+
+
+def _hospital_slots(schedule):
+    return {
+        (a.date, a.block, a.site_code, tuple(p.initials for p in a.providers))
+        for a in schedule.assignments
+        if a.site_code in {"WTH", "WTH_APN", "RMC", "COO_OBL"}
+    }
+
+
+def test_exported_weeks_read_back_into_an_archived_run():
+    tenant = Tenant("history")
+    solved = solve_schedule(tenant.session, START, END)
+    workbooks = _workbooks(solved)
+
+    result = import_history(tenant, reversed(workbooks), max_workers=2)
+    assert result.issues == []
+    assert [w.week_start for w in result.weeks] == [START + timedelta(weeks=n) for n in range(12)]
+    run = result.solve_run
+    assert (run.status, run.start_date, run.end_date) == (IMPORTED_STATUS, START, END)
+
+    imported = tenant.schedule_for(run.id)
+    assert _calls(imported) == _calls(solved)
+    assert _hospital_slots(imported) == _hospital_slots(solved)
+    assert dict(imported.vacations) == {
+        initials: [(s, e, kind) for s, e, kind in ranges if s <= END and e >= START]
+        for initials, ranges in solved.vacations.items()
+    }
+    fresh = FairnessIndex(imported)
+    index = tenant.fairness_index(run.id)
+    for metric in ("weekday_noninv", "interventional", "hospital_sessions"):
+        assert index.window(metric) == fresh.window(metric) == FairnessIndex(solved).window(metric)
+
+    # The pool and the inline path agree.
+    providers = ProviderIndex(tenant.session.all(Provider))
+    assert read_workbooks(workbooks, providers, max_workers=1) == read_workbooks(workbooks, providers, max_workers=3)
+
+
+def _edited(workbook: bytes, cells: dict[str, str]) -> bytes:
+    """The workbook with the given cells turned into shared strings, as Excel saves them."""
+    source = zipfile.ZipFile(io.BytesIO(workbook))
+    sheet = source.read("xl/worksheets/sheet1.xml").decode()
+    strings = source.read("xl/sharedStrings.xml").decode()
+    for ref, text in cells.items():
+        position = strings.count("<si>")
+        cell = f'<ns0:c r="{ref}" t="s"><ns0:v>{position}</ns0:v></ns0:c>'
+        sheet = re.sub(rf'<ns0:c r="{ref}"(?: [^>]*)?(?:/>|>.*?</ns0:c>)', cell, sheet, count=1)
+        strings = strings.replace("</sst>", f"<si><t>{text}</t></si></sst>")
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as output:
+        for item in source.infolist():
+            data = {"xl/worksheets/sheet1.xml": sheet, "xl/sharedStrings.xml": strings}.get(item.filename)
+            output.writestr(item, data.encode() if data is not None else source.read(item))
+    return buffer.getvalue()
+
+
+def test_upload_reports_unreadable_workbooks_and_initials():
+    tenant = Tenant("history-api")
+    client = _client(tenant)
+    end = START + timedelta(days=13)
+    (first, week1), (second, week2) = _workbooks(solve_schedule(tenant.session, START, end), end=end)
+
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as upload:
+        upload.writestr(f"2026/{first}", _edited(week1, {"B12": "HH: ZZZ CH: RAM", "G4": "FRG"}))
+        upload.writestr(f"2026/{second}", week2)
+        upload.writestr("copy of week two.xlsx", week2)
+        upload.writestr("notes.xlsx", b"not a workbook")
+    response = client.post("/solve/history", content=buffer.getvalue(), params={"max_workers": 2})
+    assert response.status_code == 200, response.json()
+    body = response.json()
+    assert body["weeks"] == [str(START), str(START + timedelta(weeks=1))]
+    assert {(i["source"], i["cell"]) for i in body["issues"]} == {
+        (first, "B12"),
+        ("copy of week two.xlsx", "B1"),
+        ("notes.xlsx", None),
+    }
+    assert any(i["message"] == "Unknown provider: ZZZ" for i in body["issues"])
+
+    # Shared strings are read too: the known partner of the edited call and a filled-in Saturday.
+    calls = {(c.date, c.call_type): c for c in tenant.schedule_for(body["solve_run_id"]).call_assignments}
+    assert [p.initials for p in calls[(START, "noninvasive_weekday")].providers] == ["RAM"]
+    assert [p.initials for p in calls[(START + timedelta(days=5), "weekend_noninv")].providers] == ["FRG"]
+
+    assert client.post("/solve/history", content=b"plain text").status_code == 400
+    only_bad = io.BytesIO()
+    with zipfile.ZipFile(only_bad, "w") as upload:
+        upload.writestr("notes.xlsx", b"not a workbook")
+    rejected = client.post("/solve/history", content=only_bad.getvalue())
+    assert rejected.status_code == 422 and rejected.json()["detail"][0]["source"] == "notes.xlsx"
+
+
+def test_imported_runs_are_not_re_solved():
+    tenant = Tenant("history-read-only")
+    client = _client(tenant)
+    end = START + timedelta(days=27)
+    run = import_history(tenant, _workbooks(solve_schedule(tenant.session, START, end), end=end), max_workers=1).solve_run
+    imported = tenant.schedule_for(run.id)
+    rows, revision = list(imported.assignments), imported.revision
+
+    extend = client.post(f"/solve/{run.id}/extend", json={"end_date": str(end + timedelta(weeks=2))})
+    assert extend.status_code == 409
+    pin = {"date": str(START), "slot": "noninvasive_weekday", "providers": ["JOO", "RAM"]}
+    assert client.post(f"/solve/{run.id}/pins", json={"pins": [pin]}).status_code == 409
+    assert client.get(f"/solve/{run.id}/swaps").status_code == 409
+    vacations = "provider,start_date,end_date\nJOO,2026-01-13,2026-01-14\n"
+    response = client.post(
+        "/vacations/import", content=vacations, headers={"content-type": "text/csv"}, params={"solve_run_id": run.id}
+    )
+    assert response.status_code == 409
+
+    assert imported.assignments == rows and imported.revision == revision
+    assert tenant.session.get(SolveRun, run.id).end_date == end
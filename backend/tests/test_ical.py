@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+from datetime import date
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api import router
+from app.api.deps import get_tenant
+from app.models import Provider, VacationRequest
+from app.services.ical import _fold, provider_feed, provider_view
+from app.services.seed import seed_all, seed_vacations
+from app.services.tenants import Tenant
+from app.solver.engine import solve_schedule
+
+
+START = date(2026, 1, 5)
+END = date(2026, 3, 27)
+
+
+def test_feed_covers_sites_calls_and_vacations(session):
+    seed_all(session)
+    seed_vacations(session)
+    schedule = solve_schedule(session, START, END)
+
+    body = provider_feed(schedule, "JOO").body.decode("utf-8")
+
+    assert body.startswith("BEGIN:VCALENDAR\r\n") and body.endswith("END:VCALENDAR\r\n")
+    assert "DTSTART;VALUE=DATE:20260202\r\nDTEND;VALUE=DATE:20260207\r\nSUMMARY:Vacation" in body
+    assert "CATEGORIES:CALL" in body and "CATEGORIES:SITE" in body
+    assert body.count("BEGIN:VEVENT") == len(provider_view(schedule).events["JOO"])
+    assert all(len(line.encode()) <= 75 for line in body.split("\r\n"))
+
+
+def test_long_lines_fold_on_character_boundaries():
+    line = "SUMMARY:" + "é" * 80
+    folded = _fold(line)
+    assert folded.replace("\r\n ", "") == line
+    assert all(len(part.encode()) <= 75 for part in folded.split("\r\n"))
+
+
+def test_only_changed_providers_are_rerendered(session):
+    seed_all(session)
+    first = solve_schedule(session, START, END)
+    feeds = {initials: provider_feed(first, initials) for initials in provider_view(first).events}
+
+    away = next(p for p in session.all(Provider) if p.initials == "DJT")
+    session.add(VacationRequest(provider_id=away.id, start_date=date(2026, 3, 23), end_date=date(2026, 3, 27), status="APPROVED"))
+    session.commit()
+    second = solve_schedule(session, START, END)
+
+    changed = {initials for initials in feeds if provider_feed(second, initials) is not feeds[initials]}
+    assert "DJT" in changed
+    assert len(changed) < len(feeds) // 2
+    # Everyone else keeps the same rendered bytes and ETag.
+    assert provider_feed(second, "JOO").etag == feeds["JOO"].etag
+
+
+def test_shared_initials_get_no_merged_feed():
+    tenant = Tenant("ical-shared")
+    tenant.record_run(START, END, solve_schedule(tenant.session, START, END))
+    app = FastAPI()
+    app.include_router(router)
+    app.dependency_overrides[get_tenant] = lambda: tenant
+    client = TestClient(app)
+
+    # RAM is both an MD and an APN.
+    assert client.get("/providers/RAM/schedule.ics").status_code == 409
+    assert client.get("/providers/JOO/schedule.ics").status_code == 200
+    assert client.get("/providers/ZZZ/schedule.ics").status_code == 404
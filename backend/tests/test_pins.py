@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+from datetime import date
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api import router
+from app.api.deps import get_tenant
+from app.config.registry import get_rules_registry
+from app.models import Provider
+from app.services.seed import seed_all
+from app.services.tenants import Tenant
+from app.solver.engine import Pin, solve_schedule
+from app.solver.pins import PinError, load_pins, pin_problems, repair_schedule, save_pin
+
+
+START = date(2026, 1, 5)
+END = date(2026, 12, 31)
+
+
+def _rows(schedule):
+    return (
+        [(a.date, a.block, a.site_code, [p.initials for p in a.providers]) for a in schedule.assignments],
+        [(c.date, c.call_type, c.label, [p.initials for p in c.providers]) for c in schedule.call_assignments],
+    )
+
+
+def test_pinned_slots_are_honoured(session):
+    seed_all(session)
+    noninv = [p for p in session.all(Provider) if p.type == "MD" and not p.is_invasive]
+    day = date(2026, 3, 10)
+    base = solve_schedule(session, START, END)
+    rmc = next(a for a in base.assignments if a.date == day and a.site_code == "RMC" and a.block == "AM")
+    pinned_md = next(
+        a.providers[0] for a in base.assignments if a.date == day and a.site_code == "HH" and a.block == "AM"
+    )
+    pins = [
+        Pin(day, "RMC", "AM", (pinned_md.id, rmc.providers[1].id)),
+        Pin(day, "noninvasive_weekday", None, (noninv[0].id, noninv[1].id)),
+    ]
+
+    schedule = solve_schedule(session, START, END, pins=pins)
+
+    am = [a for a in schedule.assignments if a.date == day and a.block == "AM"]
+    assert next(a for a in am if a.site_code == "RMC").providers == [pinned_md, rmc.providers[1]]
+    assert [a.site_code for a in am if pinned_md in a.providers] == ["RMC"]
+    call = next(c for c in schedule.call_assignments if c.date == day and c.call_type == "noninvasive_weekday")
+    assert call.label == f"HH: {noninv[0].initials} CH: {noninv[1].initials}"
+
+
+def test_repair_matches_full_solve_and_stays_local(session):
+    seed_all(session)
+    rules = get_rules_registry().active
+    invasive = [p for p in session.all(Provider) if p.type == "MD" and p.is_invasive]
+    schedule = solve_schedule(session, START, END, rules)
+    original = _rows(schedule)
+    day = date(2026, 6, 9)
+    current = next(a for a in schedule.assignments if a.date == day and a.site_code == "RMC" and a.block == "PM")
+    replacement = next(p for p in session.all(Provider) if p.type == "MD" and p not in current.providers)
+
+    save_pin(session, day, "RMC", "PM", [replacement, current.providers[1]])
+    save_pin(session, day, "interventional_weekday", None, invasive[-2:])
+    assert len(load_pins(session, START, END)) == 2
+    result = repair_schedule(session, schedule, START, END, rules, day, day)
+
+    assert _rows(schedule) == _rows(solve_schedule(session, START, END, rules, load_pins(session, START, END)))
+    assert result.changes and all(change.date >= date(2026, 6, 8) for change in result.changes)
+    assert _rows(schedule) != original
+    assert schedule.revision > 0
+
+
+def test_whole_day_md_is_free_in_every_block(session):
+    seed_all(session)
+    day = date(2026, 3, 10)
+    base = solve_schedule(session, START, END)
+    wth_md = next(a.providers[0] for a in base.assignments if (a.date, a.site_code, a.block) == (day, "WTH", "AM"))
+    rmc = next(a for a in base.assignments if (a.date, a.site_code, a.block) == (day, "RMC", "PM"))
+
+    schedule = solve_schedule(session, START, END, pins=[Pin(day, "RMC", "PM", (wth_md.id, rmc.providers[1].id))])
+
+    held = [(a.block, a.site_code) for a in schedule.assignments if a.date == day and wth_md in a.providers]
+    assert held == [("PM", "RMC")]
+    wth = [a.providers for a in schedule.assignments if a.date == day and a.site_code == "WTH"]
+    assert len(wth) == 2 and wth[0] == wth[1]
+
+
+def test_pins_are_checked_against_leave_and_qualifications(session):
+    seed_all(session)
+    providers = session.all(Provider)
+    joo = next(p for p in providers if p.initials == "JOO")
+    apn = next(p for p in providers if p.type == "APN")
+    leave = date(2026, 2, 3)  # seeded approved leave for JOO
+
+    problems = pin_problems(session, leave, "noninvasive_weekday", None, [joo, apn])
+    assert problems == [f"JOO is on leave on {leave}", f"{apn.initials} cannot be pinned to noninvasive_weekday"]
+    with pytest.raises(PinError):
+        save_pin(session, date(2026, 2, 10), "WTH_APN", "AM", [joo])
+    assert load_pins(session, START, END) == []
+    assert pin_problems(session, date(2026, 2, 10), "noninvasive_weekday", None, [joo]) == []
+
+
+def test_pin_endpoint_rejects_invalid_pins_without_saving():
+    tenant = Tenant("pins-invalid")
+    app = FastAPI()
+    app.include_router(router)
+    app.dependency_overrides[get_tenant] = lambda: tenant
+    client = TestClient(app)
+    run = tenant.record_run(START, date(2026, 3, 27), solve_schedule(tenant.session, START, date(2026, 3, 27)))
+
+    pins = [
+        {"date": "2026-03-10", "slot": "noninvasive_weekday", "providers": ["JOO", "RAM"]},
+        {"date": "2026-02-03", "slot": "RMC", "block": "AM", "providers": ["JOO"]},
+    ]
+    response = client.post(f"/solve/{run.id}/pins", json={"pins": pins})
+    assert response.status_code == 422
+    assert response.json()["detail"] == ["JOO is on leave on 2026-02-03"]
+    assert load_pins(tenant.session, START, END) == []
+
+    # RAM is both an MD and an APN; the call pin takes the MD.
+    assert client.post(f"/solve/{run.id}/pins", json={"pins": pins[:1]}).status_code == 200
+    (pin,) = load_pins(tenant.session, START, END)
+    assert [tenant.session.get(Provider, i).type for i in pin.provider_ids] == ["MD", "MD"]
@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import random
+import time
+from collections import deque
+from datetime import date, timedelta
+
+from app.models import Provider
+from app.solver.rotation import IndexedHeap, LoadLedger, Rotation
+
+
+DAY = date(2026, 1, 5)
+
+
+def _providers(count: int) -> list[Provider]:
+    return [Provider(id=i, initials=f"P{i}", type="MD") for i in range(1, count + 1)]
+
+
+def _deque_pick(pool: deque, predicate):
+    for _ in range(len(pool)):
+        provider = pool[0]
+        pool.rotate(-1)
+        if predicate(provider):
+            return provider
+    return None
+
+
+def test_indexed_heap_orders_and_updates_keys():
+    heap: IndexedHeap[str] = IndexedHeap()
+    for item, key in (("a", (3,)), ("b", (1,)), ("c", (2,))):
+        heap.push(item, key)
+    heap.update("a", (0,))
+    heap.update("b", (5,))
+    heap.push("d", (4,))
+    assert list(heap.ordered()) == ["a", "c", "d", "b"]
+    assert [heap.pop() for _ in range(len(heap))] == ["a", "c", "d", "b"]
+
+
+def test_cycle_mode_reproduces_deque_rotation():
+    rng = random.Random(7)
+    providers = _providers(6)
+    pool = deque(providers)
+    rotation = Rotation(providers, LoadLedger(), "cycle")
+    for step in range(500):
+        blocked = {p.id for p in providers if rng.random() < 0.4}
+        predicate = lambda p: p.id not in blocked
+        assert rotation.next(DAY + timedelta(days=step), predicate) == _deque_pick(pool, predicate)
+        assert rotation.state() == tuple(p.id for p in pool)
+
+
+def test_load_mode_balances_across_shared_ledger():
+    a, b, c = _providers(3)
+    ledger = LoadLedger()
+    hospital = Rotation([a, b, c], ledger, "load")
+    clinic = Rotation([a, b], ledger, "load")
+
+    assert clinic.next(DAY, lambda p: True) == a
+    # a already worked today, so the hospital rotation starts with b and never skips ahead of c.
+    assert hospital.next(DAY, lambda p: True) == b
+    assert hospital.next(DAY, lambda p: p != c) == a
+    assert hospital.next(DAY + timedelta(days=1), lambda p: True) == c
+
+    restored = Rotation([a, b, c], LoadLedger(), "load")
+    restored.restore(hospital.state(), {p.id: p for p in (a, b, c)})
+    assert restored.state() == hospital.state()
+
+
+def test_rotations_stay_close_to_a_plain_deque():
+    rng = random.Random(11)
+    providers = _providers(12)
+    blocked = [{p.id for p in providers if rng.random() < 0.3} for _ in range(20_000)]
+
+    def deque_picks():
+        pool = deque(providers)
+        for ids in blocked:
+            _deque_pick(pool, lambda p: p.id not in ids)
+
+    def rotation_picks(mode):
+        ledger = LoadLedger()
+        rotation = Rotation(providers, ledger, mode)
+        # A second rotation sharing half the pool, as the hospital and clinic rotations do.
+        Rotation(providers[::2], ledger, mode)
+        for step, ids in enumerate(blocked):
+            rotation.next(DAY + timedelta(days=step), lambda p: p.id not in ids)
+
+    def best(run):
+        timings = []
+        for _ in range(3):
+            started = time.perf_counter()
+            run()
+            timings.append(time.perf_counter() - started)
+        return min(timings)
+
+    baseline = best(deque_picks)
+    assert best(lambda: rotation_picks("cycle")) < 5 * baseline
+    assert best(lambda: rotation_picks("load")) < 15 * baseline
@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import json
+from datetime import date
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api import router
+from app.api.deps import get_tenant
+from app.config.registry import RulesRegistry, RulesValidationError
+from app.core.config import settings
+from app.services.seed import seed_all
+from app.services.tenants import Tenant
+from app.solver.engine import solve_schedule
+
+
+START = date(2026, 1, 5)
+END = date(2026, 1, 30)
+
+
+@pytest.fixture
+def registry(tmp_path) -> RulesRegistry:
+    return RulesRegistry(settings.rules_config_path, tmp_path / "rules")
+
+
+def test_seed_rules_compiled_once(registry):
+    active = registry.active
+    assert active is registry.active
+    assert active.rotations["rmc_md"] == ("SHF", "MCR", "FRG", "CLN", "GHM")
+    assert active.icd_clinic.nmc_days == frozenset({0, 1})
+    assert [info.source for info in registry.history()] == ["seed"]
+
+
+def test_publish_swaps_active_version(registry, session):
+    seed_all(session)
+    before = solve_schedule(session, START, END, registry.active)
+
+    raw = json.loads(settings.rules_config_path.read_text())
+    raw["rotations"]["rmc_md"] = ["GHM", "CLN"]
+    compiled = registry.publish(json.dumps(raw))
+
+    assert registry.active is compiled
+    assert compiled.version != before.rules_version
+    after = solve_schedule(session, START, END, registry.active)
+    assert after.rules_version == compiled.version
+    rmc_mds = {a.providers[0].initials for a in after.assignments if a.site_code == "RMC"}
+    assert rmc_mds <= {"GHM", "CLN"}
+
+    # Same content with different formatting is the same version.
+    assert registry.publish(json.dumps(raw, indent=4)).version == compiled.version
+    assert len(registry.history()) == 2
+
+
+def test_invalid_rules_rejected_without_swap(registry):
+    active = registry.active
+    with pytest.raises(RulesValidationError):
+        registry.publish('{"rotations": {"rmc_md": "SHF"}}')
+    with pytest.raises(RulesValidationError):
+        registry.publish("# auto-uploaded\n[not, a, mapping]")
+    with pytest.raises(RulesValidationError):
+        registry.publish("")
+    with pytest.raises(RulesValidationError, match="ZZZ"):
+        registry.publish('{"rotations": {"rmc_md": ["GHM", "ZZZ"]}}', known_initials={"GHM"})
+    assert registry.active is active
+    assert [info.source for info in registry.history()] == ["seed"]
+
+
+def test_upload_endpoint_refuses_empty_and_unbound_rules(tmp_path):
+    tenant = Tenant("rules-upload", rules=RulesRegistry(settings.rules_config_path, tmp_path / "rules"))
+    app = FastAPI()
+    app.include_router(router)
+    app.dependency_overrides[get_tenant] = lambda: tenant
+    client = TestClient(app)
+    active = tenant.rules.active
+
+    raw = json.loads(settings.rules_config_path.read_text())
+    raw["rotations"]["rmc_md"] = ["GHM", "ZZZ"]
+    for body in ({}, {"raw": ""}, {"raw": "{}"}, {"raw": json.dumps(raw)}):
+        assert client.post("/config/rules", json=body).status_code == 422, body
+    assert tenant.rules.active is active
+
+    raw["rotations"]["rmc_md"] = ["GHM"]
+    assert client.post("/config/rules", json={"raw": json.dumps(raw)}).status_code == 200
+
+
+def test_history_survives_restart(registry, tmp_path):
+    compiled = registry.publish('{"rotations": {"rmc_md": ["GHM"]}, "obl": {"physicians": ["DPR"]}}')
+    registry.activate(registry.history()[0].version)
+
+    reloaded = RulesRegistry(settings.rules_config_path, tmp_path / "rules")
+    assert [info.version for info in reloaded.history()] == [info.version for info in registry.history()]
+    assert reloaded.active.version == registry.active.version
+    assert reloaded.get(compiled.version).obl.physicians == ("DPR",)
+    assert reloaded.activate(compiled.version) is reloaded.active
+
+
+def test_edited_seed_file_is_published_over_the_stored_index(tmp_path):
+    seed = tmp_path / "rules_config.yaml"
+    raw = json.loads(settings.rules_config_path.read_text())
+    seed.write_text(json.dumps(raw))
+    first = RulesRegistry(seed, tmp_path / "rules")
+    uploaded = first.publish('{"rotations": {"rmc_md": ["GHM"]}, "obl": {"physicians": ["DPR"]}}')
+
+    # Unchanged seed: the stored active version wins.
+    assert RulesRegistry(seed, tmp_path / "rules").active.version == uploaded.version
+
+    raw["rotations"]["rmc_md"] = ["GHM", "CLN"]
+    seed.write_text(json.dumps(raw))
+    edited = RulesRegistry(seed, tmp_path / "rules")
+    assert edited.active.rotations["rmc_md"] == ("GHM", "CLN")
+    assert [info.source for info in edited.history()] == ["seed", "upload", "seed"]
+    assert edited.get(uploaded.version).obl.physicians == ("DPR",)
+
+    # The edit is stored, so later restarts and uploads are not undone by it.
+    edited.activate(uploaded.version)
+    assert RulesRegistry(seed, tmp_path / "rules").active.version == uploaded.version
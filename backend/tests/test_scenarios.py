@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+from datetime import date
+
+import pytest
+
+from app.config.registry import get_rules_registry
+from app.models import Holiday, Provider, VacationRequest
+from app.services.coverage import coverage_gaps
+from app.services.scenarios import (
+    AmbiguousProviderError,
+    HolidayEdit,
+    RotationEdit,
+    Scenario,
+    ScenarioBase,
+    VacationEdit,
+    evaluate_scenarios,
+)
+from app.services.seed import seed_all
+from app.solver.engine import solve_schedule
+from app.solver.pins import load_pins, save_pin
+
+
+START = date(2026, 2, 2)
+END = date(2026, 2, 27)
+
+
+def _base(session) -> ScenarioBase:
+    seed_all(session)
+    rules = get_rules_registry().active
+    return ScenarioBase(session, rules, solve_schedule(session, START, END, rules), START, END)
+
+
+def test_scenarios_do_not_mutate_base_session(session):
+    base = _base(session)
+    vacations_before = list(session.all(VacationRequest))
+    holidays_before = [(h.date, h.extend_weekend) for h in session.all(Holiday)]
+
+    scenarios = [
+        Scenario("noop"),
+        Scenario("wt apns out", (VacationEdit("AG", START, END), VacationEdit("ACS", START, END), VacationEdit("MB", START, END))),
+        Scenario("presidents day worked", (HolidayEdit(date(2026, 2, 16), extend_weekend=False),)),
+        Scenario("rmc order", (RotationEdit("rmc_md", ("GHM", "CLN")),)),
+    ]
+    noop, vacations, presidents, rotation = evaluate_scenarios(base, scenarios, max_workers=2)
+
+    assert session.all(VacationRequest) == vacations_before
+    assert [(h.date, h.extend_weekend) for h in session.all(Holiday)] == holidays_before
+
+    assert noop.changes == []
+    assert noop.coverage_gaps == coverage_gaps(session, base.baseline, START, END)
+    assert all(delta == {} for delta in noop.fairness_deltas.values())
+
+    assert any(gap.site_code == "WTH" and gap.missing_apn for gap in vacations.coverage_gaps)
+    assert len(vacations.coverage_gaps) > len(noop.coverage_gaps)
+    assert all(gap.date >= START for gap in vacations.coverage_gaps)
+
+    assert any(change.date == date(2026, 2, 16) and not change.before for change in presidents.changes)
+
+    assert rotation.rules_version != base.rules.version
+    assert {c.slot for c in rotation.changes} >= {"RMC"}
+
+
+def test_pinned_base_runs_show_no_changes_without_edits(session):
+    seed_all(session)
+    rules = get_rules_registry().active
+    invasive = [p for p in session.all(Provider) if p.type == "MD" and p.is_invasive]
+    save_pin(session, date(2026, 2, 10), "interventional_weekday", None, invasive[-2:])
+    baseline = solve_schedule(session, START, END, rules, load_pins(session, START, END))
+    base = ScenarioBase(session, rules, baseline, START, END)
+
+    (noop,) = evaluate_scenarios(base, [Scenario("noop")])
+    assert noop.changes == []
+    assert all(delta == {} for delta in noop.fairness_deltas.values())
+
+
+def test_vacation_edits_must_say_which_provider_shared_initials_mean(session):
+    base = _base(session)
+    with pytest.raises(AmbiguousProviderError):
+        evaluate_scenarios(base, [Scenario("ram out", (VacationEdit("RAM", START, END),))])
+
+    md_out, apn_out = evaluate_scenarios(
+        base,
+        [Scenario(kind, (VacationEdit("RAM", START, END, provider_type=kind),)) for kind in ("MD", "APN")],
+    )
+    assert md_out.changes and apn_out.changes and md_out.changes != apn_out.changes
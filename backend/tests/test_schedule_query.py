@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+from datetime import date
+
+import orjson
+import pytest
+
+from app.services.schedule_query import (
+    Cursor,
+    ScheduleFilter,
+    assignment_row,
+    call_row,
+    page_assignments,
+    page_calls,
+    stream_assignments,
+    stream_calls,
+)
+from app.services.seed import seed_all
+from app.solver.engine import solve_schedule
+
+
+START = date(2026, 1, 5)
+END = date(2026, 12, 31)
+
+
+def _walk(page_fn, schedule, filters, limit):
+    rows, cursor = [], None
+    while True:
+        page = page_fn(schedule, filters, cursor, limit)
+        rows.extend(page.items)
+        if page.next_cursor is None:
+            return rows
+        cursor = Cursor.decode(page.next_cursor)
+
+
+def _decode(chunks):
+    return [orjson.loads(line) for line in b"".join(chunks).splitlines()]
+
+
+def _jsonable(rows):
+    return [orjson.loads(orjson.dumps(row)) for row in rows]
+
+
+def test_cursor_pages_cover_the_year_in_date_order(session):
+    seed_all(session)
+    schedule = solve_schedule(session, START, END)
+    filters = ScheduleFilter()
+
+    rows = _walk(page_assignments, schedule, filters, 37)
+    assert rows == sorted((assignment_row(a) for a in schedule.assignments), key=lambda row: row["date"])
+    calls = _walk(page_calls, schedule, filters, 11)
+    assert sorted(_jsonable(calls), key=orjson.dumps) == sorted(_jsonable(map(call_row, schedule.call_assignments)), key=orjson.dumps)
+    assert [row["date"] for row in calls] == sorted(row["date"] for row in calls)
+
+
+def test_filters_and_ndjson_stream(session):
+    seed_all(session)
+    schedule = solve_schedule(session, START, END)
+    filters = ScheduleFilter(start=date(2026, 3, 2), end=date(2026, 3, 31), site="WTH", provider="MB")
+
+    rows = _walk(page_assignments, schedule, filters, 5)
+    assert rows
+    assert all(row["site_code"] in ("WTH", "WTH_APN") and "MB" in row["providers"] for row in rows)
+    assert all(filters.start <= row["date"] <= filters.end for row in rows)
+    assert _decode(stream_assignments(schedule, filters)) == _jsonable(rows)
+
+    weekend = ScheduleFilter(call_type="weekend_noninv")
+    streamed = _decode(stream_calls(schedule, weekend))
+    assert streamed and {row["call_type"] for row in streamed} == {"weekend_noninv"}
+    assert streamed == _jsonable(_walk(page_calls, schedule, weekend, 100))
+
+
+def test_invalid_cursor_is_rejected():
+    with pytest.raises(ValueError):
+        Cursor.decode("not-a-cursor")
@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+from datetime import date
+
+from app.db.session import InMemorySession
+from app.models import CoverageRequirement, SiteOffice
+from app.services.seed import seed_all
+from app.solver.daily import compile_slot_templates
+from app.solver.engine import solve_schedule
+
+
+def test_templates_fill_rotation_sites_first_and_obl_last():
+    session = InMemorySession()
+    seed_all(session)
+    wednesday = compile_slot_templates(session)[2]
+
+    assert [(slot.md_code, slot.block) for slot in wednesday] == [
+        ("WTH", "AM"), ("WTH", "PM"), ("RMC", "AM"), ("RMC", "PM"),
+        ("HH", "AM"), ("HH", "PM"), ("HH3", "AM"), ("HH3", "PM"),
+        ("SVI", "AM"), ("SVI", "PM"), ("WT", "AM"), ("WT", "PM"),
+        ("COO_OBL", "AM"), ("COO_OBL", "PM"),
+    ]
+    wth = wednesday[0]
+    assert (wth.apn_code, wth.md_rotation, wth.md_shift) == ("WTH_APN", "wt_hospital_md", "day")
+
+
+def test_new_requirement_is_staffed_without_solver_changes():
+    session = InMemorySession()
+    seed_all(session)
+    marlton = next(o for o in session.all(SiteOffice) if o.code == "MAR")
+    session.add(CoverageRequirement(site_type="office", site_id=marlton.id, day_of_week=0, block="AM", min_md=1, min_apn=0))
+    session.commit()
+
+    monday = date(2026, 3, 2)
+    schedule = solve_schedule(session, monday, date(2026, 3, 6))
+    staffed = [a for a in schedule.assignments if a.site_code == "MAR"]
+    assert [(a.date, a.block) for a in staffed] == [(monday, "AM")]
+    assert staffed[0].providers and all(p.type == "MD" and not p.is_invasive for p in staffed[0].providers)
+    hospital_md = next(a for a in schedule.assignments if a.date == monday and a.site_code == "WTH").providers[0]
+    assert hospital_md not in staffed[0].providers
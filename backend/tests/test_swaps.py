@@ -0,0 +1,219 @@
+from __future__ import annotations
+
+import threading
+from dataclasses import replace
+from datetime import date, timedelta
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api import router
+from app.api.deps import get_tenant
+from app.core.config import settings
+from app.models import VacationRequest
+from app.services.fairness import FAIRNESS_METRICS, FairnessIndex
+from app.services.swaps import INELIGIBLE, VACATION, WEEKEND_QUOTA, WEEKEND_TAKEN, SwapError
+from app.services.tenants import Tenant
+from app.solver.archive import CALL
+from app.solver.engine import solve_schedule
+from app.solver.pins import load_pins
+
+START = date(2026, 1, 5)
+END = date(2026, 3, 27)
+SATURDAY = date(2026, 2, 14)
+
+
+def _setup(name: str, end: date = END):
+    tenant = Tenant(name)
+    app = FastAPI()
+    app.include_router(router)
+    app.dependency_overrides[get_tenant] = lambda: tenant
+    run = tenant.record_run(START, end, solve_schedule(tenant.session, START, end))
+    return tenant, TestClient(app), run
+
+
+def _holder(tenant, run, day, call_type="weekend_noninv"):
+    call = next(c for c in tenant.schedule_for(run.id).call_assignments if (c.date, c.call_type) == (day, call_type))
+    return call.providers[0].initials
+
+
+def _same_metrics(index, schedule):
+    fresh = FairnessIndex(schedule)
+    for metric in FAIRNESS_METRICS:
+        for start, end in ((None, None), (date(2026, 2, 1), date(2026, 6, 30))):
+            counts = index.window(metric, start, end)
+            assert {k: v for k, v in counts.items() if v} == {k: v for k, v in fresh.window(metric, start, end).items() if v}
+
+
+def _free_taker(tenant, run, day):
+    """A weekend-team MD with room under the target who is not on call that weekend."""
+    board = tenant.swap_board(run.id)
+    schedule = tenant.schedule_for(run.id)
+    weekend = {c.providers[0].initials for c in schedule.call_assignments if c.call_type == "weekend_noninv" and abs((c.date - day).days) <= 2}
+    counts = tenant.fairness_index(run.id).window("weekend_noninv")
+    return next(i for i, p in sorted(board.providers.items()) if i not in weekend and counts.get(i, 0) < 3 and not p.is_invasive)
+
+
+def test_accepted_swap_patches_run_fairness_and_pins():
+    tenant, client, run = _setup("swaps")
+    giver = _holder(tenant, run, SATURDAY)
+    taker = _free_taker(tenant, run, SATURDAY)
+    revision = tenant.schedule_for(run.id).revision
+
+    proposed = client.post(f"/solve/{run.id}/swaps", json={"giver": giver, "taker": taker, "date": str(SATURDAY), "call_type": "weekend_noninv"})
+    assert proposed.status_code == 200 and proposed.json()["status"] == "OPEN"
+    accepted = client.post(f"/solve/{run.id}/swaps/{proposed.json()['id']}/accept").json()
+    assert accepted["status"] == "ACCEPTED"
+
+    schedule = tenant.schedule_for(run.id)
+    assert _holder(tenant, run, SATURDAY) == taker and schedule.revision == revision + 1
+    _same_metrics(tenant.fairness_index(run.id), schedule)
+    pins = [p for p in load_pins(tenant.session, START, END) if p.slot == "weekend_noninv"]
+    assert [(p.date, p.provider_ids) for p in pins] == [(SATURDAY, (tenant.swap_board(run.id).providers[taker].id,))]
+    assert client.get(f"/solve/{run.id}/stale").json() == []
+
+    # The pin carries the swap through a repair of that week.
+    repaired = client.post(f"/solve/{run.id}/pins", json={"pins": [{"date": "2026-02-10", "slot": "noninvasive_weekday", "providers": ["JOO", "RAM"]}]})
+    assert repaired.status_code == 200
+    assert _holder(tenant, run, SATURDAY) == taker
+    assert client.post(f"/solve/{run.id}/swaps/{accepted['id']}/accept").status_code == 409
+
+
+def test_run_writers_wait_for_the_run_lock():
+    tenant, client, run = _setup("swaps-locked")
+    other = tenant.record_run(START, END, solve_schedule(tenant.session, START, END))
+    giver = _holder(tenant, run, SATURDAY)
+    proposed = client.post(
+        f"/solve/{run.id}/swaps",
+        json={"giver": giver, "taker": _free_taker(tenant, run, SATURDAY), "date": str(SATURDAY), "call_type": "weekend_noninv"},
+    )
+    pin = {"pins": [{"date": "2026-02-10", "slot": "noninvasive_weekday", "providers": ["JOO", "RAM"]}]}
+    responses = []
+    writers = [
+        threading.Thread(target=lambda: responses.append(client.post(f"/solve/{run.id}/swaps/{proposed.json()['id']}/accept"))),
+        threading.Thread(target=lambda: responses.append(client.post(f"/solve/{run.id}/pins", json=pin))),
+        threading.Thread(target=lambda: responses.append(client.post(f"/solve/{run.id}/extend", json={"end_date": "2026-04-24"}))),
+    ]
+    revision = tenant.schedule_for(run.id).revision
+    with tenant.run_lock(run.id):
+        # Other runs are not held up.
+        assert client.post(f"/solve/{other.id}/pins", json=pin).status_code == 200
+        for writer in writers:
+            writer.start()
+        for writer in writers:
+            writer.join(0.2)
+        assert not responses and tenant.schedule_for(run.id).revision == revision
+    for writer in writers:
+        writer.join()
+    assert [r.status_code for r in responses] == [200, 200, 200]
+    assert _holder(tenant, run, SATURDAY) != giver
+
+
+def test_swaps_are_checked_against_leave_pools_and_weekends():
+    tenant, client, run = _setup("swaps-checks")
+    giver = _holder(tenant, run, SATURDAY)
+    sunday_holder = _holder(tenant, run, SATURDAY + timedelta(days=1))
+    taker = _free_taker(tenant, run, SATURDAY)
+    board = tenant.swap_board(run.id)
+    url = f"/solve/{run.id}/swaps"
+
+    def reasons(payload):
+        response = client.post(url, json={"date": str(SATURDAY), "call_type": "weekend_noninv", **payload})
+        assert response.status_code == 409, response.json()
+        return {(p["provider"], p["reason"]) for p in response.json()["detail"]}
+
+    assert (sunday_holder, WEEKEND_TAKEN) in reasons({"giver": giver, "taker": sunday_holder})
+    assert {("DPR", INELIGIBLE)} <= reasons({"giver": giver, "taker": "DPR"})
+    assert client.post(url, json={"giver": giver, "taker": "HAS", "date": str(SATURDAY), "call_type": "weekend_noninv"}).status_code == 422
+
+    tenant.session.add(VacationRequest(provider_id=board.providers[taker].id, start_date=SATURDAY, end_date=SATURDAY, status="APPROVED"))
+    tenant.session.commit()
+    assert reasons({"giver": giver, "taker": taker}) == {(taker, VACATION)}
+
+    # Swapping days within one weekend keeps both to one day and their totals unchanged.
+    trade = {"giver": giver, "taker": sunday_holder, "return_date": str(SATURDAY + timedelta(days=1)), "return_call_type": "weekend_noninv"}
+    swap = client.post(url, json={"date": str(SATURDAY), "call_type": "weekend_noninv", **trade})
+    assert swap.status_code == 200
+    declined = client.post(f"{url}/{swap.json()['id']}/decline").json()
+    assert declined["status"] == "DECLINED"
+    assert [s["id"] for s in client.get(url, params={"status": "declined"}).json()] == [declined["id"]]
+
+
+def test_weekend_quota_and_a_burst_of_trades():
+    tenant, client, run = _setup("swaps-burst", date(2026, 12, 25))
+    board = tenant.swap_board(run.id)
+    schedule = tenant.schedule_for(run.id)
+    counts = tenant.fairness_index(run.id).window("weekend_noninv")
+    weekends = [c for c in schedule.call_assignments if c.call_type == "weekend_noninv" and c.date.weekday() == 5]
+    saturday = weekends[10]
+    full = next(i for i, n in sorted(counts.items()) if n >= 4 and i != saturday.providers[0].initials)
+    if saturday.date in board._days_off(board.providers[full].id):
+        saturday = weekends[11]
+    payload = {"giver": saturday.providers[0].initials, "taker": full, "date": str(saturday.date), "call_type": "weekend_noninv"}
+    response = client.post(f"/solve/{run.id}/swaps", json=payload)
+    assert response.status_code == 409 and (full, WEEKEND_QUOTA) in {(p["provider"], p["reason"]) for p in response.json()["detail"]}
+
+    # Interventional partners trade their weekday calls back and forth.
+    calls = [c for c in schedule.call_assignments if c.call_type == "interventional_weekday"]
+    accepted = 0
+    for first, second in zip(calls[0:300], calls[1:301]):
+        a, b = first.providers[0], second.providers[0]
+        if a.id == b.id or b in first.providers or a in second.providers:
+            continue
+        try:
+            swap = board.propose(a, b, first.date, first.call_type, second.date, second.call_type)
+        except SwapError:
+            continue  # one of them is on leave on the other's day
+        tenant.accept_swap(run.id, swap)
+        accepted += 1
+    assert accepted > 100
+    index = tenant.fairness_index(run.id)
+    assert index.revision == schedule.revision
+    _same_metrics(index, schedule)
+
+
+def _trade_interventional_calls(tenant, run, limit):
+    board = tenant.swap_board(run.id)
+    calls = [c for c in tenant.schedule_for(run.id).call_assignments if c.call_type == "interventional_weekday"]
+    for first, second in zip(calls, calls[1:]):
+        a, b = first.providers[0], second.providers[0]
+        if a.id == b.id or b in first.providers or a in second.providers:
+            continue
+        try:
+            swap = board.propose(a, b, first.date, first.call_type, second.date, second.call_type)
+        except SwapError:
+            continue
+        tenant.accept_swap(run.id, swap)
+        yield first.date
+        limit -= 1
+        if not limit:
+            return
+
+
+def test_swaps_are_archived_in_batches(tmp_path):
+    tenant = Tenant("swaps-archive", tenant_settings=replace(settings, archive_path=tmp_path, archive_swap_batch=3))
+    run = tenant.record_run(START, END, solve_schedule(tenant.session, START, END))
+
+    def segments():
+        with tenant.archive.open() as reader:
+            return len(reader.segments)
+
+    written = []
+    for traded in _trade_interventional_calls(tenant, run, 4):
+        written.append(segments())
+    assert written == [1, 1, 2, 2]
+    tenant.flush_archive()
+    tenant.flush_archive()
+    assert segments() == 3
+
+    pytest.importorskip("numpy")
+    schedule = tenant.schedule_for(run.id)
+    with tenant.archive.open() as reader:
+        (segment,) = reader.runs.values()
+        records = reader.records(segment, traded, traded)
+        stored = sorted(
+            (segment.codes[int(r["code"])], tuple(int(i) for i in r["providers"] if i >= 0)) for r in records[records["kind"] == CALL]
+        )
+        del records
+    assert stored == sorted((c.call_type, tuple(p.id for p in c.providers)) for c in schedule.call_assignments if c.date == traded)
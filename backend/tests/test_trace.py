@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import json
+import pickle
+import sys
+import time
+from datetime import date
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api import router
+from app.api.deps import get_tenant
+from app.config.registry import compile_rules
+from app.core.config import settings
+from app.models import Provider, VacationRequest
+from app.services.seed import seed_all
+from app.services.tenants import Tenant
+from app.solver import engine as engine_module, trace as trace_module
+from app.solver.daily import plan_day
+from app.solver.engine import ScheduleSolver, solve_schedule
+from app.solver.trace import VACATION, DecisionTrace
+
+START = date(2026, 1, 5)
+END = date(2026, 3, 27)
+WEDNESDAY = date(2026, 3, 4)
+UNTRACED_BUDGET_SECONDS = 1.0
+
+
+def _rows(schedule):
+    assignments = [(a.date, a.block, a.site_code, [p.initials for p in a.providers]) for a in schedule.assignments]
+    return assignments, [(c.date, c.call_type, c.label) for c in schedule.call_assignments]
+
+
+def test_trace_explains_who_was_skipped_without_changing_the_schedule(session):
+    seed_all(session)
+    untraced = solve_schedule(session, START, END)
+    (hospital_md,) = next(a for a in untraced.assignments if (a.date, a.block, a.site_code) == (WEDNESDAY, "AM", "WTH")).providers
+    session.add(VacationRequest(provider_id=hospital_md.id, start_date=WEDNESDAY, end_date=WEDNESDAY, status="APPROVED"))
+    session.commit()
+
+    trace = DecisionTrace()
+    traced = solve_schedule(session, START, END, trace=trace)
+    assert _rows(traced) == _rows(solve_schedule(session, START, END))
+
+    (decision,) = trace.select(WEDNESDAY, "WTH")[:1]
+    assert decision.block == "AM" and hospital_md.initials not in decision.winners
+    assert (hospital_md.initials, VACATION) in decision.rejected
+    assert len(trace) >= len(traced.assignments) + len(traced.call_assignments)
+
+
+def test_trace_ring_buffer_and_file(tmp_path, session):
+    seed_all(session)
+    path = tmp_path / "trace.jsonl"
+    trace = DecisionTrace(capacity=10, path=path)
+    schedule = solve_schedule(session, START, date(2026, 1, 9), trace=trace)
+    trace.close()
+
+    lines = path.read_text().splitlines()
+    assert len(trace) == 10 and len(lines) > 10
+    assert [d.as_dict() for d in trace] == [json.loads(line) for line in lines[-10:]]
+    assert json.loads(lines[0])["date"] == str(schedule.assignments[0].date)
+
+
+def test_tracing_off_leaves_the_hot_path_untouched(session):
+    seed_all(session)
+    assert not {"_eligible", "_advance_until", "_emit"} & vars(ScheduleSolver(session)).keys()
+
+    # Not a single call lands in the tracing module when no trace is asked for.
+    files: set[str] = set()
+    sys.setprofile(lambda frame, event, arg: files.add(frame.f_code.co_filename) if event == "call" else None)
+    try:
+        solve_schedule(session, START, END)
+    finally:
+        sys.setprofile(None)
+    assert trace_module.__file__ not in files and engine_module.__file__ in files
+
+    # Best of five quarter solves against a fixed budget; measured at ~0.065s.
+    timings = []
+    for _ in range(5):
+        started = time.perf_counter()
+        solve_schedule(session, START, END)
+        timings.append(time.perf_counter() - started)
+    assert min(timings) < UNTRACED_BUDGET_SECONDS
+
+
+def test_traced_solver_pickles_without_its_trace(session):
+    seed_all(session)
+    raw = json.loads(settings.rules_config_path.read_text())
+    raw["allocation"] = {"daily": "matching", "daily_workers": 2}
+    rules = compile_rules(raw)
+    traced = ScheduleSolver(session, rules, DecisionTrace())
+    copy = pickle.loads(pickle.dumps(traced))
+
+    assert not {"_eligible", "solve"} & vars(copy).keys()
+    assert "_eligible" in vars(traced)
+    day = date(2026, 1, 7)
+    groups = traced.seat_groups.get(day.weekday(), ())
+    assert plan_day(copy, day, groups) == plan_day(ScheduleSolver(session, rules), day, groups)
+
+
+def test_traced_solve_request_exposes_decisions():
+    tenant = Tenant("trace")
+    app = FastAPI()
+    app.include_router(router)
+    app.dependency_overrides[get_tenant] = lambda: tenant
+    client = TestClient(app)
+
+    traced = client.post("/solve", json={"start_date": "2026-03-02", "end_date": "2026-03-06", "trace": True}).json()
+    plain = client.post("/solve", json={"start_date": "2026-03-02", "end_date": "2026-03-06"}).json()
+    assert traced["solve_run_id"] != plain["solve_run_id"]
+
+    response = client.get(f"/solve/{traced['solve_run_id']}/trace", params={"day": str(WEDNESDAY), "slot": "COO_OBL"})
+    decisions = response.json()
+    revalidated = client.get(response.url, headers={"If-None-Match": response.headers["etag"]})
+    assert revalidated.status_code == 304
+    assert [d["block"] for d in decisions] == ["AM", "PM"]
+    obl = {p.initials for p in tenant.session.all(Provider) if p.initials in {"DPR", "APZ", "AML", "VKV", "ZZR"}}
+    assert all(set(d["winners"]) <= obl for d in decisions)
+    assert client.get(f"/solve/{plain['solve_run_id']}/trace").status_code == 404
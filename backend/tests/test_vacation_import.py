@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+import io
+import zipfile
+from datetime import date
+
+import orjson
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api import router
+from app.api.deps import get_tenant
+from app.config.registry import get_rules_registry
+from app.models import Provider, VacationAllowance, VacationRequest
+from app.services.seed import seed_all
+from app.services.tenants import Tenant
+from app.services.vacation_import import VacationImportError, import_vacations, parse_rows
+from app.solver.engine import solve_schedule
+from app.solver.pins import repair_schedule
+
+
+def _xlsx(rows: list[list[object]]) -> bytes:
+    def cell(ref: str, value: object) -> str:
+        if isinstance(value, str):
+            return f'<c r="{ref}" t="inlineStr"><is><t>{value}</t></is></c>'
+        return f'<c r="{ref}"><v>{value}</v></c>'
+
+    body = "".join(
+        f'<row r="{r}">' + "".join(cell(f"{chr(65 + c)}{r}", v) for c, v in enumerate(values)) + "</row>"
+        for r, values in enumerate(rows, start=1)
+    )
+    ns = 'xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"'
+    rel_ns = 'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships"'
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as zf:
+        zf.writestr("xl/workbook.xml", f'<workbook {ns} {rel_ns}><sheets><sheet name="S" sheetId="1" r:id="rId1"/></sheets></workbook>')
+        zf.writestr(
+            "xl/_rels/workbook.xml.rels",
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            '<Relationship Id="rId1" Target="worksheets/sheet1.xml"/></Relationships>',
+        )
+        zf.writestr("xl/worksheets/sheet1.xml", f"<worksheet {ns}><sheetData>{body}</sheetData></worksheet>")
+    return buffer.getvalue()
+
+
+def test_formats_parse_to_the_same_rows():
+    csv_rows = parse_rows(b"provider,start_date,end_date\nJOO,2026-04-06,2026-04-10\n", "csv")
+    json_rows = parse_rows(orjson.dumps({"rows": [{"provider": "JOO", "start_date": "2026-04-06", "end_date": "2026-04-10"}]}), "json")
+    # 46118 and 46122 are the spreadsheet serials for 2026-04-06 and 2026-04-10.
+    xlsx_rows = parse_rows(_xlsx([["provider", "start_date", "end_date"], ["JOO", 46118, 46122]]), "xlsx")
+    assert csv_rows[0]["provider"] == json_rows[0]["provider"] == xlsx_rows[0]["provider"] == "JOO"
+    with pytest.raises(ValueError):
+        parse_rows(b"not a zip", "xlsx")
+
+
+def _replaced(workbook: bytes, name: str, text: str) -> bytes:
+    source = zipfile.ZipFile(io.BytesIO(workbook))
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as zf:
+        for item in source.infolist():
+            zf.writestr(item, text if item.filename == name else source.read(item))
+    return buffer.getvalue()
+
+
+@pytest.mark.parametrize(
+    "name, old, new",
+    [
+        ("xl/workbook.xml", '<sheet name="S" sheetId="1" r:id="rId1"/>', ""),
+        ("xl/_rels/workbook.xml.rels", 'Id="rId1"', 'Id="rId9"'),
+        ("xl/worksheets/sheet1.xml", '<c r="A1" ', "<c "),
+        ("xl/worksheets/sheet1.xml", '<c r="B2"><v>46118</v>', '<c r="B2" t="s"><v>3</v>'),
+    ],
+)
+def test_malformed_workbooks_are_rejected_as_bad_requests(name, old, new):
+    workbook = _xlsx([["provider", "start_date"], ["JOO", 46118]])
+    text = zipfile.ZipFile(io.BytesIO(workbook)).read(name).decode()
+    assert old in text
+    broken = _replaced(workbook, name, text.replace(old, new))
+    with pytest.raises(ValueError):
+        parse_rows(broken, "xlsx")
+
+    app = FastAPI()
+    app.include_router(router)
+    app.dependency_overrides[get_tenant] = lambda: Tenant("vacation-import")
+    assert TestClient(app).post("/vacations/import", content=broken, params={"format": "xlsx"}).status_code == 400
+
+
+def test_batch_is_validated_as_a_whole_and_rejected_atomically(session):
+    seed_all(session)
+    before = len(session.all(VacationRequest))
+    rows = [
+        {"provider": "JOO", "start_date": "2026-02-04", "end_date": "2026-02-10"},  # overlaps the seeded week
+        {"provider": "APZ", "start_date": "2026-05-04", "end_date": "2026-05-08"},
+        {"provider": "APZ", "start_date": "2026-05-04", "end_date": "2026-05-08"},
+        {"provider": "APZ", "start_date": "2026-05-07", "end_date": "2026-05-12"},
+        {"provider": "ZZZ", "start_date": "2026-05-04", "end_date": "2026-05-08"},
+        {"provider": "KC", "start_date": "2026-06-01", "end_date": "2026-08-31"},  # more days than the allowance
+        {"provider": "KC", "start_date": "2026-06-10", "end_date": "2026-06-01"},
+    ]
+
+    with pytest.raises(VacationImportError) as excinfo:
+        import_vacations(session, rows)
+
+    messages = {(issue.row, issue.message.split(" (")[0]) for issue in excinfo.value.issues}
+    assert messages == {
+        (1, "Overlaps an existing request"),
+        (3, "Duplicate of row 2"),
+        (4, "Overlaps row 2"),
+        (5, "Unknown provider: ZZZ"),
+        (6, "KC needs 65 day(s) in 2026, 25 left"),
+        (7, "end_date is before start_date"),
+    }
+    assert len(session.all(VacationRequest)) == before
+    assert all(a.days_used == 0 for a in session.all(VacationAllowance))
+
+
+def test_shared_initials_must_name_the_provider(session):
+    seed_all(session)
+    rows = [{"provider": "RAM", "start_date": "2026-05-04", "end_date": "2026-05-08"}]
+    with pytest.raises(VacationImportError) as excinfo:
+        import_vacations(session, rows)
+    assert [issue.message for issue in excinfo.value.issues] == ["RAM names more than one provider (APN, MD); give provider_id or type"]
+    assert all(a.days_used == 0 for a in session.all(VacationAllowance))
+
+    apn = next(p for p in session.all(Provider) if p.initials == "RAM" and p.type == "APN")
+    md = next(p for p in session.all(Provider) if p.initials == "RAM" and p.type == "MD")
+    result = import_vacations(
+        session,
+        [
+            {**rows[0], "type": "apn"},
+            {"provider_id": md.id, "start_date": "2026-06-01", "end_date": "2026-06-05"},
+        ],
+    )
+    assert [request.provider_id for request in result.created] == [apn.id, md.id]
+
+
+def test_import_charges_allowances_and_one_repair_covers_the_batch(session):
+    seed_all(session)
+    rules = get_rules_registry().active
+    start, end = date(2026, 1, 5), date(2026, 12, 31)
+    schedule = solve_schedule(session, start, end, rules)
+    rows = parse_rows(
+        b"provider,start_date,end_date,block\n"
+        b"KC,2026-05-22,2026-05-29,FULLDAY\n"
+        b"MB,2026-06-08,2026-06-12,FULLDAY\n",
+        "csv",
+    )
+
+    result = import_vacations(session, rows)
+    assert result.window == (date(2026, 5, 22), date(2026, 6, 12))
+    allowances = {(a.provider_id, a.year): a.days_used for a in session.all(VacationAllowance)}
+    kc = next(p for p in session.all(Provider) if p.initials == "KC")
+    assert allowances[(kc.id, 2026)] == 5  # Memorial Day and the weekend are not charged
+
+    repair_schedule(session, schedule, start, end, rules, *result.window)
+    fresh = solve_schedule(session, start, end, rules)
+    assert [(a.date, a.site_code, a.block, a.providers) for a in schedule.assignments] == [
+        (a.date, a.site_code, a.block, a.providers) for a in fresh.assignments
+    ]
+    assert [(c.date, c.call_type, c.providers) for c in schedule.call_assignments] == [
+        (c.date, c.call_type, c.providers) for c in fresh.call_assignments
+    ]
+    assert schedule.vacations == fresh.vacations
+    assert not any(kc in a.providers for a in schedule.assignments if date(2026, 5, 22) <= a.date <= date(2026, 5, 29))
@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+import json
+from datetime import date, timedelta
+
+from app.config.registry import compile_rules
+from app.core.config import settings
+from app.models import Provider, VacationRequest
+from app.services.fairness import fairness_counts
+from app.services.seed import seed_all
+from app.solver.engine import solve_schedule
+from app.solver.weekend_flow import allocate_weekends, weekend_of
+
+
+FRIDAY = date(2026, 1, 9)
+
+
+def _flow_rules():
+    raw = json.loads(settings.rules_config_path.read_text())
+    raw["allocation"] = {"weekend_call": "flow"}
+    return compile_rules(raw)
+
+
+def test_allocation_reroutes_to_hit_targets_exactly():
+    a, b, c = (Provider(id=i, initials=name, type="MD") for i, name in enumerate("ABC", start=1))
+    days = [FRIDAY + timedelta(days=7 * week + offset) for week in range(2) for offset in range(3)]
+    # A can only work the first Friday; a first-come pass that hands it to B strands A below target.
+    unavailable = {a.id: set(days[1:])}
+    targets = {a.id: 1, b.id: 2, c.id: 2}
+
+    allocation = allocate_weekends(days, [b, c, a], targets, lambda p, day: day not in unavailable.get(p.id, ()))
+
+    assert allocation.unfilled == [days[-1]]
+    assert allocation.counts == targets
+    assert allocation.owners[days[0]] == a
+    seen = {(p.id, weekend_of(day)) for day, p in allocation.owners.items()}
+    assert len(seen) == len(allocation.owners)
+
+
+def test_flow_mode_meets_weekend_targets_for_the_year(session):
+    seed_all(session)
+    rules = _flow_rules()
+    away = next(p for p in session.all(Provider) if p.initials == "JOO")
+    session.add(VacationRequest(provider_id=away.id, start_date=date(2026, 1, 1), end_date=date(2026, 6, 30), status="APPROVED"))
+    session.commit()
+
+    schedule = solve_schedule(session, date(2026, 1, 5), date(2026, 12, 31), rules)
+
+    counts = fairness_counts(schedule)["weekend_call"]
+    assert len([c for c in schedule.call_assignments if c.call_type == "weekend_noninv"]) == 52 * 3
+    assert min(counts.values()) >= rules.weekend_targets.defaults["MD"]
+    assert max(counts.values()) - min(counts.values()) <= 1
+    assert all(
+        c.date > date(2026, 6, 30)
+        for c in schedule.call_assignments
+        if c.call_type == "weekend_noninv" and c.providers[0] == away
+    )
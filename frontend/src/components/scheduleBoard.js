@@ -163,6 +163,91 @@ function renderCallSummary(weekStart, callAssignments) {
   </div>`;
 }
 
+const API_CALL_TYPES = {
+  noninvasive_weekday: "weekday_noninvasive",
+  interventional_weekday: "weekday_interventional",
+  weekend_noninv: "weekend_noninvasive",
+  interventional_weekend: "weekend_interventional",
+};
+
+export function fromApiAssignment(row) {
+  return {
+    date: row.date,
+    block: row.block,
+    site_code: row.site_code,
+    site_type: row.site_type,
+    providerDisplay: row.providers.join("/"),
+  };
+}
+
+export function fromApiCall(row) {
+  return {
+    date: row.date,
+    label: row.date,
+    type: API_CALL_TYPES[row.call_type] ?? row.call_type,
+    providerDisplay: row.label,
+  };
+}
+
+export async function* readNdjson(response) {
+  if (!response.ok) {
+    throw new Error(`Request failed with status ${response.status}`);
+  }
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+  for (;;) {
+    const { done, value } = await reader.read();
+    buffer += decoder.decode(value ?? new Uint8Array(), { stream: !done });
+    const lines = buffer.split("\n");
+    buffer = lines.pop();
+    for (const line of lines) {
+      if (line) {
+        yield JSON.parse(line);
+      }
+    }
+    if (done) {
+      break;
+    }
+  }
+  if (buffer) {
+    yield JSON.parse(buffer);
+  }
+}
+
+async function collectRows(fetchImpl, url, headers, transform) {
+  const rows = [];
+  const response = await fetchImpl(url, { headers });
+  for await (const row of readNdjson(response)) {
+    rows.push(transform(row));
+  }
+  return rows;
+}
+
+export async function loadSchedule(store, options) {
+  const { solveRunId, baseUrl = "", tenantId, start, end, fetchImpl = globalThis.fetch } = options;
+  const query = new URLSearchParams({ format: "ndjson" });
+  if (start) {
+    query.set("start", toISODate(start));
+  }
+  if (end) {
+    query.set("end", toISODate(end));
+  }
+  const headers = { Accept: "application/x-ndjson" };
+  if (tenantId) {
+    headers["X-Tenant-Id"] = tenantId;
+  }
+  const root = `${baseUrl}/solve/${solveRunId}`;
+  // Rows are parsed line by line as they stream in, so a full year never exists as one JSON document.
+  const [assignments, calls] = await Promise.all([
+    collectRows(fetchImpl, `${root}/assignments?${query}`, headers, fromApiAssignment),
+    collectRows(fetchImpl, `${root}/calls?${query}`, headers, fromApiCall),
+  ]);
+  store.setSchedule(assignments);
+  store.setCallAssignments(calls);
+  return { assignments: assignments.length, calls: calls.length };
+}
+
 export class ScheduleBoard {
   constructor(store, options = {}) {
     this.store = store;
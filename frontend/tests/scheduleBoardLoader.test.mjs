@@ -0,0 +1,49 @@
+import test from "node:test";
+import assert from "node:assert/strict";
+
+import { loadSchedule } from "../src/components/scheduleBoard.js";
+
+function streamResponse(chunks) {
+  const encoder = new TextEncoder();
+  const body = new ReadableStream({
+    start(controller) {
+      for (const chunk of chunks) {
+        controller.enqueue(encoder.encode(chunk));
+      }
+      controller.close();
+    },
+  });
+  return new Response(body, { headers: { "Content-Type": "application/x-ndjson" } });
+}
+
+test("loadSchedule reads NDJSON assignments and calls across chunk boundaries", async () => {
+  const requested = [];
+  const fetchImpl = async (url, init) => {
+    requested.push({ url, tenant: init.headers["X-Tenant-Id"] });
+    if (url.includes("/assignments")) {
+      return streamResponse([
+        '{"date":"2026-01-05","block":"AM","site_code":"WTH","site_type":"hospital","providers":["JOO"]}\n{"date":"2026-01-05","bl',
+        'ock":"AM","site_code":"WTH_APN","site_type":"hospital","providers":["AG","ACS"]}\n',
+      ]);
+    }
+    return streamResponse(['{"date":"2026-01-05","call_type":"noninvasive_weekday","label":"HH: JOO CH: RAM","providers":["JOO","RAM"]}']);
+  };
+  const received = {};
+  const store = {
+    setSchedule(rows) {
+      received.assignments = rows;
+    },
+    setCallAssignments(rows) {
+      received.calls = rows;
+    },
+  };
+
+  const counts = await loadSchedule(store, { solveRunId: 7, tenantId: "north", start: "2026-01-05", fetchImpl });
+
+  assert.deepEqual(counts, { assignments: 2, calls: 1 });
+  assert.equal(received.assignments[1].providerDisplay, "AG/ACS");
+  assert.equal(received.calls[0].type, "weekday_noninvasive");
+  assert.equal(received.calls[0].providerDisplay, "HH: JOO CH: RAM");
+  assert.ok(requested.every((entry) => entry.url.includes("format=ndjson") && entry.url.includes("start=2026-01-05")));
+  assert.ok(requested.every((entry) => entry.tenant === "north"));
+});